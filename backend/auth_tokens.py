@@ -0,0 +1,173 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from cryptography.x509 import load_pem_x509_certificate
+
+import metrics
+from http_client import http_client
+
+# Google's x509 certificates for the keys that sign Firebase ID tokens
+FIREBASE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+
+# Unknown key ids trigger at most one re-fetch per this many seconds
+MIN_KEY_REFRESH_INTERVAL = 60
+# While the certificates can't be fetched, expired keys stay in use this long
+KEY_GRACE_PERIOD = 24 * 60 * 60
+# A failed fetch is retried after this many seconds, doubling per failure up to the max
+MIN_FETCH_BACKOFF = 5
+MAX_FETCH_BACKOFF = 300
+
+
+class AuthError(Exception):
+    def __init__(self, message, status_code=401):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def fetch_firebase_certs(url=FIREBASE_CERTS_URL):
+    """
+    Return ({kid: certificate PEM}, seconds the set may be cached for).
+    """
+    response = http_client.get(url)
+    response.raise_for_status()
+    match = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+    return response.json(), int(match.group(1)) if match else 3600
+
+
+class FirebaseTokenVerifier:
+    """
+    Verifies Firebase ID tokens locally instead of calling Firebase Admin per request.
+
+    Google's public signing certificates are cached for as long as their
+    Cache-Control allows and re-fetched (at most once a minute) when a token
+    names an unknown key id. If a fetch fails, the previous keys stay in use for
+    a grace period while retries back off; only with no usable keys are requests
+    refused, with a 503. Decoded claims are cached per token until the token
+    expires, so repeat requests cost a dictionary lookup and new tokens cost one
+    RS256 check.
+    """
+
+    def __init__(self, project_id, fetch_certs=fetch_firebase_certs, max_cached_tokens=50000, leeway=60):
+        self.project_id = project_id
+        self.issuer = f"https://securetoken.google.com/{project_id}"
+        self.fetch_certs = fetch_certs
+        self.max_cached_tokens = max_cached_tokens
+        self.leeway = leeway
+        self._keys = {}
+        self._keys_fetched_at = 0
+        self._keys_expire_at = 0
+        self._retry_at = 0
+        self._backoff = MIN_FETCH_BACKOFF
+        self._keys_lock = threading.Lock()
+        self._claims = OrderedDict()
+        self._claims_lock = threading.Lock()
+        self.cache_hits = 0
+        self.verified = 0
+        self.rejected = 0
+        self.key_refreshes = 0
+        self.key_fetch_failures = 0
+
+    def _refresh_keys(self):
+        """
+        Re-fetch the signing keys, keeping the current ones if that fails. Returns
+        whether the keys were replaced. Caller holds the keys lock.
+        """
+        if time.time() < self._retry_at:
+            return False
+        try:
+            certs, max_age = self.fetch_certs()
+            keys = {
+                kid: load_pem_x509_certificate(pem.encode()).public_key()
+                for kid, pem in certs.items()
+            }
+        except Exception as e:
+            print(f"Error fetching token signing keys: {e}")
+            self.key_fetch_failures += 1
+            self._retry_at = time.time() + self._backoff
+            self._backoff = min(self._backoff * 2, MAX_FETCH_BACKOFF)
+            return False
+        self._keys = keys
+        self._keys_fetched_at = time.time()
+        self._keys_expire_at = self._keys_fetched_at + max_age
+        self._retry_at = 0
+        self._backoff = MIN_FETCH_BACKOFF
+        self.key_refreshes += 1
+        return True
+
+    def _public_key(self, kid):
+        with self._keys_lock:
+            if time.time() >= self._keys_expire_at:
+                self._refresh_keys()
+            if time.time() >= self._keys_expire_at + KEY_GRACE_PERIOD:
+                raise AuthError("Token signing keys are unavailable", status_code=503)
+            key = self._keys.get(kid)
+            if key is None and time.time() - self._keys_fetched_at > MIN_KEY_REFRESH_INTERVAL:
+                # Google may have rotated keys since the last fetch
+                if self._refresh_keys():
+                    key = self._keys.get(kid)
+        return key
+
+    def verify(self, token):
+        """
+        Return the token's claims with `uid` set, or raise AuthError.
+        """
+        now = time.time()
+        with self._claims_lock:
+            claims = self._claims.get(token)
+            if claims is not None and claims["exp"] > now:
+                self._claims.move_to_end(token)
+                self.cache_hits += 1
+                return claims
+
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+            key = self._public_key(kid)
+            if key is None:
+                raise AuthError("ID token signed with an unknown key")
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=["RS256"],
+                audience=self.project_id,
+                issuer=self.issuer,
+                leeway=self.leeway,
+                options={"require": ["exp", "iat", "sub"]},
+            )
+            if not claims["sub"]:
+                raise AuthError("ID token has an empty subject")
+        except jwt.InvalidTokenError as e:
+            with self._claims_lock:
+                self.rejected += 1
+            raise AuthError(f"Invalid ID token: {e}")
+        except AuthError:
+            with self._claims_lock:
+                self.rejected += 1
+            raise
+
+        claims["uid"] = claims["sub"]
+        with self._claims_lock:
+            self.verified += 1
+            self._claims[token] = claims
+            while len(self._claims) > self.max_cached_tokens:
+                self._claims.popitem(last=False)
+        return claims
+
+    def stats(self):
+        with self._claims_lock:
+            return {
+                "cachedTokens": len(self._claims),
+                "cacheHits": self.cache_hits,
+                "verified": self.verified,
+                "rejected": self.rejected,
+                "keyRefreshes": self.key_refreshes,
+                "keyFetchFailures": self.key_fetch_failures,
+            }
+
+
+def create_token_verifier(project_id):
+    verifier = FirebaseTokenVerifier(project_id)
+    metrics.register("auth", verifier.stats)
+    return verifier
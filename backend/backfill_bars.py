@@ -0,0 +1,81 @@
+"""
+Backfill the local bar store (data/bars, or BAR_STORE_DIR) from yfinance.
+
+Usage:
+    python backfill_bars.py [--symbols AAPL,MSFT] [--intervals 1d,1mo] [--full] [--batch-size 100]
+
+Without --symbols, PREDEFINED_TICKERS are backfilled. Series already in the
+store are topped up from shortly before their last stored bar, and the store
+rescales a series whose overlapping bars were re-adjusted (a split or
+dividend); --full re-downloads the whole history and replaces them. Symbols are downloaded in multi-symbol batches.
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from bar_store import bar_store
+from config import PREDEFINED_TICKERS
+from prefetcher import download
+
+# How far back a full backfill goes per interval; Yahoo keeps 5-minute bars for 60 days
+BACKFILL_PERIODS = {"5m": "60d", "1d": "10y", "1wk": "10y", "1mo": "max"}
+# How far before the last stored bar a top-up re-downloads, so a partial bar is
+# replaced and the overlap shows whether yfinance re-adjusted the history
+OVERLAPS = {"5m": pd.Timedelta(days=1), "1d": pd.Timedelta(days=7),
+            "1wk": pd.Timedelta(weeks=4), "1mo": pd.Timedelta(days=93)}
+
+
+def backfill(symbols, interval, full=False, batch_size=100):
+    """
+    Bring `symbols` up to date at `interval`. Returns the number of bars written.
+    """
+    written = 0
+    fresh, incremental = [], {}
+    for symbol in symbols:
+        last = None if full else bar_store.last_timestamp(symbol, interval)
+        if last is None:
+            fresh.append(symbol)
+        else:
+            start = (pd.Timestamp(last, unit="s") - OVERLAPS[interval]).strftime("%Y-%m-%d")
+            incremental.setdefault(start, []).append(symbol)
+
+    for i in range(0, len(fresh), batch_size):
+        batch = fresh[i:i + batch_size]
+        for symbol, hist in download(batch, BACKFILL_PERIODS[interval], interval).items():
+            bar_store.replace(symbol, interval, hist)
+            written += len(hist)
+
+    # Symbols last synced on the same day share one download
+    for start, group in incremental.items():
+        for i in range(0, len(group), batch_size):
+            batch = group[i:i + batch_size]
+            for symbol, hist in download(batch, None, interval, start=start).items():
+                written += bar_store.append(symbol, interval, hist)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the local bar store from yfinance.")
+    parser.add_argument("--symbols", help="Comma-separated symbols (default: PREDEFINED_TICKERS)")
+    parser.add_argument("--intervals", default=",".join(BACKFILL_PERIODS),
+                        help="Comma-separated yfinance intervals")
+    parser.add_argument("--full", action="store_true", help="Replace stored series with a full download")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.symbols:
+        symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    else:
+        symbols = [ticker["symbol"] for ticker in PREDEFINED_TICKERS]
+
+    for interval in args.intervals.split(","):
+        if interval not in BACKFILL_PERIODS:
+            raise SystemExit(f"Unknown interval '{interval}'. Valid intervals: {', '.join(BACKFILL_PERIODS)}.")
+        start = time.perf_counter()
+        written = backfill(symbols, interval, full=args.full, batch_size=args.batch_size)
+        print(f"{interval}: {written} bars for {len(symbols)} symbols in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
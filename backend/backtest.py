@@ -0,0 +1,145 @@
+import numpy as np
+
+
+def align_closes(series):
+    """
+    Align per-symbol (t, close) arrays on the union of their timestamps.
+
+    Returns (t, closes) where closes is a (bars, symbols) float64 matrix in the
+    order of `series`. Gaps after a symbol's first bar carry its last close
+    forward; bars before it are NaN.
+    """
+    t = np.unique(np.concatenate([np.asarray(times) for times, _ in series.values()]))
+    closes = np.full((len(t), len(series)), np.nan)
+    for column, (times, values) in enumerate(series.values()):
+        closes[np.searchsorted(t, times), column] = values
+
+    # Forward fill: index of the last valid row at or before each row, per column
+    valid = ~np.isnan(closes)
+    last_valid = np.where(valid, np.arange(len(t))[:, None], 0)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+    filled = closes[last_valid, np.arange(closes.shape[1])]
+    # Rows before a column's first bar stay NaN
+    started = np.maximum.accumulate(valid, axis=0)
+    return t, np.where(started, filled, np.nan)
+
+
+def _sma(closes, window):
+    """
+    Trailing simple moving average down each column. A window that is not
+    `window` bars long or has a missing bar in it (before a symbol lists) is NaN.
+    """
+    if window < 1:
+        raise ValueError("Moving average windows must be at least 1 bar")
+    finite = np.isfinite(closes)
+    sums = np.cumsum(np.where(finite, closes, 0.0), axis=0)
+    counts = np.cumsum(finite, axis=0)
+    sma = np.full_like(closes, np.nan)
+    window_sums = sums[window - 1:].copy()
+    window_sums[1:] -= sums[:-window]
+    window_counts = counts[window - 1:].copy()
+    window_counts[1:] -= counts[:-window]
+    sma[window - 1:] = np.where(window_counts == window, window_sums / window, np.nan)
+    return sma
+
+
+def buy_and_hold(closes):
+    return np.isfinite(closes).astype(np.int8)
+
+
+def sma_crossover(closes, fast=20, slow=50):
+    """
+    Long while the fast moving average is above the slow one.
+    """
+    fast_sma = _sma(closes, int(fast))
+    slow_sma = _sma(closes, int(slow))
+    with np.errstate(invalid="ignore"):
+        return (fast_sma > slow_sma).astype(np.int8)
+
+
+def momentum(closes, lookback=20):
+    """
+    Long while the close is above its close `lookback` bars earlier.
+    """
+    lookback = int(lookback)
+    if lookback < 1:
+        raise ValueError("lookback must be at least 1 bar")
+    positions = np.zeros(closes.shape, dtype=np.int8)
+    with np.errstate(invalid="ignore"):
+        positions[lookback:] = closes[lookback:] > closes[:-lookback]
+    return positions
+
+
+STRATEGIES = {
+    "buy_and_hold": buy_and_hold,
+    "sma_crossover": sma_crossover,
+    "momentum": momentum,
+}
+
+
+def run_backtest(closes, positions, starting_balance, cost_bps=0.0, exposure=1.0):
+    """
+    Replay long/flat `positions` (bars x symbols, 1 = long) over `closes`.
+
+    The balance is split equally across symbols, one sleeve each. While long, a
+    sleeve invests the `exposure` fraction of its equity and holds the rest in
+    cash. A position taken at a bar's close earns the next bar's return, and
+    every entry or exit pays `cost_bps` on the invested amount. Everything is computed on whole arrays:
+    sleeve equity is a cumulative product of per-bar growth, drawdown comes from
+    a running maximum, and trades are the runs of consecutive held bars found
+    with np.diff.
+
+    Returns a dict with the total equity curve, final balance, profit/loss,
+    win rate (percent of closed trades that made money), closed trade count,
+    maximum drawdown (a negative fraction) and per-symbol profit/loss. Positions
+    still held at the last bar are not closed trades: they are counted in
+    openPositions, and openProfitLoss is their gain marked to the final close.
+    """
+    bars, symbols = closes.shape
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = np.nan_to_num(closes[1:] / closes[:-1] - 1.0, nan=0.0, posinf=0.0, neginf=0.0)
+
+    # A bar without a price can't be held
+    positions = np.where(np.isfinite(closes), positions, 0).astype(np.int8)
+    held = positions[:-1]
+    turnover = np.abs(np.diff(positions, axis=0, prepend=0))[:-1]
+    growth = (1.0 + exposure * held * returns) * (1.0 - exposure * turnover * (cost_bps / 10000.0))
+
+    sleeve = starting_balance / symbols
+    sleeve_equity = np.empty((bars, symbols))
+    sleeve_equity[0] = sleeve
+    sleeve_equity[1:] = sleeve * np.cumprod(growth, axis=0)
+    equity = sleeve_equity.sum(axis=1)
+
+    peak = np.maximum.accumulate(equity)
+    drawdown = equity / peak - 1.0
+
+    # Trades: runs of held bars per symbol. Padding with flat bars closes every
+    # run, and transposing keeps each symbol's entries and exits paired in order.
+    edges = np.diff(np.pad(held, ((1, 1), (0, 0))).T.astype(np.int8), axis=1)
+    entry_symbol, entry_bar = np.nonzero(edges == 1)
+    exit_symbol, exit_bar = np.nonzero(edges == -1)
+    # held[i] earns the move into row i + 1 of sleeve_equity, and the exit cost lands one row after the exit
+    exit_row = np.minimum(exit_bar + 1, bars - 1)
+    trade_returns = sleeve_equity[exit_row, exit_symbol] / sleeve_equity[entry_bar, entry_symbol] - 1.0
+    # A run that reaches the last bar with the position still taken hasn't been exited
+    still_open = (exit_bar == bars - 1) & (positions[-1, exit_symbol] == 1)
+    closed_returns = trade_returns[~still_open]
+    trades = len(closed_returns)
+    wins = int((closed_returns > 0).sum())
+    open_profit_loss = float((sleeve_equity[-1, exit_symbol[still_open]]
+                              - sleeve_equity[entry_bar[still_open], entry_symbol[still_open]]).sum())
+
+    final_balance = float(equity[-1])
+    return {
+        "equity": equity,
+        "finalBalance": final_balance,
+        "profitLoss": final_balance - starting_balance,
+        "profitLossPct": (final_balance / starting_balance - 1.0) * 100.0,
+        "winRate": wins / trades * 100.0 if trades else 0.0,
+        "trades": trades,
+        "openPositions": int(positions[-1].sum()),
+        "openProfitLoss": open_profit_loss,
+        "maxDrawdown": float(drawdown.min()),
+        "symbolProfitLoss": sleeve_equity[-1] - sleeve,
+    }
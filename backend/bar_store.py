@@ -0,0 +1,356 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+import metrics
+from bars import hist_to_columns
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STORE_DIR = os.path.join(ROOT_DIR, "data", "bars")
+
+# One raw little-endian file per field; `t` is UTC epoch seconds
+FIELDS = {"t": "<i8", "o": "<f8", "h": "<f8", "l": "<f8", "c": "<f8", "v": "<f8"}
+# Relative difference between stored and refetched prices of the same bar that
+# means yfinance re-adjusted the history (a split or dividend)
+ADJUSTMENT_TOLERANCE = 1e-6
+
+
+def fetch_since(symbol, interval, start):
+    """
+    Adjusted yfinance bars for `symbol` from `start` (YYYY-MM-DD) to now.
+    """
+    return yf.Ticker(symbol).history(start=start, interval=interval, auto_adjust=True)
+
+
+class BarStore:
+    """
+    Local historical bar store: one directory per symbol/interval holding a raw
+    column file per field, read back through np.memmap.
+
+    Bars are kept in timestamp order, so a range query is a binary search on the
+    `t` column followed by slicing each column; only the pages for that slice
+    are read from disk. New bars are appended to the end of each file, and a bar
+    with the same timestamp as the last stored one replaces it, since the latest
+    bar is still forming while the market is open. The `t` file's mtime records
+    when the series was last synced with upstream.
+
+    Prices are split- and dividend-adjusted, and yfinance re-adjusts the whole
+    history after each event. So an append first compares the bars it shares with
+    the stored series; if their prices moved, the stored bars before the overlap
+    are rescaled by the factor seen on the earliest shared bar. New bars that
+    don't reach back to the last stored one (a gap after downtime) are preceded
+    by the missing span from `fetcher`; if that fails nothing is written, so the
+    series is never shortened or left with a hole. Writers hold a file lock per
+    series, so the backfill script and the server can share a store.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR, fetcher=fetch_since):
+        self.root = root
+        self.fetcher = fetcher
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.appended_bars = 0
+        self.readjustments = 0
+        self.filled_gaps = 0
+        self.skipped_gaps = 0
+        self.write_failures = 0
+        self.read_latency = metrics.LatencyHistogram(buckets_ms=(0.1, 0.5, 1, 5, 10, 50, 100))
+
+    def _dir(self, symbol, interval):
+        safe_symbol = re.sub(r"[^A-Z0-9.\-^=]", "_", symbol.upper())
+        return os.path.join(self.root, safe_symbol, interval)
+
+    def _meta(self, path):
+        try:
+            with open(os.path.join(path, "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _columns(self, path):
+        """
+        Memory-map every column, trimmed to the length all of them have reached.
+        """
+        mapped = {}
+        for field, dtype in FIELDS.items():
+            file_path = os.path.join(path, f"{field}.bin")
+            if os.path.getsize(file_path) == 0:
+                return None
+            mapped[field] = np.memmap(file_path, dtype=dtype, mode="r")
+        length = min(len(column) for column in mapped.values())
+        return {field: column[:length] for field, column in mapped.items()}
+
+    def synced_at(self, symbol, interval):
+        """
+        Epoch seconds when the series was last appended to, or None if it is not stored.
+        """
+        try:
+            return os.path.getmtime(os.path.join(self._dir(symbol, interval), "t.bin"))
+        except OSError:
+            return None
+
+    def read(self, symbol, interval, start=None, end=None, window=None):
+        """
+        Return bar columns (as hist_to_columns builds them) for start <= t < end,
+        or None if nothing is stored. `start`/`end` are UTC epoch seconds; a
+        `window` Timedelta instead selects that much history before the last bar.
+        """
+        begin = time.perf_counter()
+        path = self._dir(symbol, interval)
+        meta = self._meta(path)
+        if meta is None:
+            return None
+        try:
+            columns = self._columns(path)
+        except (OSError, ValueError):
+            return None
+        if columns is None:
+            return None
+
+        t = columns["t"]
+        if window is not None:
+            start = int(t[-1]) - int(window.total_seconds())
+        lo = np.searchsorted(t, start, side="left") if start is not None else 0
+        hi = np.searchsorted(t, end, side="left") if end is not None else len(t)
+        result = {field: column[lo:hi] for field, column in columns.items()}
+        # Labels are exchange-local dates, matching hist_to_columns
+        local = pd.to_datetime(result["t"], unit="s", utc=True).tz_convert(meta["tz"]).tz_localize(None)
+        result["labels"] = np.datetime_as_string(local.values.astype("datetime64[D]"))
+
+        self.read_latency.observe(time.perf_counter() - begin)
+        with self._lock:
+            self.reads += 1
+        return result
+
+    def read_window(self, symbol, interval, window, max_age=None):
+        """
+        Return the trailing `window` (a Timedelta) of bars, or None if the series is
+        missing or was last synced more than `max_age` seconds ago.
+        """
+        synced_at = self.synced_at(symbol, interval)
+        if synced_at is None or (max_age is not None and time.time() - synced_at >= max_age):
+            return None
+        return self.read(symbol, interval, window=window)
+
+    def last_timestamp(self, symbol, interval):
+        return self._last(self._dir(symbol, interval))
+
+    def _last(self, path):
+        try:
+            size = os.path.getsize(os.path.join(path, "t.bin"))
+            if size < 8:
+                return None
+            with open(os.path.join(path, "t.bin"), "rb") as f:
+                f.seek(size - size % 8 - 8)
+                return int(np.frombuffer(f.read(8), dtype=FIELDS["t"])[0])
+        except OSError:
+            return None
+
+    @contextmanager
+    def _locked(self, path):
+        # The lock file sits next to the series directory, which _write swaps out
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f"{path}.lock", "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _adjustment(self, path, columns, last):
+        """
+        Compare the settled bars `columns` share with the stored series. Returns
+        None if they agree, else (price factor, volume factor) that turns stored
+        bars into the new basis, measured on the earliest shared bar.
+        """
+        stored = self._columns(path)
+        # The last stored bar may still have been forming, so it is not compared
+        t = columns["t"]
+        shared = np.flatnonzero(t < last)
+        positions = np.searchsorted(stored["t"], t[shared])
+        found = positions < len(stored["t"])
+        found[found] = stored["t"][positions[found]] == t[shared][found]
+        shared, positions = shared[found], positions[found]
+        if not len(shared):
+            return None
+        if all(np.allclose(stored[field][positions], columns[field][shared],
+                           rtol=ADJUSTMENT_TOLERANCE, atol=0, equal_nan=True) for field in ("o", "h", "l", "c")):
+            return None
+        first, stored_first = shared[0], positions[0]
+        price_factor = columns["c"][first] / stored["c"][stored_first]
+        # Splits rescale volume as well; dividends leave it alone
+        old_volume, new_volume = stored["v"][stored_first], columns["v"][first]
+        volume_factor = new_volume / old_volume if old_volume > 0 and new_volume > 0 else 1.0
+        return price_factor, volume_factor
+
+    def _fill_gap(self, symbol, interval, last, columns):
+        """
+        Prepend the bars between the stored `last` bar and `columns` from the
+        fetcher. Returns the combined columns, or None if the gap can't be filled.
+        """
+        if self.fetcher is None:
+            return None
+        start = pd.Timestamp(last, unit="s").strftime("%Y-%m-%d")
+        try:
+            missing = self.fetcher(symbol, interval, start)
+        except Exception as e:
+            print(f"Error fetching bars missing from {symbol} {interval}: {e}")
+            return None
+        if missing.empty:
+            return None
+        missing = hist_to_columns(missing)
+        earlier = missing["t"] < columns["t"][0]
+        combined = {field: np.concatenate((missing[field][earlier], columns[field])) for field in FIELDS}
+        return combined if combined["t"][0] <= last else None
+
+    def append(self, symbol, interval, hist):
+        """
+        Add the bars of a yfinance history DataFrame that are newer than the stored
+        series, replacing the last stored bar if it reappears. Returns bars appended.
+        """
+        if hist.empty:
+            return 0
+        columns = hist_to_columns(hist)
+        tz = str(hist.index.tz) if hist.index.tz is not None else "UTC"
+        path = self._dir(symbol, interval)
+
+        last = self.last_timestamp(symbol, interval)
+        if last is not None and columns["t"][0] > last:
+            # Fetched outside the lock; the network is slow and other series shouldn't wait
+            columns = self._fill_gap(symbol, interval, last, columns)
+            with self._lock:
+                if columns is None:
+                    self.skipped_gaps += 1
+                    print(f"Skipped appending to {symbol} {interval}: bars after the stored ones are missing")
+                    return 0
+                self.filled_gaps += 1
+
+        with self._locked(path):
+            try:
+                appended = self._append(path, columns, tz)
+            except Exception:
+                self.write_failures += 1
+                raise
+            self.appended_bars += appended
+        return appended
+
+    def _append(self, path, columns, tz):
+        # Caller holds the series lock
+        if self._meta(path) is not None:
+            self._repair(path)
+        last = self._last(path)
+        if last is None or self._meta(path) is None:
+            self._write(path, columns, tz)
+            return len(columns["t"])
+        t = columns["t"]
+        if t[0] > last:
+            # Another writer went back in time meanwhile; leave the series to the next append
+            return 0
+
+        factors = self._adjustment(path, columns, last)
+        if factors is not None:
+            # Re-adjusted history: rescale what precedes the new bars and rewrite the series
+            price_factor, volume_factor = factors
+            stored = self._columns(path)
+            keep = stored["t"] < t[0]
+            combined = {}
+            for field in FIELDS:
+                older = np.array(stored[field][keep])
+                if field in ("o", "h", "l", "c"):
+                    older *= price_factor
+                elif field == "v":
+                    older *= volume_factor
+                combined[field] = np.concatenate((older, columns[field]))
+            self._write(path, combined, tz)
+            self.readjustments += 1
+            return int((t > last).sum())
+
+        same = np.flatnonzero(t == last)
+        if len(same):
+            self._overwrite_last(path, {field: columns[field][same[-1]] for field in FIELDS})
+        newer = t > last
+        for field, dtype in FIELDS.items():
+            with open(os.path.join(path, f"{field}.bin"), "ab") as f:
+                f.write(columns[field][newer].astype(dtype).tobytes())
+        # Mark the series as synced even when upstream had nothing new
+        os.utime(os.path.join(path, "t.bin"))
+        return int(newer.sum())
+
+    def _repair(self, path):
+        # An interrupted append can leave some columns a row longer; cut them back to match
+        sizes = {field: os.path.getsize(os.path.join(path, f"{field}.bin")) // 8 for field in FIELDS}
+        length = min(sizes.values())
+        for field, size in sizes.items():
+            if size != length:
+                os.truncate(os.path.join(path, f"{field}.bin"), length * 8)
+
+    def _overwrite_last(self, path, row):
+        for field, dtype in FIELDS.items():
+            with open(os.path.join(path, f"{field}.bin"), "r+b") as f:
+                f.seek(-8, os.SEEK_END)
+                f.write(np.asarray([row[field]], dtype=dtype).tobytes())
+
+    def _write(self, path, columns, tz):
+        # Write into a sibling directory and swap it in, so readers never see a partial series
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for field, dtype in FIELDS.items():
+            with open(os.path.join(tmp_path, f"{field}.bin"), "wb") as f:
+                f.write(np.ascontiguousarray(columns[field], dtype=dtype).tobytes())
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump({"tz": tz}, f)
+
+        old_path = f"{path}.old"
+        # A swap interrupted before its cleanup leaves the old directory behind
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.isdir(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    def replace(self, symbol, interval, hist):
+        """
+        Overwrite the stored series with `hist`.
+        """
+        path = self._dir(symbol, interval)
+        tz = str(hist.index.tz) if hist.index.tz is not None else "UTC"
+        with self._locked(path):
+            try:
+                self._write(path, hist_to_columns(hist), tz)
+            except Exception:
+                self.write_failures += 1
+                raise
+            self.appended_bars += len(hist)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "reads": self.reads,
+                "appendedBars": self.appended_bars,
+                "readjustments": self.readjustments,
+                "filledGaps": self.filled_gaps,
+                "skippedGaps": self.skipped_gaps,
+                "writeFailures": self.write_failures,
+                "readLatency": self.read_latency.snapshot(),
+            }
+
+
+bar_store = BarStore(os.environ.get("BAR_STORE_DIR", DEFAULT_STORE_DIR))
+metrics.register("barStore", bar_store.stats)
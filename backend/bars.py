@@ -0,0 +1,127 @@
+import numpy as np
+
+
+def hist_to_columns(hist):
+    """
+    Convert a yfinance history DataFrame into plain NumPy columns.
+
+    `t` holds bar timestamps as UTC epoch seconds, `labels` the bar dates as
+    'YYYY-MM-DD' strings, and `o`/`h`/`l`/`c`/`v` the float64 OHLCV values.
+    """
+    index = hist.index
+    local = index.tz_localize(None) if index.tz is not None else index
+    utc = index.tz_convert("UTC").tz_localize(None) if index.tz is not None else index
+
+    return {
+        "t": utc.values.astype("datetime64[s]").astype(np.int64),
+        # Labels use the exchange-local date, matching the previous strftime('%Y-%m-%d') output
+        "labels": np.datetime_as_string(local.values.astype("datetime64[D]")),
+        "o": hist["Open"].to_numpy(dtype=np.float64),
+        "h": hist["High"].to_numpy(dtype=np.float64),
+        "l": hist["Low"].to_numpy(dtype=np.float64),
+        "c": hist["Close"].to_numpy(dtype=np.float64),
+        "v": hist["Volume"].to_numpy(dtype=np.float64) if "Volume" in hist else np.zeros(len(hist)),
+    }
+
+
+def chart_payload(columns, max_points=None):
+    """
+    Build the Chart.js payload (`labels`, `data`, `candleData`) from bar columns.
+
+    With `max_points`, a longer series is downsampled: the close line keeps the
+    LTTB-selected bars and the candles are merged into OHLC buckets, so both
+    carry at most `max_points` entries.
+    """
+    line = columns
+    candles = columns
+    if max_points is not None and len(columns["t"]) > max_points:
+        indices = lttb_indices(columns["t"], columns["c"], max_points)
+        line = {field: columns[field][indices] for field in ("labels", "c")}
+        candles = ohlc_buckets(columns, max_points)
+
+    labels = line["labels"].tolist()
+    closes = line["c"].tolist()
+
+    candle_data = [
+        {"x": x, "o": o, "h": h, "l": l, "c": c}
+        for x, o, h, l, c in zip(
+            candles["labels"].tolist(), candles["o"].tolist(), candles["h"].tolist(),
+            candles["l"].tolist(), candles["c"].tolist(),
+        )
+    ]
+    return {"labels": labels, "data": closes, "candleData": candle_data}
+
+
+def compact_payload(columns, max_points=None):
+    """
+    Build the compact columnar payload: one array per field, epoch seconds in `t`.
+    With `max_points`, a longer series is merged into that many OHLC buckets.
+    """
+    if max_points is not None and len(columns["t"]) > max_points:
+        columns = ohlc_buckets(columns, max_points)
+    return {
+        "t": columns["t"].tolist(),
+        "o": columns["o"].tolist(),
+        "h": columns["h"].tolist(),
+        "l": columns["l"].tolist(),
+        "c": columns["c"].tolist(),
+        "v": columns["v"].tolist(),
+    }
+
+
+def lttb_indices(x, y, n):
+    """
+    Indices of the `n` points Largest-Triangle-Three-Buckets keeps from (x, y).
+
+    The first and last points are always kept. The rest are split into n - 2
+    equal buckets, and each bucket keeps the point forming the largest triangle
+    with the point kept from the previous bucket and the mean of the next one.
+    Each choice depends on the previous one, so buckets are walked in order, but
+    all per-point work is done on whole NumPy slices.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    length = len(x)
+    if n >= length or n < 3:
+        return np.arange(length)
+
+    edges = (np.arange(n - 1) * (length - 2) / (n - 2)).astype(np.intp) + 1
+    edges[-1] = length - 1
+    # Mean of each bucket, plus the last point standing in as the "bucket" after the final one
+    sums_x = np.add.reduceat(x[1:length - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:length - 1], edges[:-1] - 1)
+    widths = np.diff(edges)
+    mean_x = np.append(sums_x / widths, x[-1])
+    mean_y = np.append(sums_y / widths, y[-1])
+
+    indices = np.empty(n, dtype=np.intp)
+    indices[0] = 0
+    indices[-1] = length - 1
+    a = 0
+    for bucket in range(n - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        cx, cy = mean_x[bucket + 1], mean_y[bucket + 1]
+        # Twice the triangle area; the constant factor does not change the argmax
+        areas = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(areas))
+        indices[bucket + 1] = a
+    return indices
+
+
+def ohlc_buckets(columns, n):
+    """
+    Merge bar columns into `n` consecutive buckets: first open, highest high,
+    lowest low, last close and summed volume, labelled by each bucket's first bar.
+    """
+    length = len(columns["t"])
+    starts = np.unique((np.arange(n) * length / n).astype(np.intp))
+    ends = np.append(starts[1:], length) - 1
+    return {
+        "t": columns["t"][starts],
+        "labels": columns["labels"][starts],
+        "o": columns["o"][starts],
+        "h": np.maximum.reduceat(columns["h"], starts),
+        "l": np.minimum.reduceat(columns["l"], starts),
+        "c": columns["c"][ends],
+        "v": np.add.reduceat(columns["v"], starts),
+    }
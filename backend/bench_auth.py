@@ -0,0 +1,99 @@
+"""
+Benchmark local Firebase ID token verification with locally generated keys.
+
+Signs tokens with a throwaway RSA key and a self-signed certificate standing in
+for Google's, then reports verifications per second for first-seen tokens (a
+full RS256 check) and for repeat tokens (served from the claims cache). It also
+checks that expired, foreign-audience and wrongly signed tokens are rejected.
+
+Usage:
+    python bench_auth.py [--tokens 2000] [--repeats 20]
+"""
+import argparse
+import datetime
+import time
+
+import jwt
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+from auth_tokens import AuthError, FirebaseTokenVerifier
+
+PROJECT_ID = "wavecap-bench"
+
+
+def make_signing_key():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken.bench")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    return key, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+def make_token(key, kid, uid, audience=PROJECT_ID, expires_in=3600):
+    now = int(time.time())
+    claims = {
+        "iss": f"https://securetoken.google.com/{audience}",
+        "aud": audience,
+        "sub": uid,
+        "iat": now,
+        "exp": now + expires_in,
+        "auth_time": now,
+    }
+    return jwt.encode(claims, key, algorithm="RS256", headers={"kid": kid})
+
+
+def expect_rejected(verifier, token, label):
+    try:
+        verifier.verify(token)
+    except AuthError:
+        print(f"rejected as expected: {label}")
+    else:
+        raise SystemExit(f"accepted a bad token: {label}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark local ID token verification.")
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    key, cert_pem = make_signing_key()
+    verifier = FirebaseTokenVerifier(PROJECT_ID, fetch_certs=lambda: ({"bench-kid": cert_pem}, 3600))
+    tokens = [make_token(key, "bench-kid", f"user-{i}") for i in range(args.tokens)]
+
+    start = time.perf_counter()
+    for token in tokens:
+        verifier.verify(token)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.repeats):
+        for token in tokens:
+            verifier.verify(token)
+    warm = time.perf_counter() - start
+
+    print(f"first-seen tokens: {args.tokens / cold:,.0f} verifications/s ({cold / args.tokens * 1e6:.1f} us each)")
+    print(f"cached tokens:     {args.tokens * args.repeats / warm:,.0f} verifications/s "
+          f"({warm / (args.tokens * args.repeats) * 1e6:.2f} us each)")
+
+    other_key, _ = make_signing_key()
+    expect_rejected(verifier, make_token(key, "bench-kid", "late", expires_in=-3600), "expired")
+    expect_rejected(verifier, make_token(key, "bench-kid", "foreign", audience="other-project"), "wrong audience")
+    expect_rejected(verifier, make_token(other_key, "bench-kid", "forged"), "wrong signature")
+    print(verifier.stats())
+
+
+if __name__ == "__main__":
+    main()
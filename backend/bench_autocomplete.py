@@ -0,0 +1,56 @@
+"""
+Benchmark /autocomplete lookups against the in-memory symbol index.
+
+Replays every 1-4 character prefix of each symbol and each company-name word,
+the way Homepage.js issues one request per keystroke, and reports latency
+percentiles per query length.
+
+Usage:
+    python bench_autocomplete.py [--rounds 3]
+"""
+import argparse
+import time
+
+from symbol_index import SymbolIndex
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the autocomplete symbol index.")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = SymbolIndex.from_csv()
+    print(f"Built index over {len(index)} listings in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    queries = set()
+    for symbol, name, _ in index.listings:
+        for word in [symbol] + name.upper().split():
+            for length in range(1, min(len(word), 4) + 1):
+                queries.add(word[:length])
+    queries = sorted(queries)
+
+    timings = {}
+    for _ in range(args.rounds):
+        for query in queries:
+            start = time.perf_counter_ns()
+            index.search(query, limit=5)
+            elapsed_us = (time.perf_counter_ns() - start) / 1000
+            timings.setdefault(len(query), []).append(elapsed_us)
+
+    all_timings = sorted(t for values in timings.values() for t in values)
+    print(f"{len(queries)} distinct queries x {args.rounds} rounds")
+    print(f"{'length':>6} {'queries':>8} {'p50 us':>8} {'p99 us':>8}")
+    for length in sorted(timings):
+        values = sorted(timings[length])
+        print(f"{length:>6} {len(values):>8} {percentile(values, 50):>8.1f} {percentile(values, 99):>8.1f}")
+    print(f"{'all':>6} {len(all_timings):>8} {percentile(all_timings, 50):>8.1f} {percentile(all_timings, 99):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark the indicator engine against naive per-bar implementations.
+
+For each indicator, times three ways of producing the series over a
+synthetic intraday history:
+  naive        a Python loop over bars, recomputing each window from scratch
+  full         a vectorized computation of the whole series (cold cache)
+  incremental  the cached series topped up with one newly appended bar
+
+Usage:
+    python bench_indicators.py [--bars 5000] [--repeats 5]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from indicators import IndicatorCache
+
+
+def naive_sma(columns, window=20):
+    c = columns["c"]
+    return [sum(c[i - window + 1:i + 1]) / window if i >= window - 1 else None for i in range(len(c))]
+
+
+def naive_bollinger(columns, window=20, k=2.0):
+    c = columns["c"]
+    out = []
+    for i in range(len(c)):
+        if i < window - 1:
+            out.append(None)
+            continue
+        values = c[i - window + 1:i + 1]
+        mean = sum(values) / window
+        std = (sum((v - mean) ** 2 for v in values) / window) ** 0.5
+        out.append((mean - k * std, mean, mean + k * std))
+    return out
+
+
+def _naive_ema(values, alpha):
+    out, y = [], None
+    for x in values:
+        y = x if y is None else alpha * x + (1 - alpha) * y
+        out.append(y)
+    return out
+
+
+def naive_ema(columns, window=20):
+    return _naive_ema(columns["c"], 2 / (window + 1))
+
+
+def naive_rsi(columns, period=14):
+    c = columns["c"]
+    out, gain, loss = [], None, None
+    for i in range(len(c)):
+        change = c[i] - c[i - 1] if i else 0.0
+        g, l = max(change, 0.0), max(-change, 0.0)
+        gain = g if gain is None else gain + (g - gain) / period
+        loss = l if loss is None else loss + (l - loss) / period
+        out.append(100 - 100 / (1 + gain / loss) if loss else 100.0)
+    return out
+
+
+def naive_macd(columns, fast=12, slow=26, signal=9):
+    line = [f - s for f, s in zip(_naive_ema(columns["c"], 2 / (fast + 1)), _naive_ema(columns["c"], 2 / (slow + 1)))]
+    return line, _naive_ema(line, 2 / (signal + 1))
+
+
+def naive_vwap(columns):
+    out, pv, v, session = [], 0.0, 0.0, None
+    for i in range(len(columns["c"])):
+        if columns["labels"][i] != session:
+            pv, v, session = 0.0, 0.0, columns["labels"][i]
+        typical = (columns["h"][i] + columns["l"][i] + columns["c"][i]) / 3
+        pv += typical * columns["v"][i]
+        v += columns["v"][i]
+        out.append(pv / v if v else None)
+    return out
+
+
+NAIVE = {
+    "sma": naive_sma,
+    "ema": naive_ema,
+    "rsi": naive_rsi,
+    "macd": naive_macd,
+    "bollinger": naive_bollinger,
+    "vwap": naive_vwap,
+}
+
+
+def best_of(repeats, fn):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indicator computation.")
+    parser.add_argument("--bars", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, args.bars + 1)))
+    t = 1_700_000_000 + 300 * np.arange(args.bars + 1)
+    columns = {
+        "t": t,
+        "labels": np.datetime_as_string(t.astype("datetime64[s]").astype("datetime64[D]")),
+        "o": closes, "h": closes * 1.001, "l": closes * 0.999, "c": closes,
+        "v": rng.integers(100, 10000, args.bars + 1).astype(np.float64),
+    }
+    # The naive loops get plain lists, as a per-bar implementation would
+    as_lists = {field: values[:args.bars].tolist() for field, values in columns.items()}
+    history = {field: values[:args.bars] for field, values in columns.items()}
+    # The same trailing window one bar later
+    appended = {field: values[1:] for field, values in columns.items()}
+
+    print(f"{args.bars} bars, best of {args.repeats}")
+    print(f"{'':>10} {'naive':>10} {'full':>10} {'incremental':>12}")
+    for name, naive in NAIVE.items():
+        naive_ms = best_of(args.repeats, lambda: naive(as_lists))
+        full_ms = best_of(args.repeats, lambda: IndicatorCache().compute("BENCH", "5m", name, {}, history))
+
+        def top_up():
+            cache = IndicatorCache()
+            cache.compute("BENCH", "5m", name, {}, history)
+            start = time.perf_counter()
+            cache.compute("BENCH", "5m", name, {}, appended)
+            return time.perf_counter() - start
+
+        incremental_ms = min(top_up() for _ in range(args.repeats)) * 1000
+        print(f"{name:>10} {naive_ms:8.2f} ms {full_ms:7.2f} ms {incremental_ms:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark the parameter sweep at increasing worker counts.
+
+Runs the same sma_crossover grid over synthetic closes with 1, 2, 4, ...
+workers (up to --max-workers, default the CPU count) and reports the wall
+time and speedup over one worker. Each worker count gets a fresh pool, and
+the pool is warmed up first so process startup isn't timed.
+
+Usage:
+    python bench_sweep.py [--bars 5000] [--symbols 100] [--max-workers N]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from sweep import ParameterSweep, expand_grid, rank
+
+GRID = {"fast": [5, 10, 15, 20, 30], "slow": [50, 100, 150, 200], "exposure": [0.5, 1.0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the parameter sweep.")
+    parser.add_argument("--bars", type=int, default=5000)
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (args.bars, args.symbols)), axis=0))
+    configs = expand_grid("sma_crossover", GRID)
+    print(f"{len(configs)} configurations, {args.bars} bars x {args.symbols} symbols "
+          f"({closes.nbytes / 1e6:.1f} MB shared)")
+
+    workers, baseline = 1, None
+    while workers <= args.max_workers:
+        sweep = ParameterSweep(workers=workers)
+        list(sweep.run(closes, "sma_crossover", configs[:workers], 1_000_000))
+
+        start = time.perf_counter()
+        results = list(sweep.run(closes, "sma_crossover", configs, 1_000_000, cost_bps=5))
+        elapsed = time.perf_counter() - start
+        sweep._pool.shutdown()
+        baseline = baseline or elapsed
+        best = rank(results)[0]
+        print(f"{workers:>3} workers: {elapsed:6.2f} s, speedup {baseline / elapsed:4.2f}x, "
+              f"best {best['params']} {best['profitLossPct']:+.2f}% / {best['maxDrawdown']:.2f}%")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
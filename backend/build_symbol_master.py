@@ -0,0 +1,110 @@
+"""
+Build data/symbols.csv, the symbol master used by the /autocomplete index.
+
+Usage:
+    python build_symbol_master.py [--sec-tickers company_tickers_exchange.json]
+                                  [--nasdaq-listed nasdaqlisted.txt] [--other-listed otherlisted.txt]
+
+--sec-tickers is the SEC's ticker/exchange file
+(https://www.sec.gov/files/company_tickers_exchange.json); its exchange-listed
+rows are added, and its OTC rows only name symbols already in the master. The
+listing files are the pipe-delimited NASDAQ Trader symbol directory files
+(https://www.nasdaqtrader.com/dynamic/SymDir/) and take precedence over the SEC
+file. Without any of them the master is built from the symbols we ship ticker
+icons for plus PREDEFINED_TICKERS.
+"""
+import argparse
+import csv
+import json
+import os
+
+from config import PREDEFINED_TICKERS
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ICONS_DIR = os.path.join(ROOT_DIR, "public", "ticker_icons")
+OUTPUT_PATH = os.path.join(ROOT_DIR, "data", "symbols.csv")
+
+# NASDAQ Trader exchange codes used in otherlisted.txt
+EXCHANGE_CODES = {"A": "NYSE American", "N": "NYSE", "P": "NYSE Arca", "Z": "Cboe BZX", "V": "IEX"}
+# Exchange names in the SEC ticker file for exchange-listed securities
+SEC_LISTED_EXCHANGES = {"Nasdaq", "NYSE", "CBOE"}
+
+
+def read_listing(path, symbol_field, exchange):
+    """
+    Yield (symbol, name, exchange) rows from a NASDAQ Trader listing file.
+    """
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f, delimiter="|"):
+            symbol = row.get(symbol_field, "")
+            # The last line of each file is a "File Creation Time" footer
+            if not symbol or symbol.startswith("File Creation Time") or row.get("Test Issue") == "Y":
+                continue
+            row_exchange = exchange or EXCHANGE_CODES.get(row.get("Exchange", ""), "")
+            yield symbol.replace("$", "-"), row.get("Security Name", "").strip(), row_exchange
+
+
+def read_sec_tickers(path):
+    """
+    Yield (symbol, name, exchange) rows from the SEC's company_tickers_exchange.json.
+    """
+    with open(path) as f:
+        table = json.load(f)
+    fields = table["fields"]
+    for values in table["data"]:
+        row = dict(zip(fields, values))
+        if row.get("ticker"):
+            yield row["ticker"].upper(), (row.get("name") or "").strip(), row.get("exchange") or ""
+
+
+def build(nasdaq_listed=None, other_listed=None, sec_tickers=None):
+    listings = {}
+
+    if os.path.isdir(ICONS_DIR):
+        for filename in os.listdir(ICONS_DIR):
+            symbol, ext = os.path.splitext(filename)
+            if ext == ".png":
+                listings[symbol.upper()] = ("", "")
+
+    if sec_tickers:
+        for symbol, name, exchange in read_sec_tickers(sec_tickers):
+            # OTC and unlisted issuers can't be traded through Alpaca, so they only name icons we ship
+            if exchange in SEC_LISTED_EXCHANGES or symbol in listings:
+                listings[symbol] = (name, exchange if exchange in SEC_LISTED_EXCHANGES else "")
+
+    if nasdaq_listed:
+        for symbol, name, exchange in read_listing(nasdaq_listed, "Symbol", "NASDAQ"):
+            listings[symbol] = (name, exchange)
+    if other_listed:
+        for symbol, name, exchange in read_listing(other_listed, "ACT Symbol", None):
+            listings[symbol] = (name, exchange)
+
+    # Curated names take precedence over listing names
+    for ticker in PREDEFINED_TICKERS:
+        _, exchange = listings.get(ticker["symbol"], ("", ""))
+        listings[ticker["symbol"]] = (ticker["name"], exchange)
+
+    return listings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the autocomplete symbol master.")
+    parser.add_argument("--nasdaq-listed", help="Path to nasdaqlisted.txt")
+    parser.add_argument("--other-listed", help="Path to otherlisted.txt")
+    parser.add_argument("--sec-tickers", help="Path to company_tickers_exchange.json")
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    listings = build(args.nasdaq_listed, args.other_listed, args.sec_tickers)
+    with open(args.output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["symbol", "name", "exchange"])
+        for symbol in sorted(listings):
+            name, exchange = listings[symbol]
+            writer.writerow([symbol, name, exchange])
+
+    print(f"Wrote {len(listings)} symbols to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
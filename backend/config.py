@@ -1,6 +1,6 @@
 from flask import Flask
 from flask_cors import CORS
-from flask_session import Session
+from session_store import create_session_interface
 import os
 
 app = Flask(__name__)
@@ -8,6 +8,15 @@ app.secret_key = "a2ea490452f07b815f2ee39eaab6d1fc519cc2144d34d312535a27a20109e9
 
 CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
 
+# Server-side sessions: "memory" for a single node, "redis" to share sessions across workers
+app.session_interface = create_session_interface(
+    backend=os.environ.get("SESSION_BACKEND", "memory"),
+    ttl=int(os.environ.get("SESSION_TTL", 86400)),
+    max_entries=int(os.environ.get("SESSION_MAX_ENTRIES", 10000)),
+    redis_url=os.environ.get("SESSION_REDIS_URL"),
+    sweep_interval=int(os.environ.get("SESSION_SWEEP_INTERVAL", 300)),
+)
+
 
 PREDEFINED_TICKERS = [
     {"symbol": "AAPL", "name": "Apple Inc."},
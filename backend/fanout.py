@@ -0,0 +1,42 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Shared pool for issuing independent upstream calls from one request concurrently
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("FANOUT_WORKERS", 32)),
+    thread_name_prefix="fanout",
+)
+
+
+def first_result(calls, accept=lambda result: result is not None):
+    """
+    Run the zero-argument `calls` concurrently and return the first accepted result.
+
+    Calls that raise or return an unaccepted result are skipped. Returns None if no
+    call produces an accepted result.
+    """
+    futures = [_executor.submit(call) for call in calls]
+    try:
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception:
+                continue
+            if accept(result):
+                return result
+        return None
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def gather(calls, max_concurrency=8):
+    """
+    Run the zero-argument `calls` with at most `max_concurrency` in flight and
+    return their results in order. The first exception raised is propagated.
+    """
+    if not calls:
+        return []
+    # A dedicated pool per batch bounds its parallelism and cannot starve first_result()
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(calls)), thread_name_prefix="gather") as executor:
+        return list(executor.map(lambda call: call(), calls))
@@ -0,0 +1,132 @@
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# Statuses worth retrying: rate limiting and transient gateway/upstream failures
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class HttpClient:
+    """
+    Shared outbound HTTP client for every third-party integration.
+
+    Keeps one requests.Session per upstream (scheme and host), so keep-alive
+    connections are reused while cookies set by one provider are never sent to
+    another. Applies connect/read timeouts to every call, and retries transient
+    failures with exponential backoff and full jitter. Only idempotent methods are
+    retried by default; pass `retries=` to opt a POST in. Latency is recorded per
+    host and exposed under `http` in /metrics.
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=20, connect_timeout=3.05, read_timeout=30,
+                 max_retries=2, backoff_base=0.25, backoff_max=4.0):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # pool_connections is the number of per-host pools kept, pool_maxsize the connections per host
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+
+        self._sessions = {}
+        self._latency = {}
+        self._errors = {}
+        self._retries = {}
+        self._lock = threading.Lock()
+
+    def request(self, method, url, retries=None, timeout=None, **kwargs):
+        """
+        Send a request through the pooled session. Returns the final requests.Response.
+        """
+        method = method.upper()
+        if retries is None:
+            retries = self.max_retries if method in IDEMPOTENT_METHODS else 0
+        timeout = timeout or (self.connect_timeout, self.read_timeout)
+        parts = urlsplit(url)
+        host = parts.netloc
+        session = self._session(parts.scheme, host)
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._observe(host, time.perf_counter() - start, error=True)
+                if attempt >= retries:
+                    raise
+            else:
+                self._observe(host, time.perf_counter() - start)
+                if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return response
+                response.close()
+
+            attempt += 1
+            with self._lock:
+                self._retries[host] = self._retries.get(host, 0) + 1
+            time.sleep(self._backoff(attempt))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def _session(self, scheme, host):
+        key = (scheme, host)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize,
+                                      max_retries=0)
+                session = self._sessions[key] = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+            return session
+
+    def _backoff(self, attempt):
+        # Full jitter: uniform over [0, capped exponential delay]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _observe(self, host, seconds, error=False):
+        with self._lock:
+            histogram = self._latency.get(host)
+            if histogram is None:
+                histogram = self._latency[host] = metrics.LatencyHistogram()
+            if error:
+                self._errors[host] = self._errors.get(host, 0) + 1
+        histogram.observe(seconds)
+
+    def stats(self):
+        with self._lock:
+            hosts = dict(self._latency)
+            errors = dict(self._errors)
+            retries = dict(self._retries)
+        return {
+            host: {
+                "latency": histogram.snapshot(),
+                "errors": errors.get(host, 0),
+                "retries": retries.get(host, 0),
+            }
+            for host, histogram in hosts.items()
+        }
+
+
+http_client = HttpClient(
+    pool_connections=int(os.environ.get("HTTP_POOL_CONNECTIONS", 10)),
+    pool_maxsize=int(os.environ.get("HTTP_POOL_MAXSIZE", 20)),
+    connect_timeout=float(os.environ.get("HTTP_CONNECT_TIMEOUT", 3.05)),
+    read_timeout=float(os.environ.get("HTTP_READ_TIMEOUT", 30)),
+    max_retries=int(os.environ.get("HTTP_MAX_RETRIES", 2)),
+)
+metrics.register("http", http_client.stats)
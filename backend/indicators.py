@@ -0,0 +1,308 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+import metrics
+
+# Intervals whose bars fall inside a trading session; VWAP restarts each session for these
+INTRADAY_INTERVALS = ("1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h")
+# EMA runs up to this many bars long are stepped in Python
+SHORT_RUN = 16
+
+
+# Each indicator is step(state, columns, **params) -> (outputs, state). `state` is
+# None for a fresh series, or what the previous step returned; `columns` holds the
+# bars that follow it. Steps never modify the state they are given, so a cached
+# state can be resumed from more than once.
+
+
+def _ema_run(values, alpha, prev):
+    """
+    Continue the EMA recurrence y = alpha * x + (1 - alpha) * y_prev from `prev`,
+    or start it at the first value when `prev` is None. Returns (ema, last value).
+    """
+    if len(values) == 0:
+        return np.empty(0), prev
+    if prev is not None and len(values) <= SHORT_RUN:
+        # A top-up of a few bars is cheaper as a plain loop than a pandas call
+        ema = np.empty(len(values))
+        for i, value in enumerate(values.tolist()):
+            prev = ema[i] = alpha * value + (1 - alpha) * prev
+        return ema, float(prev)
+    if prev is None:
+        ema = pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy(copy=True)
+    else:
+        # Leading with the previous EMA makes pandas resume the recurrence from it
+        ema = pd.Series(np.concatenate(([prev], values))).ewm(alpha=alpha, adjust=False).mean().to_numpy(copy=True)[1:]
+    return ema, float(ema[-1])
+
+
+def _warm_up(values, seen, bars):
+    # Blank the first `bars` outputs of a series, `seen` bars of which came before `values`
+    values[:max(0, bars - seen)] = np.nan
+    return values
+
+
+def _rolling(values, tail, window):
+    """
+    Trailing windows of `window` values ending at each of `values`, preceded by
+    the `tail` kept from earlier bars. Returns (windows, first index with a full
+    window, new tail).
+    """
+    data = np.concatenate((tail, values))
+    first = max(0, window - 1 - len(tail))
+    windows = sliding_window_view(data, window) if len(data) >= window else np.empty((0, window))
+    return windows, first, data[max(0, len(data) - (window - 1)):] if window > 1 else data[:0]
+
+
+def sma(state, columns, window=20):
+    window = int(window)
+    if window < 1:
+        raise ValueError("window must be at least 1 bar")
+    tail = state["tail"] if state else np.empty(0)
+    windows, first, tail = _rolling(columns["c"], tail, window)
+    out = np.full(len(columns["c"]), np.nan)
+    out[first:] = windows.mean(axis=1)[-(len(out) - first):] if len(out) > first else []
+    return {"sma": out}, {"tail": tail}
+
+
+def bollinger(state, columns, window=20, k=2.0):
+    window = int(window)
+    if window < 1:
+        raise ValueError("window must be at least 1 bar")
+    tail = state["tail"] if state else np.empty(0)
+    windows, first, tail = _rolling(columns["c"], tail, window)
+    middle = np.full(len(columns["c"]), np.nan)
+    width = np.full(len(columns["c"]), np.nan)
+    if len(middle) > first:
+        windows = windows[-(len(middle) - first):]
+        middle[first:] = windows.mean(axis=1)
+        width[first:] = float(k) * windows.std(axis=1)
+    return {"middle": middle, "upper": middle + width, "lower": middle - width}, {"tail": tail}
+
+
+def ema(state, columns, window=20):
+    window = int(window)
+    if window < 1:
+        raise ValueError("window must be at least 1 bar")
+    state = state or {"ema": None, "seen": 0}
+    out, last = _ema_run(columns["c"], 2.0 / (window + 1), state["ema"])
+    return ({"ema": _warm_up(out, state["seen"], window - 1)},
+            {"ema": last, "seen": state["seen"] + len(out)})
+
+
+def rsi(state, columns, period=14):
+    """
+    Wilder's RSI: gains and losses smoothed with alpha = 1 / period.
+    """
+    period = int(period)
+    if period < 1:
+        raise ValueError("period must be at least 1 bar")
+    state = state or {"close": None, "gain": None, "loss": None, "seen": 0}
+    closes = columns["c"]
+    if len(closes) == 0:
+        return {"rsi": np.empty(0)}, state
+    previous = closes[0] if state["close"] is None else state["close"]
+    changes = np.diff(closes, prepend=previous)
+    gain, last_gain = _ema_run(np.clip(changes, 0, None), 1.0 / period, state["gain"])
+    loss, last_loss = _ema_run(np.clip(-changes, 0, None), 1.0 / period, state["loss"])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = np.where(loss == 0, np.where(gain == 0, 50.0, 100.0), 100.0 - 100.0 / (1.0 + gain / loss))
+    # The first bar has no change, so a full period of changes needs period + 1 bars
+    return ({"rsi": _warm_up(out, state["seen"], period)},
+            {"close": float(closes[-1]), "gain": last_gain, "loss": last_loss, "seen": state["seen"] + len(out)})
+
+
+def macd(state, columns, fast=12, slow=26, signal=9):
+    fast, slow, signal = int(fast), int(slow), int(signal)
+    if min(fast, slow, signal) < 1:
+        raise ValueError("fast, slow and signal must be at least 1 bar")
+    state = state or {"fast": None, "slow": None, "signal": None, "seen": 0}
+    fast_ema, last_fast = _ema_run(columns["c"], 2.0 / (fast + 1), state["fast"])
+    slow_ema, last_slow = _ema_run(columns["c"], 2.0 / (slow + 1), state["slow"])
+    line = fast_ema - slow_ema
+    signal_line, last_signal = _ema_run(line, 2.0 / (signal + 1), state["signal"])
+    seen = state["seen"]
+    warm = max(fast, slow) - 1
+    return (
+        {
+            "macd": _warm_up(line.copy(), seen, warm),
+            "signal": _warm_up(signal_line.copy(), seen, warm + signal - 1),
+            "histogram": _warm_up(line - signal_line, seen, warm + signal - 1),
+        },
+        {"fast": last_fast, "slow": last_slow, "signal": last_signal, "seen": seen + len(line)},
+    )
+
+
+def vwap(state, columns, intraday=False):
+    """
+    Volume-weighted average of the typical price (h + l + c) / 3. Intraday bars
+    restart it every session (exchange-local date); longer bars accumulate over
+    the whole series.
+    """
+    typical = (columns["h"] + columns["l"] + columns["c"]) / 3.0
+    volume = columns["v"]
+    if len(volume) == 0:
+        return {"vwap": np.empty(0)}, state
+    sessions = columns["labels"] if intraday else np.full(len(volume), "")
+    state = state or {"session": None, "pv": 0.0, "v": 0.0}
+
+    new_session = np.concatenate(([True], sessions[1:] != sessions[:-1]))
+    starts = np.flatnonzero(new_session)
+    segment = np.cumsum(new_session) - 1
+    cum_pv = np.cumsum(typical * volume)
+    cum_v = np.cumsum(volume)
+    # Running sums restart at each session start...
+    cum_pv -= (cum_pv - typical * volume)[starts][segment]
+    cum_v -= (cum_v - volume)[starts][segment]
+    # ...except the first session when it continues the previous step's
+    if sessions[0] == state["session"]:
+        cum_pv[segment == 0] += state["pv"]
+        cum_v[segment == 0] += state["v"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = np.where(cum_v > 0, cum_pv / cum_v, np.nan)
+    return {"vwap": out}, {"session": str(sessions[-1]), "pv": float(cum_pv[-1]), "v": float(cum_v[-1])}
+
+
+# name -> (step, positional params in query order)
+INDICATORS = {
+    "sma": (sma, ("window",)),
+    "ema": (ema, ("window",)),
+    "rsi": (rsi, ("period",)),
+    "macd": (macd, ("fast", "slow", "signal")),
+    "bollinger": (bollinger, ("window", "k")),
+    "vwap": (vwap, ()),
+}
+
+
+def parse_spec(spec):
+    """
+    Parse "macd:12:26:9" into ("macd", {"fast": 12.0, "slow": 26.0, "signal": 9.0}).
+    Omitted trailing params keep their defaults. Raises ValueError on bad input.
+    """
+    name, *values = spec.strip().lower().split(":")
+    if name not in INDICATORS:
+        raise ValueError(f"Unknown indicator '{name}'. Valid indicators: {', '.join(INDICATORS)}.")
+    names = INDICATORS[name][1]
+    if len(values) > len(names):
+        raise ValueError(f"{name} takes at most {len(names)} parameter(s)")
+    try:
+        return name, {param: float(value) for param, value in zip(names, values)}
+    except ValueError:
+        raise ValueError(f"Parameters for {name} must be numbers") from None
+
+
+def json_series(values):
+    """
+    List form of an indicator series; JSON has no NaN, so warm-up bars become None.
+    """
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+def _slice(columns, part):
+    return {field: columns[field][part] for field in ("t", "labels", "h", "l", "c", "v")}
+
+
+class _Entry:
+    __slots__ = ("t", "outputs", "state")
+
+    def __init__(self, t, outputs, state):
+        self.t = t
+        self.outputs = outputs
+        # State after every bar but the last, which may still be revised
+        self.state = state
+
+
+class IndicatorCache:
+    """
+    Memoized indicator series per (symbol, interval, indicator, params).
+
+    Each entry keeps the computed series for the bars it has seen and the
+    indicator state as of the second-to-last bar. When the bars come back with
+    new ones appended, only the bars after that point are stepped through, so
+    the still-forming last bar is recomputed and older ones are not. Recursive
+    indicators (EMA, RSI, MACD) carry their state from the first bar the entry
+    saw, so they keep warming up beyond the chart window.
+    """
+
+    def __init__(self, max_entries=2000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.full = 0
+        self.incremental = 0
+        self.stepped_bars = 0
+
+    def compute(self, symbol, interval, name, params, columns):
+        """
+        Return {output: array} aligned with columns["t"].
+        """
+        step, _ = INDICATORS[name]
+        if name == "vwap":
+            params = {**params, "intraday": interval in INTRADAY_INTERVALS}
+        key = (symbol.upper(), interval, name, tuple(sorted(params.items())))
+        t = np.asarray(columns["t"])
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        resume = self._resume_point(entry, t) if entry is not None else None
+        if resume is None:
+            state, outputs, begin = None, None, 0
+        else:
+            kept, begin = resume
+            state = entry.state
+            outputs = {field: values[kept:len(entry.t) - 1] for field, values in entry.outputs.items()}
+
+        # Step through the settled bars and keep that state, then through the last bar alone
+        settled, settled_state = step(state, _slice(columns, slice(begin, len(t) - 1)), **params)
+        last, _ = step(settled_state, _slice(columns, slice(len(t) - 1, None)), **params)
+        parts = [settled, last] if outputs is None else [outputs, settled, last]
+        outputs = {field: np.concatenate([part[field] for part in parts]) for field in last}
+
+        with self._lock:
+            if resume is None:
+                self.full += 1
+            else:
+                self.incremental += 1
+            self.stepped_bars += len(t) - begin
+            self._entries[key] = _Entry(np.array(t), outputs, settled_state)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return outputs
+
+    def _resume_point(self, entry, t):
+        """
+        Return (first cached bar still in `t`, first bar of `t` to step through), or
+        None if `t` doesn't extend the cached bars and everything must be recomputed.
+        """
+        settled = len(entry.t) - 1
+        if settled < 1 or len(t) < 2:
+            return None
+        kept = int(np.searchsorted(entry.t, t[0]))
+        resume = int(np.searchsorted(t, entry.t[settled - 1])) + 1
+        if (kept >= settled or entry.t[kept] != t[0] or resume > len(t) - 1
+                or t[resume - 1] != entry.t[settled - 1] or resume != settled - kept):
+            return None
+        return kept, resume
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "fullComputes": self.full,
+                "incrementalUpdates": self.incremental,
+                "steppedBars": self.stepped_bars,
+            }
+
+
+indicator_cache = IndicatorCache(max_entries=int(os.environ.get("INDICATOR_CACHE_SIZE", 2000)))
+metrics.register("indicators", indicator_cache.stats)
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+
+def request_key(model, messages, temperature, top_p, max_tokens):
+    """
+    Hash a completion request so trivially different spellings of the same prompt share an entry.
+    """
+    normalized = {
+        "model": model.strip().lower(),
+        # Collapse runs of whitespace so reformatted prompts still match
+        "messages": [[m.get("role", ""), " ".join(str(m.get("content", "")).split())] for m in messages],
+        "temperature": round(float(temperature), 3),
+        "top_p": round(float(top_p), 3),
+        "max_tokens": int(max_tokens),
+    }
+    encoded = json.dumps(normalized, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    LRU cache of chat completion responses keyed by request_key, with a TTL.
+
+    Each entry remembers how long the upstream completion took, so every hit
+    adds that to the saved-latency counter. With `disk_path` set, entries are
+    also written to a SQLite file and read back on a memory miss, so the cache
+    survives restarts.
+    """
+
+    def __init__(self, max_entries=1000, ttl=6 * 60 * 60, disk_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_path = disk_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+        if disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, latency REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - ttl,))
+            self._db.commit()
+
+    def get(self, key):
+        """
+        Return the cached response for `key`, or None if missing or older than the TTL.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[2] >= self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.saved_seconds += entry[1]
+                return entry[0]
+
+        entry = self._load_from_disk(key)
+        if entry is None or now - entry[2] >= self.ttl:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        self._remember(key, entry)
+        with self._lock:
+            self.hits += 1
+            self.disk_hits += 1
+            self.saved_seconds += entry[1]
+        return entry[0]
+
+    def set(self, key, response, latency):
+        """
+        Store a response along with the seconds the upstream call took.
+        """
+        entry = (response, latency, time.time())
+        self._remember(key, entry)
+        self._save_to_disk(key, entry)
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _load_from_disk(self, key):
+        if self._db is None:
+            return None
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT response, latency, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Failed to read LLM cache entry: {e}")
+            return None
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def _save_to_disk(self, key, entry):
+        if self._db is None:
+            return
+        response, latency, created_at = entry
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, latency, created_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(response), latency, created_at),
+                )
+                # Keep the file bounded the same way as memory: expired rows go on every write
+                self._db.execute("DELETE FROM responses WHERE created_at < ?", (created_at - self.ttl,))
+                self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Failed to persist LLM cache entry: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "hits": self.hits,
+                "diskHits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRate": self.hits / lookups if lookups else 0.0,
+                "savedLatencyMs": round(self.saved_seconds * 1000, 1),
+            }
+
+
+llm_cache = LLMResponseCache(
+    max_entries=int(os.environ.get("LLM_CACHE_SIZE", 1000)),
+    ttl=float(os.environ.get("LLM_CACHE_TTL", 6 * 60 * 60)),
+    disk_path=os.environ.get("LLM_CACHE_PATH"),
+)
+metrics.register("llmCache", llm_cache.stats)
@@ -0,0 +1,167 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+
+# Lower runs first: chat users are waiting on the reply, summaries can wait their turn
+PRIORITIES = {"interactive": 0, "background": 1}
+
+# Seconds a request may wait for a slot before it is rejected
+DEFAULT_DEADLINES = {"interactive": 10, "background": 30}
+
+
+class SchedulerRejected(Exception):
+    def __init__(self, message, status_code=503, retry_after=1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Rate limiter that refills `rate` tokens per second up to `burst`.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait):
+        """
+        Take a token and return the seconds to wait before using it, or None
+        (taking nothing) if that would be longer than `max_wait`.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if wait > max_wait:
+                return None
+            # Tokens may go negative: later callers queue behind this reservation
+            self._tokens -= 1
+            return wait
+
+
+class _Waiter:
+    __slots__ = ("granted", "cancelled", "event")
+
+    def __init__(self):
+        self.granted = False
+        self.cancelled = False
+        self.event = threading.Event()
+
+
+class LLMScheduler:
+    """
+    Admission control for upstream LLM calls.
+
+    At most `max_concurrency` calls run at once; the rest wait in a priority
+    queue ordered by (priority, deadline). A full queue rejects immediately
+    with 429, and a request still waiting for a slot or a rate-limit token at
+    its deadline is rejected with 503, so bursts are shed instead of piling up
+    on Flask threads. Calls run on the caller's thread.
+    """
+
+    def __init__(self, max_concurrency=8, max_queue=64, rate=5.0, burst=10, deadlines=None):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.bucket = TokenBucket(rate, burst)
+        self.deadlines = deadlines or DEFAULT_DEADLINES
+        self._queue = []
+        self._queued = 0
+        self._active = 0
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self.wait_latency = {name: metrics.LatencyHistogram() for name in PRIORITIES}
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_deadline = 0
+
+    @contextmanager
+    def slot(self, priority="interactive", deadline=None):
+        """
+        Hold one upstream slot for the duration of the block.
+        `deadline` is the number of seconds the caller is willing to wait for it.
+        """
+        start = time.monotonic()
+        expires_at = start + (deadline if deadline is not None else self.deadlines[priority])
+        self._acquire(priority, expires_at)
+        try:
+            delay = self.bucket.reserve(expires_at - time.monotonic())
+            if delay is None:
+                with self._lock:
+                    self.rejected_deadline += 1
+                raise SchedulerRejected("LLM rate limit reached, try again shortly", status_code=503)
+            if delay:
+                time.sleep(delay)
+            self.wait_latency[priority].observe(time.monotonic() - start)
+            yield
+        finally:
+            self._release()
+
+    def _acquire(self, priority, expires_at):
+        with self._lock:
+            if self._active < self.max_concurrency and not self._queued:
+                self._active += 1
+                self.admitted += 1
+                return
+            if self._queued >= self.max_queue:
+                self.rejected_full += 1
+                raise SchedulerRejected("LLM request queue is full, try again shortly", status_code=429)
+            waiter = _Waiter()
+            heapq.heappush(self._queue, (PRIORITIES[priority], expires_at, next(self._seq), waiter))
+            self._queued += 1
+
+        waiter.event.wait(max(0.0, expires_at - time.monotonic()))
+        with self._lock:
+            if waiter.granted:
+                return
+            # Timed out: leave the heap entry for _release to skip
+            waiter.cancelled = True
+            self._queued -= 1
+            self.rejected_deadline += 1
+        raise SchedulerRejected("Timed out waiting for an LLM slot", status_code=503)
+
+    def _release(self):
+        with self._lock:
+            self._active -= 1
+            while self._queue:
+                _, _, _, waiter = heapq.heappop(self._queue)
+                if waiter.cancelled:
+                    continue
+                waiter.granted = True
+                self._queued -= 1
+                self._active += 1
+                self.admitted += 1
+                waiter.event.set()
+                break
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": self._active,
+                "maxConcurrency": self.max_concurrency,
+                "queueDepth": self._queued,
+                "maxQueue": self.max_queue,
+                "admitted": self.admitted,
+                "rejectedQueueFull": self.rejected_full,
+                "rejectedDeadline": self.rejected_deadline,
+                "waitTime": {name: hist.snapshot() for name, hist in self.wait_latency.items()},
+            }
+
+
+llm_scheduler = LLMScheduler(
+    max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", 8)),
+    max_queue=int(os.environ.get("LLM_MAX_QUEUE", 64)),
+    rate=float(os.environ.get("LLM_RATE_LIMIT", 5)),
+    burst=int(os.environ.get("LLM_RATE_BURST", 10)),
+)
+metrics.register("llmScheduler", llm_scheduler.stats)
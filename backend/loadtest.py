@@ -0,0 +1,234 @@
+"""
+Load test the I/O-bound endpoints against local stub upstreams.
+
+1. Start the stub upstreams (NewsData, NewsAPI, SambaNova and Alpaca shapes),
+   each answering after a fixed delay:
+       python loadtest.py stub --port 8090 --delay 0.25
+
+2. Start the backend pointed at the stubs, e.g. in cooperative mode:
+       NEWSDATA_API_URL=http://127.0.0.1:8090/news \\
+       NEWS_API_URL=http://127.0.0.1:8090/everything \\
+       SAMBANOVA_BASE_URL=http://127.0.0.1:8090 \\
+       ALPACA_BASE_URL=http://127.0.0.1:8090 \\
+       ALPACA_DATA_URL=http://127.0.0.1:8090 \\
+       python serve_async.py --port 5000
+
+3. Drive load and read throughput and latency percentiles:
+       python loadtest.py run --url http://127.0.0.1:5000/news/apple --concurrency 200 --requests 4000
+       python loadtest.py run --url http://127.0.0.1:5000/sambanova-investment-chat \\
+           --method POST --body '{"message": "hi"}' --concurrency 200 --requests 2000
+
+The stub also answers {"stream": true} chat completions with a server-sent
+event stream, so streaming can be exercised end to end:
+       curl -N -X POST http://127.0.0.1:5000/sambanova-investment-chat \\
+           -H 'Content-Type: application/json' -d '{"message": "hi", "stream": true}'
+
+With a 250 ms upstream, a server holding N requests in flight tops out near
+N / 0.25 requests per second, so the comparison against `python server.py`
+shows how many requests each serving mode really keeps in flight.
+
+4. Hold thousands of live price subscribers open against the fake feed:
+       PRICE_FEED=fake PRICE_FEED_INTERVAL=0.1 python serve_async.py --port 5000
+       python loadtest.py sse --url 'http://127.0.0.1:5000/stream/prices?symbols=AAPL,MSFT,TSLA' \\
+           --clients 2000 --duration 30
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+
+def make_stub_handler(delay):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, payload, status=200):
+            time.sleep(delay)
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path.startswith("/news"):
+                self._reply({"results": [
+                    {"title": f"Story {i}", "description": "Shares rose after earnings beat estimates.",
+                     "link": f"https://example.com/{i}", "source_id": "stub", "pubDate": "2024-01-02 10:00:00"}
+                    for i in range(10)
+                ]})
+            elif path.startswith("/everything"):
+                self._reply({"articles": [
+                    {"title": f"Story {i}", "description": "Shares rose after earnings beat estimates.",
+                     "url": f"https://example.com/{i}", "publishedAt": f"2024-01-02T10:{i:02d}:00Z"}
+                    for i in range(20)
+                ]})
+            elif path.startswith("/v2/stocks/") and path.endswith("/quotes/latest"):
+                # Alpaca market data shapes: /v2/stocks/{symbol}/quotes/latest and /trades/latest
+                self._reply({"symbol": path.split("/")[3], "quote": {
+                    "t": "2024-01-02T15:00:00Z", "ax": "V", "ap": 100.0, "as": 1, "bx": "V", "bp": 99.9, "bs": 2,
+                    "c": ["R"], "z": "C"}})
+            elif path.startswith("/v2/stocks/") and path.endswith("/trades/latest"):
+                self._reply({"symbol": path.split("/")[3], "trade": {
+                    "t": "2024-01-02T15:00:00Z", "x": "V", "p": 99.95, "s": 100, "c": ["@"], "i": 1, "z": "C"}})
+            elif path.endswith("/account"):
+                self._reply({"status": "ACTIVE"})
+            else:
+                self._reply({"error": "not found"}, status=404)
+
+        def _stream_completion(self, tokens=20):
+            # OpenAI-style SSE: first token after `delay`, the rest spread over another `delay`
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            time.sleep(delay)
+            for i in range(tokens):
+                chunk = {"choices": [{"delta": {"content": f"tok{i} "}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(delay / tokens)
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def do_POST(self):
+            raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            body = json.loads(raw or b"{}")
+            if self.path.endswith("/chat/completions") and body.get("stream"):
+                self._stream_completion()
+            elif self.path.endswith("/chat/completions"):
+                self._reply({"choices": [{"message": {"role": "assistant", "content": "Stub reply."}}]})
+            elif self.path.endswith("/orders"):
+                self._reply({"id": "stub-order", "status": "accepted", "symbol": body.get("symbol"),
+                             "qty": str(body.get("qty")), "side": body.get("side")})
+            else:
+                self._reply({"error": "not found"}, status=404)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def run_stub(args):
+    server = ThreadingHTTPServer((args.host, args.port), make_stub_handler(args.delay))
+    server.daemon_threads = True
+    server.request_queue_size = 1024
+    print(f"Stub upstreams on http://{args.host}:{args.port} with {args.delay * 1000:.0f} ms delay")
+    server.serve_forever()
+
+
+def run_load(args):
+    body = json.loads(args.body) if args.body else None
+    latencies = []
+    errors = [0]
+    remaining = [args.requests]
+    lock = threading.Lock()
+
+    def worker():
+        session = requests.Session()
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            start = time.perf_counter()
+            try:
+                response = session.request(args.method, args.url, json=body, timeout=60)
+                ok = response.status_code < 500
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+
+    print(f"{len(latencies)} requests, concurrency {args.concurrency}, {errors[0]} errors")
+    print(f"throughput {len(latencies) / wall:.1f} req/s over {wall:.2f} s")
+    print(f"latency p50 {pct(50):.1f} ms, p90 {pct(90):.1f} ms, p99 {pct(99):.1f} ms")
+
+
+def run_sse(args):
+    events = []
+    failures = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def client():
+        received = 0
+        try:
+            with requests.get(args.url, stream=True, timeout=(10, 30)) as response:
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    if line and line.startswith("data:"):
+                        received += 1
+                    if time.perf_counter() >= deadline:
+                        break
+        except requests.RequestException:
+            with lock:
+                failures[0] += 1
+        with lock:
+            events.append(received)
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(args.duration + 60)
+
+    events.sort()
+    total = sum(events)
+    print(f"{args.clients} clients for {args.duration:.0f} s, {failures[0]} failed")
+    print(f"{total} events, {total / args.duration:.1f} events/s delivered")
+    if events:
+        print(f"events per client: min {events[0]}, median {events[len(events) // 2]}, max {events[-1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the backend against stub upstreams.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    stub = subparsers.add_parser("stub", help="Run the stub upstream server")
+    stub.add_argument("--host", default="127.0.0.1")
+    stub.add_argument("--port", type=int, default=8090)
+    stub.add_argument("--delay", type=float, default=0.25, help="Seconds before each stub reply")
+    stub.set_defaults(func=run_stub)
+
+    run = subparsers.add_parser("run", help="Drive load against a backend URL")
+    run.add_argument("--url", required=True)
+    run.add_argument("--method", default="GET")
+    run.add_argument("--body", help="JSON request body")
+    run.add_argument("--concurrency", type=int, default=100)
+    run.add_argument("--requests", type=int, default=2000)
+    run.set_defaults(func=run_load)
+
+    sse = subparsers.add_parser("sse", help="Hold many server-sent event subscribers open")
+    sse.add_argument("--url", required=True)
+    sse.add_argument("--clients", type=int, default=1000)
+    sse.add_argument("--duration", type=float, default=30, help="Seconds each client stays subscribed")
+    sse.set_defaults(func=run_sse)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import yfinance as yf
+
+import metrics
+from config import PREDEFINED_TICKERS
+from singleflight import upstream_flight
+
+SNAPSHOT_FIELDS = ("price", "prevClose", "high", "low", "volume")
+
+# Longest list kept per ranking; requests slice from these
+MAX_MOVERS = 25
+
+
+def yfinance_snapshot(symbols, threads=True):
+    """
+    Quote snapshot for `symbols` from one batched daily-bar download.
+
+    Returns {"symbol": [...], "price": [...], "prevClose": [...], "high": [...],
+    "low": [...], "volume": [...]}; today's bar is still forming during the session.
+    """
+    data = yf.download(
+        symbols, period="5d", interval="1d", auto_adjust=True, threads=threads, progress=False
+    )
+    closes = data["Close"].reindex(columns=symbols)
+    # Forward-fill so a symbol that has not traded yet today reports yesterday's close
+    filled = closes.ffill()
+    return {
+        "symbol": list(symbols),
+        "price": filled.iloc[-1].to_numpy(),
+        "prevClose": filled.iloc[-2].to_numpy() if len(filled) > 1 else np.full(len(symbols), np.nan),
+        # ...and yesterday's range
+        "high": data["High"].reindex(columns=symbols).ffill().iloc[-1].to_numpy(),
+        "low": data["Low"].reindex(columns=symbols).ffill().iloc[-1].to_numpy(),
+        "volume": data["Volume"].reindex(columns=symbols).iloc[-1].to_numpy(),
+    }
+
+
+def json_snapshot(path):
+    """
+    Source that serves a fixed snapshot from a JSON file with the same fields as yfinance_snapshot.
+    """
+    with open(path) as f:
+        snapshot = json.load(f)
+    return lambda symbols: snapshot
+
+
+def _top_k(values, k, largest=True):
+    """
+    Indices of the k largest (or smallest) finite values, best first.
+    """
+    keyed = values if largest else -values
+    keyed = np.where(np.isfinite(keyed), keyed, -np.inf)
+    k = min(k, int(np.isfinite(keyed).sum()))
+    if k == 0:
+        return np.array([], dtype=np.intp)
+    # argpartition finds the top k in linear time; only those k are sorted
+    candidates = np.argpartition(-keyed, k - 1)[:k]
+    return candidates[np.argsort(-keyed[candidates], kind="stable")]
+
+
+class MarketMovers:
+    """
+    Gainers, losers and most-active lists for a fixed universe of symbols.
+
+    A background thread takes one batched quote snapshot of the universe every
+    `refresh_interval` seconds and ranks it with a vectorized top-k, so requests
+    only read precomputed lists from memory. A request that finds the lists older
+    than `refresh_interval` (no thread running, or it fell behind) refreshes them
+    first, and is served the old lists if that fails. `source(symbols)` returns the
+    snapshot columns, which lets tests and load runs inject a fixture.
+    """
+
+    def __init__(self, universe, names=None, source=yfinance_snapshot, refresh_interval=60):
+        self.universe = list(universe)
+        self.names = names or {}
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self._lists = None
+        self._as_of = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self.refreshes = 0
+        self.failures = 0
+        self.refresh_latency = metrics.LatencyHistogram()
+
+    def refresh(self):
+        start = time.perf_counter()
+        snapshot = self.source(self.universe)
+        symbols = np.asarray(snapshot["symbol"])
+        columns = {field: np.asarray(snapshot[field], dtype=np.float64) for field in SNAPSHOT_FIELDS}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change = (columns["price"] / columns["prevClose"] - 1.0) * 100.0
+        # JSON has no NaN; a listed symbol always has a price, so a missing range falls back to it
+        for field in ("high", "low"):
+            columns[field] = np.where(np.isfinite(columns[field]), columns[field], columns["price"])
+
+        def rows(indices):
+            return [
+                {
+                    "symbol": str(symbols[i]),
+                    "name": self.names.get(str(symbols[i]), str(symbols[i])),
+                    "price": round(float(columns["price"][i]), 2),
+                    "percentChange": f"{change[i]:+.2f}%",
+                    "high": round(float(columns["high"][i]), 2),
+                    "low": round(float(columns["low"][i]), 2),
+                    "volume": int(columns["volume"][i]) if np.isfinite(columns["volume"][i]) else 0,
+                }
+                for i in indices
+            ]
+
+        # Gainers must be up and losers down; most active needs a usable price change
+        tradable = np.isfinite(change)
+        lists = {
+            "gainers": rows(_top_k(np.where(change > 0, change, np.nan), MAX_MOVERS)),
+            "losers": rows(_top_k(np.where(change < 0, change, np.nan), MAX_MOVERS, largest=False)),
+            "active": rows(_top_k(np.where(tradable, columns["volume"], np.nan), MAX_MOVERS)),
+        }
+        with self._lock:
+            self._lists = lists
+            self._as_of = time.time()
+            self.refreshes += 1
+        self.refresh_latency.observe(time.perf_counter() - start)
+
+    def get(self, kind, limit):
+        """
+        Return (rows, as-of epoch seconds) for "gainers", "losers" or "active".
+        """
+        with self._lock:
+            lists, as_of = self._lists, self._as_of
+        if lists is None or time.time() - as_of >= self.refresh_interval:
+            # Concurrent requests finding the lists missing or stale share one refresh
+            try:
+                upstream_flight.do(("top-movers",), self.refresh)
+            except Exception as e:
+                if lists is None:
+                    raise
+                with self._lock:
+                    self.failures += 1
+                print(f"Market movers refresh failed: {e}")
+        with self._lock:
+            return self._lists[kind][:limit], self._as_of
+
+    def _refresh_forever(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                with self._lock:
+                    self.failures += 1
+                print(f"Market movers refresh failed: {e}")
+            time.sleep(self.refresh_interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._refresh_forever, daemon=True)
+            self._thread.start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "universe": len(self.universe),
+                "asOf": self._as_of,
+                "refreshes": self.refreshes,
+                "failures": self.failures,
+                "refreshLatency": self.refresh_latency.snapshot(),
+            }
+
+
+def create_market_movers():
+    """
+    Build the movers service from TOP_MOVERS_UNIVERSE (comma-separated symbols, default
+    PREDEFINED_TICKERS) and TOP_MOVERS_FIXTURE (a JSON snapshot to serve instead of yfinance).
+    """
+    names = {ticker["symbol"]: ticker["name"] for ticker in PREDEFINED_TICKERS}
+    universe = os.environ.get("TOP_MOVERS_UNIVERSE")
+    symbols = [s.strip().upper() for s in universe.split(",") if s.strip()] if universe else list(names)
+    fixture = os.environ.get("TOP_MOVERS_FIXTURE")
+
+    movers = MarketMovers(
+        symbols,
+        names=names,
+        source=json_snapshot(fixture) if fixture else yfinance_snapshot,
+        refresh_interval=float(os.environ.get("TOP_MOVERS_REFRESH", 60)),
+    )
+    metrics.register("marketMovers", movers.stats)
+    return movers
@@ -0,0 +1,65 @@
+import threading
+
+_providers = {}
+_lock = threading.Lock()
+
+
+def register(name, provider):
+    """
+    Register a callable that returns a JSON-serializable dict of stats under `name`.
+    """
+    with _lock:
+        _providers[name] = provider
+
+
+def snapshot():
+    """
+    Collect the current stats from every registered provider.
+    """
+    with _lock:
+        providers = dict(_providers)
+    return {name: provider() for name, provider in providers.items()}
+
+
+# Upper bounds of latency histogram buckets, in milliseconds
+DEFAULT_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram. Bucket counts are cumulative, Prometheus-style.
+    """
+
+    def __init__(self, buckets_ms=DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._counts = [0] * (len(self.buckets_ms) + 1)
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        elapsed_ms = seconds * 1000
+        with self._lock:
+            for i, bound in enumerate(self.buckets_ms):
+                if elapsed_ms <= bound:
+                    self._counts[i] += 1
+                    break
+            else:
+                self._counts[-1] += 1
+            self._sum_ms += elapsed_ms
+            self._max_ms = max(self._max_ms, elapsed_ms)
+
+    def snapshot(self):
+        with self._lock:
+            count = sum(self._counts)
+            buckets = {}
+            running = 0
+            for bound, n in zip(list(self.buckets_ms) + ["+Inf"], self._counts):
+                running += n
+                buckets[str(bound)] = running
+            return {
+                "count": count,
+                "meanMs": self._sum_ms / count if count else 0.0,
+                "maxMs": self._max_ms,
+                "buckets": buckets,
+            }
@@ -0,0 +1,212 @@
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import yfinance as yf
+
+import metrics
+
+# Map chart intervals to yfinance's valid periods and intervals
+INTERVAL_MAP = {
+    "minutes": ("7d", "5m"),  # Last 7 days, 5-minute interval
+    "days": ("1mo", "1d"),     # Last month, 1-day interval
+    "months": ("1y", "1wk"),   # Last year, 1-week interval
+    "years": ("5y", "1mo")     # Last 5 years, 1-month interval
+}
+
+# Seconds a cached series stays fresh before it is topped up from yfinance
+INTERVAL_TTLS = {
+    "5m": 60,
+    "1d": 15 * 60,
+    "1wk": 60 * 60,
+    "1mo": 6 * 60 * 60,
+}
+
+# Length of history kept per period once new bars are appended
+PERIOD_WINDOWS = {
+    "7d": pd.Timedelta(days=7),
+    "1mo": pd.Timedelta(days=31),
+    "1y": pd.Timedelta(days=365),
+    "5y": pd.Timedelta(days=5 * 365),
+}
+
+
+def extend(cached, fresh, period):
+    """
+    Splice `fresh` bars onto a `cached` series, replacing cached bars they overlap,
+    and trim the result to the trailing `period` window.
+    """
+    if fresh.empty:
+        return cached
+    combined = pd.concat([cached[cached.index < fresh.index[0]], fresh])
+    cutoff = combined.index[-1] - PERIOD_WINDOWS[period]
+    return combined[combined.index >= cutoff]
+
+
+def _fetch_history(symbol, period=None, interval=None, start=None):
+    stock = yf.Ticker(symbol)
+    if start is not None:
+        return stock.history(start=start, interval=interval)
+    return stock.history(period=period, interval=interval)
+
+
+class _Entry:
+    __slots__ = ("hist", "fetched_at")
+
+    def __init__(self, hist, fetched_at):
+        self.hist = hist
+        self.fetched_at = fetched_at
+
+
+class OHLCCache:
+    """
+    LRU cache of yfinance OHLC history keyed by (symbol, chart interval).
+
+    Fresh entries are served as-is. Stale entries are refreshed by fetching only
+    the bars from the last cached day onward and appending them, instead of
+    re-pulling the whole period; if that fetch fails the stale series is served.
+    Entries can optionally be persisted to disk so
+    a restart starts warm.
+    """
+
+    def __init__(self, max_entries=256, disk_dir=None, ttls=None, fetcher=_fetch_history):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.ttls = ttls or INTERVAL_TTLS
+        self.fetcher = fetcher
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.evictions = 0
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, symbol, chart_interval):
+        """
+        Return the OHLC DataFrame for `symbol` over one of the INTERVAL_MAP keys.
+        """
+        period, interval = INTERVAL_MAP[chart_interval]
+        key = (symbol.upper(), chart_interval)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            entry = self._load_from_disk(key)
+            if entry is not None:
+                # Later reads are served from memory
+                self._remember(key, entry)
+
+        now = time.time()
+        if entry is not None and now - entry.fetched_at < self.ttls[interval]:
+            with self._lock:
+                self.hits += 1
+            return entry.hist
+
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            hist = self.fetcher(symbol, period=period, interval=interval)
+        else:
+            with self._lock:
+                self.refreshes += 1
+            try:
+                hist = self._refresh(symbol, entry.hist, period, interval)
+            except Exception as e:
+                # A stale chart beats an error page while yfinance is failing
+                with self._lock:
+                    self.refresh_failures += 1
+                print(f"OHLC refresh failed for {key}: {e}")
+                return entry.hist
+
+        if not hist.empty:
+            self.put(symbol, chart_interval, hist, fetched_at=now)
+        return hist
+
+    def peek(self, symbol, chart_interval):
+        """
+        Return the series cached in memory, fresh or not, without fetching or
+        counting a lookup; None if there is none.
+        """
+        with self._lock:
+            entry = self._entries.get((symbol.upper(), chart_interval))
+        return entry.hist if entry is not None else None
+
+    def put(self, symbol, chart_interval, hist, fetched_at=None):
+        """
+        Store a freshly fetched series, evicting the least recently used entry if full.
+        """
+        key = (symbol.upper(), chart_interval)
+        entry = _Entry(hist, fetched_at or time.time())
+        self._remember(key, entry)
+        self._save_to_disk(key, entry)
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _refresh(self, symbol, cached, period, interval):
+        # Re-fetch from the day of the last cached bar so a partial bar is replaced
+        start = cached.index[-1].strftime("%Y-%m-%d")
+        return extend(cached, self.fetcher(symbol, interval=interval, start=start), period)
+
+    def _disk_path(self, key):
+        symbol, chart_interval = key
+        safe_symbol = re.sub(r"[^A-Z0-9.\-^=]", "_", symbol)
+        return os.path.join(self.disk_dir, f"{safe_symbol}_{chart_interval}.pkl")
+
+    def _load_from_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                hist, fetched_at = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        return _Entry(hist, fetched_at)
+
+    def _save_to_disk(self, key, entry):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump((entry.hist, entry.fetched_at), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Failed to persist OHLC cache entry {key}: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.refreshes
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "refreshFailures": self.refresh_failures,
+                "evictions": self.evictions,
+                "hitRate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+ohlc_cache = OHLCCache(
+    max_entries=int(os.environ.get("OHLC_CACHE_SIZE", 256)),
+    disk_dir=os.environ.get("OHLC_CACHE_DIR"),
+)
+metrics.register("ohlcCache", ohlc_cache.stats)
@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+
+class _Portfolio:
+    __slots__ = ("symbols", "has_docs", "loaded_at")
+
+    def __init__(self, symbols, has_docs, loaded_at):
+        # symbol -> list of (doc id, name); a symbol can have been saved more than once
+        self.symbols = symbols
+        self.has_docs = has_docs
+        self.loaded_at = loaded_at
+
+
+class PortfolioStore:
+    """
+    Data access for users/{uid}/portfolio with a per-user in-memory cache.
+
+    A portfolio is read once with a symbol/name projection and then served from
+    memory until it expires or is invalidated. Saves and removals are applied
+    with batched writes and update the cached copy in place, so membership checks
+    are set lookups; a write that fails drops the cached copy, since the
+    outcome of an errored commit is unknown. `db` is any Firestore-compatible client, so the store can run
+    against the emulator or an in-memory fake.
+    """
+
+    def __init__(self, db, max_users=10000, ttl=300):
+        self.db = db
+        self.max_users = max_users
+        self.ttl = ttl
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+
+    def _collection(self, uid):
+        return self.db.collection("users").document(uid).collection("portfolio")
+
+    def _load(self, uid):
+        with self._lock:
+            portfolio = self._cache.get(uid)
+            if portfolio is not None and time.time() - portfolio.loaded_at < self.ttl:
+                self._cache.move_to_end(uid)
+                self.hits += 1
+                return portfolio
+
+        symbols = {}
+        has_docs = False
+        for doc in self._collection(uid).select(["symbol", "name", "placeholder"]).stream():
+            has_docs = True
+            doc_data = doc.to_dict()
+            # Skip placeholder documents
+            if doc_data.get("symbol") and not doc_data.get("placeholder"):
+                symbols.setdefault(doc_data["symbol"], []).append((doc.id, doc_data.get("name")))
+
+        portfolio = _Portfolio(symbols, has_docs, time.time())
+        with self._lock:
+            self.loads += 1
+            self._cache[uid] = portfolio
+            self._cache.move_to_end(uid)
+            while len(self._cache) > self.max_users:
+                self._cache.popitem(last=False)
+        return portfolio
+
+    def list(self, uid):
+        """
+        Return [{"symbol", "name"}, ...] for every saved stock.
+        """
+        portfolio = self._load(uid)
+        with self._lock:
+            return [
+                {"symbol": symbol, "name": name}
+                for symbol, docs in portfolio.symbols.items()
+                for _, name in docs
+            ]
+
+    def contains(self, uid, symbol):
+        portfolio = self._load(uid)
+        with self._lock:
+            return symbol in portfolio.symbols
+
+    def symbols(self, uid):
+        portfolio = self._load(uid)
+        with self._lock:
+            return set(portfolio.symbols)
+
+    def save(self, uid, symbol, name):
+        """
+        Save a stock, adding the placeholder document on the first write.
+        """
+        portfolio = self._load(uid)
+        collection = self._collection(uid)
+
+        batch = self.db.batch()
+        if not portfolio.has_docs:
+            # Add a placeholder document to initialize the portfolio collection
+            batch.set(collection.document(), {"placeholder": True})
+        doc_ref = collection.document()
+        batch.set(doc_ref, {"symbol": symbol, "name": name})
+        self._commit(uid, batch)
+
+        with self._lock:
+            portfolio.has_docs = True
+            portfolio.symbols.setdefault(symbol, []).append((doc_ref.id, name))
+
+    def remove(self, uid, symbol):
+        """
+        Remove every saved copy of `symbol`. Returns False if it was not saved.
+        """
+        portfolio = self._load(uid)
+        with self._lock:
+            docs = list(portfolio.symbols.get(symbol, []))
+        if not docs:
+            return False
+
+        collection = self._collection(uid)
+        batch = self.db.batch()
+        for doc_id, _ in docs:
+            batch.delete(collection.document(doc_id))
+        self._commit(uid, batch)
+
+        with self._lock:
+            portfolio.symbols.pop(symbol, None)
+        return True
+
+    def _commit(self, uid, batch):
+        try:
+            batch.commit()
+        except Exception:
+            self.invalidate(uid)
+            raise
+
+    def invalidate(self, uid):
+        with self._lock:
+            self._cache.pop(uid, None)
+
+    def stats(self):
+        with self._lock:
+            return {"users": len(self._cache), "hits": self.hits, "loads": self.loads}
+
+
+def create_portfolio_store(db):
+    store = PortfolioStore(db, ttl=float(os.environ.get("PORTFOLIO_CACHE_TTL", 300)))
+    metrics.register("portfolioCache", store.stats)
+    return store
@@ -0,0 +1,192 @@
+import heapq
+import os
+import threading
+import time
+
+import yfinance as yf
+
+import metrics
+from bar_store import bar_store
+from config import PREDEFINED_TICKERS
+from ohlc_cache import INTERVAL_MAP, INTERVAL_TTLS, extend, ohlc_cache
+from price_cache import price_cache
+
+
+def download(symbols, period, interval, threads=True, start=None):
+    """
+    One multi-symbol yfinance request, returned as {symbol: history DataFrame}.
+    Pass `start` (YYYY-MM-DD) instead of `period` to fetch only recent bars.
+    """
+    data = yf.download(
+        symbols,
+        period=period,
+        start=start,
+        interval=interval,
+        group_by="ticker",
+        # Keep exchange-local, tz-aware indexes so entries match Ticker.history()
+        ignore_tz=False,
+        auto_adjust=True,
+        threads=threads,
+        progress=False,
+    )
+    histories = {}
+    if data is None or data.empty:
+        return histories
+    available = set(data.columns.get_level_values(0))
+    for symbol in symbols:
+        if symbol in available:
+            # Rows where only other symbols traded come back as NaN
+            hist = data[symbol].dropna(how="all")
+            if not hist.empty:
+                histories[symbol] = hist
+    return histories
+
+
+class Prefetcher:
+    """
+    Keeps market data for watched symbols warm in the shared caches.
+
+    The watch list is every symbol saved in any user's portfolio plus
+    PREDEFINED_TICKERS. Each chart interval is refreshed on its own cadence,
+    a fraction of its OHLC cache TTL, so cached series are replaced before they
+    go stale. Jobs start staggered so their downloads don't coincide, and each
+    run fetches `batch_size` symbols per yfinance request instead of one call
+    per symbol, appending new bars to the local bar store as well. Symbols
+    already cached are fetched only from the day of their last cached bar, as
+    an OHLC cache refresh does. The 5-minute job also records each symbol's
+    latest close in the price cache.
+    """
+
+    def __init__(self, db, downloader=download, batch_size=100, stagger=5.0,
+                 refresh_fraction=0.8, watchlist_interval=600):
+        self.db = db
+        self.downloader = downloader
+        self.batch_size = batch_size
+        self.stagger = stagger
+        self.refresh_fraction = refresh_fraction
+        self.watchlist_interval = watchlist_interval
+        self._symbols = []
+        self._lock = threading.Lock()
+        self._thread = None
+        # Headroom kept in the OHLC cache for symbols looked up on demand
+        self._on_demand_entries = ohlc_cache.max_entries
+        self.runs = {}
+        self.failures = {}
+        self.last_run = {}
+        self.duration = metrics.LatencyHistogram(buckets_ms=(100, 500, 1000, 5000, 10000, 30000, 60000, 120000))
+
+    def watchlist(self):
+        """
+        Reload the watched symbols from Firestore.
+        """
+        symbols = {ticker["symbol"].upper() for ticker in PREDEFINED_TICKERS}
+        # One collection-group query covers users/*/portfolio instead of a read per user
+        for doc in self.db.collection_group("portfolio").select(["symbol"]).stream():
+            symbol = doc.to_dict().get("symbol")
+            if symbol:
+                symbols.add(symbol.upper())
+
+        with self._lock:
+            self._symbols = sorted(symbols)
+        # Every watched series must fit in the OHLC cache, or the prefetcher evicts its own work
+        ohlc_cache.max_entries = max(
+            ohlc_cache.max_entries, len(symbols) * len(INTERVAL_MAP) + self._on_demand_entries
+        )
+        return self._symbols
+
+    def refresh(self, chart_interval):
+        """
+        Download `chart_interval` bars for every watched symbol into the OHLC cache and bar store.
+        """
+        period, interval = INTERVAL_MAP[chart_interval]
+        with self._lock:
+            symbols = list(self._symbols)
+
+        # Cached symbols whose last bar falls on the same day share one download from that day
+        cached, groups = {}, {None: []}
+        for symbol in symbols:
+            hist = ohlc_cache.peek(symbol, chart_interval)
+            if hist is None or hist.empty:
+                groups[None].append(symbol)
+            else:
+                cached[symbol] = hist
+                groups.setdefault(hist.index[-1].strftime("%Y-%m-%d"), []).append(symbol)
+
+        for start, group in groups.items():
+            for i in range(0, len(group), self.batch_size):
+                batch = group[i:i + self.batch_size]
+                fetched_at = time.time()
+                if start is None:
+                    histories = self.downloader(batch, period, interval)
+                else:
+                    histories = self.downloader(batch, None, interval, start=start)
+                for symbol, hist in histories.items():
+                    if symbol in cached:
+                        hist = extend(cached[symbol], hist, period)
+                    ohlc_cache.put(symbol, chart_interval, hist, fetched_at=fetched_at)
+                    try:
+                        bar_store.append(symbol, interval, hist)
+                    except Exception as e:
+                        # The caches above are already warm; one bad write shouldn't stop the batch
+                        print(f"Error storing bars for {symbol} {interval}: {e}")
+                    if interval == "5m":
+                        price_cache.set(symbol, hist["Close"].iloc[-1], timestamp=fetched_at)
+
+    def _jobs(self):
+        jobs = {"watchlist": (self.watchlist_interval, self.watchlist)}
+        for chart_interval, (_, interval) in INTERVAL_MAP.items():
+            jobs[chart_interval] = (
+                INTERVAL_TTLS[interval] * self.refresh_fraction,
+                lambda chart_interval=chart_interval: self.refresh(chart_interval),
+            )
+        return jobs
+
+    def _run_forever(self):
+        jobs = self._jobs()
+        now = time.monotonic()
+        # The watch list loads first; interval jobs follow `stagger` seconds apart
+        schedule = [(now + i * self.stagger, name) for i, name in enumerate(jobs)]
+        heapq.heapify(schedule)
+        while True:
+            due, name = heapq.heappop(schedule)
+            time.sleep(max(0.0, due - time.monotonic()))
+
+            cadence, job = jobs[name]
+            start = time.perf_counter()
+            try:
+                job()
+                self.runs[name] = self.runs.get(name, 0) + 1
+                self.last_run[name] = time.time()
+            except Exception as e:
+                self.failures[name] = self.failures.get(name, 0) + 1
+                print(f"Prefetch job '{name}' failed: {e}")
+            self.duration.observe(time.perf_counter() - start)
+            heapq.heappush(schedule, (max(due + cadence, time.monotonic()), name))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run_forever, daemon=True)
+            self._thread.start()
+
+    def stats(self):
+        with self._lock:
+            watched = len(self._symbols)
+        return {
+            "running": self._thread is not None,
+            "watchedSymbols": watched,
+            "runs": dict(self.runs),
+            "failures": dict(self.failures),
+            "lastRun": dict(self.last_run),
+            "duration": self.duration.snapshot(),
+        }
+
+
+def create_prefetcher(db):
+    prefetcher = Prefetcher(
+        db,
+        batch_size=int(os.environ.get("PREFETCH_BATCH_SIZE", 100)),
+        stagger=float(os.environ.get("PREFETCH_STAGGER", 5)),
+        watchlist_interval=float(os.environ.get("PREFETCH_WATCHLIST_INTERVAL", 600)),
+    )
+    metrics.register("prefetcher", prefetcher.stats)
+    return prefetcher
@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+
+import metrics
+
+
+class PriceCache:
+    """
+    Short-lived last-price cache per symbol, shared across requests.
+
+    Every write bumps a version counter, so consumers that mark positions to
+    market can ask for just the symbols written since they last looked.
+    """
+
+    def __init__(self, ttl=5.0):
+        self.ttl = ttl
+        # symbol -> (price, timestamp, version of the write)
+        self._prices = {}
+        self._version = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, symbol):
+        """
+        Return the cached price for `symbol`, or None if missing or older than the TTL.
+        """
+        symbol = symbol.upper()
+        with self._lock:
+            cached = self._prices.get(symbol)
+            if cached is not None and time.time() - cached[1] < self.ttl:
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+            return None
+
+    def set(self, symbol, price, timestamp=None):
+        with self._lock:
+            self._version += 1
+            self._prices[symbol.upper()] = (float(price), timestamp or time.time(), self._version)
+
+    def changed_since(self, version):
+        """
+        Return ({symbol: price} written after `version`, current version). Prices
+        past the TTL are included; they are still the last known price.
+        """
+        with self._lock:
+            if version >= self._version:
+                return {}, self._version
+            changed = {symbol: cached[0] for symbol, cached in self._prices.items() if cached[2] > version}
+            return changed, self._version
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "symbols": len(self._prices),
+                "version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+price_cache = PriceCache(ttl=float(os.environ.get("PRICE_CACHE_TTL", 5)))
+metrics.register("priceCache", price_cache.stats)
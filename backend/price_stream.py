@@ -0,0 +1,191 @@
+import random
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+
+class Subscription:
+    """
+    One client's view of the hub: a buffer holding the latest update per symbol.
+
+    A new update for a symbol that is still pending replaces the old one, so the
+    buffer never holds more than one update per subscribed symbol and a slow
+    client skips stale ticks instead of growing memory.
+    """
+
+    def __init__(self, symbols):
+        self.symbols = symbols
+        self._pending = OrderedDict()
+        self._cond = threading.Condition()
+        self.closed = False
+        self.delivered = 0
+        self.dropped = 0
+
+    def push(self, symbol, update):
+        with self._cond:
+            if symbol in self._pending:
+                # Conflate: only the newest update per symbol is kept
+                del self._pending[symbol]
+                self.dropped += 1
+            self._pending[symbol] = update
+            self._cond.notify()
+
+    def next(self, timeout):
+        """
+        Wait up to `timeout` seconds and return every pending update, oldest first.
+        """
+        with self._cond:
+            if not self._pending and not self.closed:
+                self._cond.wait(timeout)
+            updates = list(self._pending.values())
+            self._pending.clear()
+            self.delivered += len(updates)
+            return updates
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+
+class _Feed:
+    __slots__ = ("subscribers", "stop", "bar", "last")
+
+    def __init__(self):
+        self.subscribers = set()
+        self.stop = threading.Event()
+        self.bar = None
+        self.last = None
+
+
+class PriceHub:
+    """
+    Fans out one upstream feed per symbol to any number of subscribers.
+
+    The first subscriber to a symbol starts its feed thread and the last one to
+    leave stops it. `feed(symbol, publish, stop)` runs until `stop` is set and
+    calls publish(price, timestamp) per tick; the hub folds ticks into a
+    one-minute bar and pushes {"symbol", "price", "t", "bar"} to every
+    subscriber's conflating buffer.
+    """
+
+    def __init__(self, feed):
+        self.feed = feed
+        self._feeds = {}
+        self._lock = threading.Lock()
+        self.published = 0
+        self.subscriptions = 0
+        # Totals from closed subscriptions
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, symbols):
+        symbols = sorted({symbol.upper() for symbol in symbols})
+        subscription = Subscription(symbols)
+        started = []
+        with self._lock:
+            self.subscriptions += 1
+            for symbol in symbols:
+                feed = self._feeds.get(symbol)
+                if feed is None:
+                    feed = self._feeds[symbol] = _Feed()
+                    started.append((symbol, feed))
+                feed.subscribers.add(subscription)
+                # Late joiners start from the current price instead of waiting for the next tick
+                if feed.last is not None:
+                    subscription.push(symbol, feed.last)
+        for symbol, feed in started:
+            threading.Thread(target=self._run_feed, args=(symbol, feed), daemon=True).start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.close()
+        with self._lock:
+            self.delivered += subscription.delivered
+            self.dropped += subscription.dropped
+            for symbol in subscription.symbols:
+                feed = self._feeds.get(symbol)
+                if feed is None:
+                    continue
+                feed.subscribers.discard(subscription)
+                if not feed.subscribers:
+                    feed.stop.set()
+                    del self._feeds[symbol]
+
+    def _run_feed(self, symbol, feed):
+        def publish(price, timestamp=None):
+            self._publish(symbol, feed, float(price), timestamp or time.time())
+
+        try:
+            self.feed(symbol, publish, feed.stop)
+        except Exception as e:
+            print(f"Price feed for {symbol} failed: {e}")
+
+    def _publish(self, symbol, feed, price, timestamp):
+        minute = int(timestamp // 60 * 60)
+        bar = feed.bar
+        if bar is None or bar["t"] != minute:
+            bar = feed.bar = {"t": minute, "o": price, "h": price, "l": price, "c": price}
+        else:
+            bar["h"] = max(bar["h"], price)
+            bar["l"] = min(bar["l"], price)
+            bar["c"] = price
+        update = {"symbol": symbol, "price": price, "t": timestamp, "bar": dict(bar)}
+
+        with self._lock:
+            feed.last = update
+            subscribers = list(feed.subscribers)
+            self.published += 1
+        for subscription in subscribers:
+            subscription.push(symbol, update)
+
+    def stats(self):
+        with self._lock:
+            subscribers = {s for feed in self._feeds.values() for s in feed.subscribers}
+            return {
+                "feeds": len(self._feeds),
+                "subscribers": len(subscribers),
+                "subscriptions": self.subscriptions,
+                "published": self.published,
+                "delivered": self.delivered + sum(s.delivered for s in subscribers),
+                "dropped": self.dropped + sum(s.dropped for s in subscribers),
+            }
+
+
+def polling_feed(fetch_price, interval=1.0):
+    """
+    Feed that polls fetch_price(symbol) every `interval` seconds and publishes changes.
+    """
+    def feed(symbol, publish, stop):
+        last = None
+        while not stop.is_set():
+            try:
+                price = fetch_price(symbol)
+                if price is not None and price != last:
+                    publish(price)
+                    last = price
+            except Exception as e:
+                print(f"Polling price for {symbol} failed: {e}")
+            stop.wait(interval)
+    return feed
+
+
+def fake_feed(interval=0.1, start_price=100.0, volatility=0.001):
+    """
+    Random-walk feed for load testing: one tick per symbol every `interval` seconds.
+    """
+    def feed(symbol, publish, stop):
+        rng = random.Random(symbol)
+        price = start_price * (0.5 + rng.random())
+        while not stop.wait(interval):
+            price *= 1 + rng.gauss(0, volatility)
+            publish(round(price, 4))
+    return feed
+
+
+def create_price_hub(feed):
+    hub = PriceHub(feed)
+    metrics.register("priceStream", hub.stats)
+    return hub
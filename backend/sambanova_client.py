@@ -1,15 +1,25 @@
 import os
-import requests
+import json
+import time
+from contextlib import nullcontext
+import metrics
+from http_client import http_client
+from llm_cache import llm_cache, request_key
+from llm_scheduler import llm_scheduler
 
 class SambaNovaClient:
-    def __init__(self, api_key, base_url):
+    def __init__(self, api_key, base_url, http=http_client, cache=None, scheduler=None):
         self.api_key = api_key
         self.base_url = base_url
+        self.http = http
+        self.cache = cache
+        self.scheduler = scheduler
+        # Time until the first token is available: the whole completion when not streaming
+        self.blocking_ttft = metrics.LatencyHistogram()
+        self.stream_ttft = metrics.LatencyHistogram()
+        self.stream_duration = metrics.LatencyHistogram()
 
-    def chat_completions_create(self, model, messages, temperature=0.1, top_p=0.1, max_tokens=300):
-        """
-        Interact with the SambaNova Chat API to generate responses.
-        """
+    def _request(self, model, messages, temperature, top_p, max_tokens, stream=False):
         url = f"{self.base_url}/chat/completions"
         headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -22,12 +32,111 @@ class SambaNovaClient:
             "top_p": top_p,
             "max_tokens": max_tokens
         }
-        response = requests.post(url, headers=headers, json=payload)
+        if stream:
+            payload["stream"] = True
+        # Completions have no side effects, so rate-limit and gateway errors are retried
+        response = self.http.post(url, headers=headers, json=payload, retries=self.http.max_retries, stream=stream)
         response.raise_for_status()
-        return response.json()
+        return response
+
+    def _slot(self, priority):
+        if self.scheduler is None:
+            return nullcontext()
+        return self.scheduler.slot(priority)
+
+    def chat_completions_create(self, model, messages, temperature=0.1, top_p=0.1, max_tokens=300,
+                                use_cache=True, priority="interactive"):
+        """
+        Interact with the SambaNova Chat API to generate responses.
+        Identical requests are answered from the response cache until it expires;
+        the rest wait for a scheduler slot at `priority` ("interactive" or "background").
+        """
+        key = None
+        if use_cache and self.cache is not None:
+            key = request_key(model, messages, temperature, top_p, max_tokens)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        with self._slot(priority):
+            start = time.perf_counter()
+            response = self._request(model, messages, temperature, top_p, max_tokens)
+            completion = response.json()
+        elapsed = time.perf_counter() - start
+        self.blocking_ttft.observe(elapsed)
+        if key is not None:
+            self.cache.set(key, completion, elapsed)
+        return completion
+
+    def chat_completions_stream(self, model, messages, temperature=0.1, top_p=0.1, max_tokens=300,
+                                use_cache=True, priority="interactive"):
+        """
+        Stream a chat completion, yielding content deltas as the server-sent events arrive.
+        A cached reply is yielded as a single delta; a completed stream is cached
+        in the same shape chat_completions_create returns.
+        """
+        key = None
+        if use_cache and self.cache is not None:
+            key = request_key(model, messages, temperature, top_p, max_tokens)
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached["choices"][0]["message"]["content"]
+                return
+
+        # The slot is held until the stream is drained or closed
+        with self._slot(priority):
+            yield from self._stream(model, messages, temperature, top_p, max_tokens, key)
+
+    def _stream(self, model, messages, temperature, top_p, max_tokens, key):
+        start = time.perf_counter()
+        response = self._request(model, messages, temperature, top_p, max_tokens, stream=True)
+        first_token = True
+        parts = []
+        # Server-sent events are UTF-8, but requests decodes a text/event-stream
+        # response without a charset as ISO-8859-1
+        response.encoding = "utf-8"
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    # Only a stream that ran to completion is worth caching
+                    if key is not None:
+                        content = "".join(parts)
+                        completion = {"choices": [{"message": {"role": "assistant", "content": content}}]}
+                        self.cache.set(key, completion, time.perf_counter() - start)
+                    break
+
+                chunk = json.loads(data)
+                # The final usage chunk carries no choices
+                if not chunk.get("choices"):
+                    continue
+                content = chunk["choices"][0].get("delta", {}).get("content")
+                if content:
+                    if first_token:
+                        self.stream_ttft.observe(time.perf_counter() - start)
+                        first_token = False
+                    parts.append(content)
+                    yield content
+        finally:
+            response.close()
+            self.stream_duration.observe(time.perf_counter() - start)
+
+    def stats(self):
+        return {
+            "ttft": {
+                "blocking": self.blocking_ttft.snapshot(),
+                "stream": self.stream_ttft.snapshot(),
+            },
+            "streamDuration": self.stream_duration.snapshot(),
+        }
 
 
 sambanova_client = SambaNovaClient(
     api_key=os.environ.get("SAMVANOVA_API"),
-    base_url="https://api.sambanova.ai/v1",
+    base_url=os.environ.get("SAMBANOVA_BASE_URL", "https://api.sambanova.ai/v1"),
+    cache=llm_cache,
+    scheduler=llm_scheduler,
 )
+metrics.register("sambanova", sambanova_client.stats)
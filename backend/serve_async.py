@@ -0,0 +1,66 @@
+"""
+Cooperative serving mode for the I/O-bound endpoints.
+
+Runs the Flask app on gevent's WSGI server. Every request is a greenlet, and
+sockets are monkey-patched, so a request waiting on Alpaca, NewsData, NewsAPI,
+SambaNova or Firestore yields to the others instead of holding an OS thread.
+One process can then keep hundreds of upstream calls in flight.
+
+Usage:
+    python serve_async.py [--host 127.0.0.1] [--port 5000] [--max-connections 1000]
+
+yfinance downloads go through curl_cffi, which is not monkey-patched, so the
+chart endpoints still block the loop on a cold cache. The prefetcher keeps
+watched symbols warm and runs its downloads on gevent's native thread pool.
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+import argparse
+import os
+
+from gevent import get_hub
+from gevent.pool import Pool
+from gevent.pywsgi import WSGIServer
+
+try:
+    # Firestore talks gRPC, which needs its own gevent integration
+    from grpc.experimental import gevent as grpc_gevent
+    grpc_gevent.init_gevent()
+except ImportError:
+    pass
+
+# Many more requests share each upstream host than under the threaded dev server
+os.environ.setdefault("HTTP_POOL_MAXSIZE", "200")
+
+from market_movers import yfinance_snapshot
+from prefetcher import download
+from server import app, market_movers, prefetcher, sim_valuation, PREFETCH_ENABLED
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the backend with gevent.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--max-connections", type=int, default=1000,
+                        help="Maximum concurrently handled connections")
+    args = parser.parse_args()
+
+    # curl_cffi would block the event loop, so batch downloads run on gevent's native thread pool
+    threadpool = get_hub().threadpool
+    if market_movers.source is yfinance_snapshot:
+        market_movers.source = lambda symbols: threadpool.apply(yfinance_snapshot, (symbols,), {"threads": False})
+    app.session_interface.start()
+    market_movers.start()
+    sim_valuation.start()
+    if PREFETCH_ENABLED:
+        prefetcher.downloader = lambda *args: threadpool.apply(download, args, {"threads": False})
+        prefetcher.start()
+    server = WSGIServer((args.host, args.port), app, spawn=Pool(args.max_connections), log=None)
+    print(f"Serving on http://{args.host}:{args.port} (max {args.max_connections} connections)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,48 @@
-from flask import jsonify, request, session, make_response, Flask
+from flask import jsonify, request, session, make_response, Flask, g, Response, stream_with_context
 import firebase_admin
 from firebase_admin import credentials, auth, firestore
 from dotenv import load_dotenv
 import os
-import requests
-from config import app, PREDEFINED_TICKERS
-import yfinance as yf
+from config import app
 import json
 from yahoo_fin import stock_info as si
 from sambanova_client import sambanova_client
+from llm_scheduler import SchedulerRejected
 from datetime import datetime
+import time
+import threading
 import alpaca_trade_api as tradeapi
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-
-ALPACA_BASE_URL = 'https://paper-api.alpaca.markets/v2'
+from requests import HTTPError
+from ohlc_cache import ohlc_cache, INTERVAL_MAP, INTERVAL_TTLS, PERIOD_WINDOWS
+from bar_store import bar_store
+from bars import hist_to_columns, chart_payload, compact_payload, lttb_indices
+from backtest import STRATEGIES, align_closes, run_backtest
+from indicators import INDICATORS, indicator_cache, json_series, parse_spec
+from sweep import expand_grid, parameter_sweep, rank
+from symbol_index import symbol_index
+from symbol_metadata import symbol_metadata
+from singleflight import upstream_flight
+from http_client import http_client
+from price_cache import price_cache
+from fanout import first_result, gather
+from sentiment import sentiment_scorer
+from portfolio_store import create_portfolio_store
+from prefetcher import create_prefetcher
+from market_movers import create_market_movers, MAX_MOVERS
+from price_stream import create_price_hub, fake_feed, polling_feed
+from sim_valuation import create_sim_valuation
+from auth_tokens import AuthError, create_token_verifier
+import metrics
+
+# Upstream base URLs can be overridden to point the backend at local stub servers
+ALPACA_BASE_URL = os.getenv('ALPACA_BASE_URL', 'https://paper-api.alpaca.markets/v2')
+# Market data is served from its own host, not the trading API
+ALPACA_DATA_URL = os.getenv('ALPACA_DATA_URL', 'https://data.alpaca.markets')
+NEWSDATA_API_URL = os.getenv("NEWSDATA_API_URL", "https://newsdata.io/api/1/news")
+NEWS_API_URL = os.getenv("NEWS_API_URL", "https://newsapi.org/v2/everything")
 # alpaca = tradeapi.REST(os.getenv('ALPACA_API_KEY'), os.getenv('ALPACA_SECRET_KEY'), ALPACA_BASE_URL)
 
 NEWS_API_KEY = os.getenv("NEWS_API")
-analyzer = SentimentIntensityAnalyzer()
 # Load environment variables
 load_dotenv()
 
@@ -28,13 +53,23 @@ if not firebase_cred_path:
 cred = credentials.Certificate(firebase_cred_path)
 firebase_admin.initialize_app(cred)
 
+# Firebase ID tokens are verified locally against Google's cached signing keys
+token_verifier = create_token_verifier(os.getenv("FIREBASE_PROJECT_ID") or cred.project_id)
+# When set, portfolio and simulation endpoints reject requests without a valid ID token
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "").lower() in ("1", "true", "yes")
+if not AUTH_REQUIRED:
+    print("AUTH_REQUIRED is off: requests without an ID token act as the uid they send")
+# Requests per endpoint that fell back to the unverified uid in the request
+auth_fallbacks = {}
+auth_fallbacks_lock = threading.Lock()
+metrics.register("authFallbacks", lambda: dict(auth_fallbacks))
+
 finhub_key = os.getenv("FINHUB_API")
 if not finhub_key:
     raise ValueError("FINHUB environment variable not set.")
 
 NEWSDATA_API_KEY = os.getenv("NEWSDATA_API")
 
-SAMBANOVA_API_URL = "https://api.sambanova.ai/v1/chat/completions"
 SAMBANOVA_API_KEY = os.getenv("SAMVANOVA_API")
 if not SAMBANOVA_API_KEY:
     raise ValueError("SAMBANOVA_API_KEY environment variable not set.")
@@ -42,11 +77,105 @@ if not SAMBANOVA_API_KEY:
 
 # Initialize Firestore
 db = firestore.client()
+portfolio_store = create_portfolio_store(db)
+# Keeps OHLC, prices and names for saved and predefined symbols warm; started from __main__
+prefetcher = create_prefetcher(db)
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1").lower() in ("1", "true", "yes")
+# /top-gainers reads ranked lists from a snapshot refreshed on a timer; also started from __main__
+market_movers = create_market_movers()
+
+# Upper bound on orders per /place-orders batch and on concurrent Alpaca calls per batch
+MAX_BATCH_ORDERS = 100
+
+# Symbols per /stock-names request
+MAX_NAME_SYMBOLS = 100
+
+# LTTB keeps the first and last bar plus at least one in between
+MIN_CHART_POINTS = 3
+
+# Symbols per /run-backtest request and equity-curve points stored on the sim document
+MAX_BACKTEST_SYMBOLS = 500
+MAX_EQUITY_POINTS = 250
+# Best sweep configurations kept on the sim document
+MAX_SWEEP_RESULTS = 10
+ORDER_BATCH_CONCURRENCY = int(os.getenv("ORDER_BATCH_CONCURRENCY", 8))
+
+# Live prices: PRICE_FEED=alpaca polls the latest price per watched symbol, PRICE_FEED=fake
+# publishes a random walk for load tests. Either way one feed runs per symbol, shared by all clients.
+PRICE_FEED_INTERVAL = float(os.getenv("PRICE_FEED_INTERVAL", 5))
+MAX_STREAM_SYMBOLS = 50
+if os.getenv("PRICE_FEED", "alpaca") == "fake":
+    price_hub = create_price_hub(fake_feed(interval=PRICE_FEED_INTERVAL))
+else:
+    price_hub = create_price_hub(polling_feed(lambda symbol: _latest_price(symbol, _alpaca_headers()),
+                                              interval=PRICE_FEED_INTERVAL))
+
+# Sims with positions are marked to market from the price cache; refresh loop started from __main__
+sim_valuation = create_sim_valuation(db, fetch_price=lambda symbol: _latest_price(symbol, _alpaca_headers()))
+
+ORDER_LATENCY = metrics.LatencyHistogram()
+metrics.register("orders", lambda: {"latency": ORDER_LATENCY.snapshot()})
+
+def _fetch_json(url, params):
+    """
+    GET `url` and return (status code, parsed JSON body).
+    """
+    response = http_client.get(url, params=params)
+    return response.status_code, response.json()
+
+@app.before_request
+def authenticate_request():
+    """
+    Verify a Bearer ID token if one is sent and expose its uid as g.uid.
+    """
+    g.uid = None
+    header = request.headers.get("Authorization", "")
+    if request.method == "OPTIONS" or not header.startswith("Bearer "):
+        return None
+    try:
+        g.uid = token_verifier.verify(header[len("Bearer "):])["uid"]
+    except AuthError as e:
+        return jsonify({"error": str(e)}), e.status_code
+
+def _resolve_uid(claimed_uid):
+    """
+    Return the uid a request acts as. A verified token's uid wins; a different uid
+    in the request body is rejected, as is a missing token when AUTH_REQUIRED is set.
+    Otherwise the client's uid is trusted and counted under authFallbacks in /metrics.
+    """
+    if g.get("uid"):
+        if claimed_uid and claimed_uid != g.uid:
+            raise AuthError("Token does not match the requested user.", 403)
+        return g.uid
+    if AUTH_REQUIRED:
+        raise AuthError("An ID token is required.")
+    if claimed_uid:
+        with auth_fallbacks_lock:
+            auth_fallbacks[request.endpoint] = auth_fallbacks.get(request.endpoint, 0) + 1
+            first = auth_fallbacks[request.endpoint] == 1
+        if first:
+            print(f"Unauthenticated request to {request.endpoint} trusted the client uid")
+    return claimed_uid
+
+def _rejected_response(e):
+    """
+    Turn an LLM scheduler rejection into a 429/503 the client can retry.
+    """
+    response = jsonify({"error": str(e)})
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, e.status_code
 
 @app.route("/server-test", methods=['POST'])
 def server_test():
     return jsonify({'message': 'Server OK'})
 
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """
+    Return cache and upstream counters used to size and monitor the backend.
+    """
+    return jsonify(metrics.snapshot()), 200
+
 @app.route("/signup", methods=['POST'])
 def signup():
     data = request.get_json()
@@ -72,6 +201,11 @@ def signup():
 
 @app.route("/login", methods=["POST"])
 def login():
+    # A verified ID token identifies the user without a Firebase Admin lookup
+    if g.get("uid"):
+        session["uid"] = g.uid
+        return jsonify({"message": "Login successful!", "uid": g.uid, 'session uid':session["uid"]}), 200
+
     data = request.get_json()
     email = data.get("email")
     password = data.get("password")
@@ -128,11 +262,14 @@ def logout():
 def get_stock_name(stock_symbol):
     """
     Fetch and return the stock name for a given symbol using yfinance.
+    Symbols yfinance doesn't know are a 404.
     """
     try:
-        # Use yfinance to fetch stock info
-        stock = yf.Ticker(stock_symbol)
-        stock_name = stock.info.get("shortName", "Unknown Stock")  # Get the stock name
+        # The persistent metadata cache calls yfinance only on a miss
+        metadata = symbol_metadata.get(stock_symbol, fields=("name",))
+        if metadata is None:
+            return jsonify({"message": "Error fetching stock name"}), 500
+        stock_name = metadata["name"]
 
         if not stock_name:
             return jsonify({"message": "Stock name not found"}), 404
@@ -145,138 +282,231 @@ def get_stock_name(stock_symbol):
         }), 500
 
 
+@app.route("/stock-names", methods=["GET"])
+def get_stock_names():
+    """
+    Resolve many symbols in one request: ?symbols=AAPL,MSFT returns
+    {"stocks": {"AAPL": {"name", "sector", "exchange"}, ...}}. Cached symbols are
+    answered from memory and only the misses are looked up, a few at a time.
+    A symbol that is unknown or whose lookup failed maps to null.
+    """
+    symbols = list(dict.fromkeys(s.strip().upper() for s in request.args.get("symbols", "").split(",") if s.strip()))
+    if not symbols:
+        return jsonify({"error": "symbols is required"}), 400
+    if len(symbols) > MAX_NAME_SYMBOLS:
+        return jsonify({"error": f"At most {MAX_NAME_SYMBOLS} symbols per request"}), 400
+
+    try:
+        found = symbol_metadata.get_many(symbols)
+        stocks = {}
+        for symbol in symbols:
+            metadata = found.get(symbol)
+            stocks[symbol] = metadata if metadata and metadata["name"] else None
+        return jsonify({"stocks": stocks}), 200
+    except Exception as e:
+        return jsonify({"error": str(e), "message": "Error fetching stock names"}), 500
+
+
+def _chart_columns(symbol, interval):
+    """
+    Return bar columns for `symbol` over one of the INTERVAL_MAP keys, or None if there is no data.
+    """
+    period, yf_interval = INTERVAL_MAP[interval]
+
+    # Read from the local bar store when it was synced within the interval's cache TTL
+    columns = bar_store.read_window(symbol, yf_interval, PERIOD_WINDOWS[period], max_age=INTERVAL_TTLS[yf_interval])
+    if columns is not None:
+        return columns
+
+    # Fetch stock data through the OHLC cache, which tops up stale series incrementally
+    hist = upstream_flight.do(("stock-graph", symbol.upper(), interval), ohlc_cache.get, symbol, interval)
+    if hist.empty:
+        return None
+
+    # Keep the store growing with whatever upstream returned; the chart is served either way
+    try:
+        bar_store.append(symbol, yf_interval, hist)
+    except Exception as e:
+        print(f"Error storing bars for {symbol} {yf_interval}: {e}")
+    # Serialize whole columns at once instead of iterating rows
+    return hist_to_columns(hist)
+
+
 @app.route("/stock-graph/<stock_symbol>/<interval>", methods=["GET"])
 def stock_graph(stock_symbol, interval):
     """
     Fetch stock data for a given symbol and interval using yfinance, 
     and send it as JSON to React with OHLC data for candlestick chart.
+    Pass ?format=compact for a columnar payload of epoch-second times and OHLCV arrays,
+    and ?maxPoints=N to downsample long ranges to at most N points (LTTB for the close
+    line, OHLC buckets for candles).
     """
     try:
-        # Map intervals to yfinance's valid periods and intervals
-        interval_map = {
-            "minutes": ("7d", "5m"),  # Last 7 days, 5-minute interval
-            "days": ("1mo", "1d"),     # Last month, 1-day interval
-            "months": ("1y", "1wk"),   # Last year, 1-week interval
-            "years": ("5y", "1mo")     # Last 5 years, 1-month interval
-        }
-
-        if interval not in interval_map:
+        if interval not in INTERVAL_MAP:
             return jsonify({
                 "message": f"Invalid interval '{interval}'. Valid intervals: minutes, days, months, years."
             }), 400
 
-        period, interval = interval_map[interval]
+        max_points = request.args.get("maxPoints", type=int)
+        if max_points is not None and max_points < MIN_CHART_POINTS:
+            return jsonify({"message": f"maxPoints must be at least {MIN_CHART_POINTS}."}), 400
 
-        # Fetch stock data using yfinance
-        stock = yf.Ticker(stock_symbol)
-        hist = stock.history(period=period, interval=interval)
+        columns = _chart_columns(stock_symbol, interval)
+        if columns is None:
+            return jsonify({
+                "message": "No data found for the stock symbol or interval.",
+                "symbol": stock_symbol,
+                "interval": INTERVAL_MAP[interval][1]
+            }), 400
+
+        # ?format=compact returns one array per field ({"t": [...], "o": [...], ...})
+        if request.args.get("format") == "compact":
+            return jsonify(compact_payload(columns, max_points)), 200
+
+        return jsonify(chart_payload(columns, max_points)), 200
 
-        if hist.empty:
+    except Exception as e:
+        return jsonify({
+            "message": "Error generating stock data.",
+            "error": str(e)
+        }), 500
+
+
+@app.route("/indicators/<stock_symbol>/<interval>", methods=["GET"])
+def indicators(stock_symbol, interval):
+    """
+    Technical indicators over the bars /stock-graph charts for the same symbol and interval.
+    ?indicators=sma:50,rsi:14,macd:12:26:9 picks indicators and positional params
+    (default: every indicator with default params): sma:window, ema:window, rsi:period,
+    macd:fast:slow:signal, bollinger:window:k, vwap. ?maxPoints=N keeps the same points
+    as the downsampled close line. Bars still warming up an indicator are null.
+    """
+    try:
+        if interval not in INTERVAL_MAP:
+            return jsonify({
+                "message": f"Invalid interval '{interval}'. Valid intervals: minutes, days, months, years."
+            }), 400
+
+        max_points = request.args.get("maxPoints", type=int)
+        if max_points is not None and max_points < MIN_CHART_POINTS:
+            return jsonify({"message": f"maxPoints must be at least {MIN_CHART_POINTS}."}), 400
+        specs = [spec.strip() for spec in request.args.get("indicators", ",".join(INDICATORS)).split(",") if spec.strip()]
+        try:
+            parsed = [parse_spec(spec) for spec in specs]
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
+
+        columns = _chart_columns(stock_symbol, interval)
+        if columns is None:
             return jsonify({
                 "message": "No data found for the stock symbol or interval.",
                 "symbol": stock_symbol,
-                "interval": interval
+                "interval": INTERVAL_MAP[interval][1]
             }), 400
 
-        # Extract data for Chart.js
-        labels = hist.index.strftime('%Y-%m-%d').tolist()  # Convert dates to strings
-        data = hist['Close'].tolist()  # Closing prices
+        yf_interval = INTERVAL_MAP[interval][1]
+        keep = slice(None)
+        if max_points is not None and len(columns["t"]) > max_points:
+            keep = lttb_indices(columns["t"], columns["c"], max_points)
 
-        # Prepare OHLC data for candlestick chart (date, open, high, low, close)
-        candle_data = []
-        for index, row in hist.iterrows():
-            candle_data.append({
-                "x": row.name.strftime('%Y-%m-%d'),  
-                "o": float(row['Open']),  
-                "h": float(row['High']),  
-                "l": float(row['Low']),   
-                "c": float(row['Close']),
-            })
+        results = {}
+        for spec, (name, params) in zip(specs, parsed):
+            try:
+                outputs = indicator_cache.compute(stock_symbol, yf_interval, name, params, columns)
+            except ValueError as e:
+                return jsonify({"message": f"Invalid parameters for {spec}: {str(e)}"}), 400
+            results[spec] = {field: json_series(values[keep]) for field, values in outputs.items()}
 
-        return jsonify({"labels": labels, "data": data, "candleData": candle_data}), 200
+        return jsonify({
+            "symbol": stock_symbol.upper(),
+            "interval": yf_interval,
+            "labels": columns["labels"][keep].tolist(),
+            "t": columns["t"][keep].tolist(),
+            "indicators": results,
+        }), 200
 
     except Exception as e:
         return jsonify({
-            "message": "Error generating stock data.",
+            "message": "Error computing indicators.",
             "error": str(e)
         }), 500
 
 
+@app.route("/stream/prices", methods=["GET"])
+def stream_prices():
+    """
+    Push live prices for ?symbols=AAPL,MSFT as server-sent events.
+    Each event is `data: {"symbol", "price", "t", "bar": {"t", "o", "h", "l", "c"}}`,
+    where `bar` is the current one-minute bar. Updates a slow client has not read
+    yet are replaced by newer ones rather than queued.
+    """
+    symbols = [s.strip() for s in request.args.get("symbols", "").split(",") if s.strip()]
+    if not symbols:
+        return jsonify({"error": "symbols is required"}), 400
+    if len(symbols) > MAX_STREAM_SYMBOLS:
+        return jsonify({"error": f"At most {MAX_STREAM_SYMBOLS} symbols per stream"}), 400
+
+    def events():
+        # Subscribing here rather than in the view means a response that is never
+        # iterated (the client went away first) never registers a subscription
+        subscription = price_hub.subscribe(symbols)
+        try:
+            while True:
+                updates = subscription.next(timeout=15)
+                if not updates:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                for update in updates:
+                    yield f"data: {json.dumps(update)}\n\n"
+        finally:
+            price_hub.unsubscribe(subscription)
+
+    return Response(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.route("/autocomplete", methods=["GET"])
 def autocomplete():
     """
-    Fetch up to 5 stock ticker suggestions using predefined data first, 
-    then fallback to yfinance if no matches are found.
+    Return up to 5 stock ticker suggestions from the in-memory symbol index.
+    Matches symbol prefixes first, then company-name word prefixes. Symbols the
+    symbol master has no name for come back with an empty name.
     """
     query = request.args.get("query", "").upper()
     if not query:
         return jsonify({"suggestions": []})
 
     try:
-        # Filter predefined tickers by query
-        predefined_matches = [
-            ticker for ticker in PREDEFINED_TICKERS
-            if query in ticker["symbol"]
-        ][:5]
-
-        # If matches are found in predefined, return them
-        if predefined_matches:
-            return jsonify({"suggestions": predefined_matches})
-
-        # Fallback: Fetch matching tickers from yfinance
-        stock_list = yf.Tickers(query)  # Retrieve tickers matching query
-        tickers = list(stock_list.tickers.keys())
-
-        # Get details for the first 5 matches dynamically
-        dynamic_matches = []
-        for ticker in tickers[:5]:
-            stock_info = yf.Ticker(ticker).info
-            dynamic_matches.append({
-                "symbol": ticker,
-                "name": stock_info.get("shortName", "Unknown")
-            })
-
-        return jsonify({"suggestions": dynamic_matches})
+        return jsonify({"suggestions": symbol_index.search(query, limit=5)})
     except Exception as e:
         return jsonify({"error": str(e), "message": "Error fetching stock suggestions"}), 500
 
 
 @app.route("/top-gainers", methods=["GET"])
 def top_gainers():
+    """
+    Return the top gainers, losers and most active symbols from the in-memory
+    quote snapshot. `?limit=` sets the length of each list (default 3).
+    """
     try:
-        top_gainers_list = [
-            {
-                "symbol": "AAPL",
-                "name": "Apple Inc.",
-                "price": 174.58,
-                "percentChange": "+3.25%",
-                "high": 175.20,
-                "low": 172.50,
-            },
-            {
-                "symbol": "MSFT",
-                "name": "Microsoft Corp.",
-                "price": 312.87,
-                "percentChange": "+2.87%",
-                "high": 315.00,
-                "low": 309.50,
-            },
-            {
-                "symbol": "TSLA",
-                "name": "Tesla Inc.",
-                "price": 227.48,
-                "percentChange": "+5.42%",
-                "high": 230.00,
-                "low": 223.90,
-            },
-        ]
-        print(top_gainers_list)  # Log the top gainers list to check if it's being created correctly
-        return jsonify({"top_gainers": top_gainers_list}), 200
-        
+        limit = min(max(int(request.args.get("limit", 3)), 1), MAX_MOVERS)
+        gainers, as_of = market_movers.get("gainers", limit)
+        losers, _ = market_movers.get("losers", limit)
+        active, _ = market_movers.get("active", limit)
+        return jsonify({
+            "top_gainers": gainers,
+            "top_losers": losers,
+            "most_active": active,
+            "asOf": as_of,
+        }), 200
+
     except Exception as e:
         return jsonify({"error": f"Failed to fetch top gainers: {str(e)}"}), 500
 
-@app.route("/stock-name/<stock_symbol>", methods=["GET"])
+@app.route("/stock-details/<stock_symbol>", methods=["GET"])
 def get_stock_details(stock_symbol):
     """
     Fetch detailed stock metrics using SambaNova AI API for a given stock symbol.
@@ -301,30 +531,26 @@ def get_stock_details(stock_symbol):
             {"role": "user", "content": prompt},
         ]
 
-        # Make the request to SambaNova's API
-        response = requests.post(
-            SAMBANOVA_API_URL,
-            headers={
-                "Authorization": f"Bearer {SAMBANOVA_API_KEY}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": "Meta-Llama-3.1-8B-Instruct",
-                "messages": messages,
-                "temperature": 0.5,
-                "top_p": 0.9,
-                "max_tokens": 300,
-            },
-        )
-
-        if response.status_code != 200:
+        # Ask SambaNova through the client so repeat summaries come from the response cache
+        try:
+            response = sambanova_client.chat_completions_create(
+                model="Meta-Llama-3.1-8B-Instruct",
+                messages=messages,
+                temperature=0.5,
+                top_p=0.9,
+                max_tokens=300,
+                priority="background",
+            )
+        except HTTPError as e:
             return jsonify({
                 "error": "Failed to fetch stock details from SambaNova",
-                "details": response.json()
-            }), response.status_code
+                "details": e.response.text
+            }), e.response.status_code
+        except SchedulerRejected as e:
+            return _rejected_response(e)
 
         # Extract the AI-generated response
-        ai_reply = response.json()["choices"][0]["message"]["content"]
+        ai_reply = response["choices"][0]["message"]["content"]
 
         # Return the AI-generated summary
         return jsonify({
@@ -343,7 +569,7 @@ def get_stock_details(stock_symbol):
 def get_company_news(company_name):
     try:
         # Base URL for NewsData.io
-        url = "https://newsdata.io/api/1/news"
+        url = NEWSDATA_API_URL
 
         # Query parameters
         params = {
@@ -352,12 +578,10 @@ def get_company_news(company_name):
             "language": "en",  # Fetch only English articles
         }
 
-        # Make a GET request to NewsData.io
-        response = requests.get(url, params=params)
-        response.raise_for_status()  # Raise exception for HTTP errors
-
-        # Parse the JSON response
-        news_data = response.json()
+        # Make a GET request to NewsData.io, shared by concurrent requests for the same company
+        status_code, news_data = upstream_flight.do(("news", company_name.lower()), _fetch_json, url, params)
+        if status_code != 200:
+            return jsonify({"error": f"NewsData request failed with status {status_code}"}), 500
 
         # Extract relevant information from articles
         articles = news_data.get("results", [])
@@ -382,17 +606,13 @@ def get_company_news(company_name):
 def fetch_user_sims():
     try:
         data = request.json
-        uid = data.get('uid')
-        sims = []
-        sims_ref = db.collection('users').document(uid).collection('sims')
-        docs = sims_ref.stream()
-        for doc in docs:
-            sims.append({
-                'id':doc.id,
-                **doc.to_dict(),
-            })
+        uid = _resolve_uid(data.get('uid'))
+        # Balances of sims holding positions are kept marked to market in memory
+        sims = sim_valuation.sims(uid)
 
         return jsonify({'message':'Sims fetched successfully', 'sims':sims})
+    except AuthError as e:
+        return jsonify({"error": str(e)}), e.status_code
     except Exception as e:
         return jsonify({'error':f'Error fetching sims from user Error: {str(e)}'})
 
@@ -401,6 +621,8 @@ def fetch_user_sims():
 def sambanova_investment_chat():
     """
     Interact with SambaNova's Chat API to provide investment-focused insights.
+    With {"stream": true} the reply is relayed token by token as server-sent events:
+    `data: {"token": ...}` per token, then `data: [DONE]`.
     """
     user_input = request.json.get("message")
     if not user_input:
@@ -420,6 +642,36 @@ def sambanova_investment_chat():
             {"role": "user", "content": user_input}
         ]
 
+        if request.json.get("stream"):
+            tokens = sambanova_client.chat_completions_stream(
+                model="Meta-Llama-3.1-8B-Instruct",
+                messages=messages,
+                temperature=0.5,
+                top_p=0.1,
+                max_tokens=300
+            )
+            # Wait for the first token here so upstream failures still get a JSON error response
+            first_token = next(tokens, None)
+
+            def relay():
+                try:
+                    if first_token is not None:
+                        yield f"data: {json.dumps({'token': first_token})}\n\n"
+                    for token in tokens:
+                        yield f"data: {json.dumps({'token': token})}\n\n"
+                    yield "data: [DONE]\n\n"
+                except Exception as e:
+                    yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+                finally:
+                    # Runs on client disconnect too, releasing the scheduler slot
+                    tokens.close()
+
+            return Response(
+                stream_with_context(relay()),
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+
         # Use the SambaNova client to create a chat completion
         response = sambanova_client.chat_completions_create(
             model="Meta-Llama-3.1-8B-Instruct",
@@ -433,6 +685,8 @@ def sambanova_investment_chat():
         reply = response["choices"][0]["message"]["content"]
         return jsonify({"response": reply}), 200
 
+    except SchedulerRejected as e:
+        return _rejected_response(e)
     except Exception as e:
         return jsonify({"error": str(e), "message": "Failed to process the request"}), 500
 
@@ -443,27 +697,20 @@ def remove_stock():
     """
     try:
         data = request.json
-        uid = data.get("uid")
+        uid = _resolve_uid(data.get("uid"))
         stock_symbol = data.get("symbol")
 
         if not uid or not stock_symbol:
             return jsonify({"error": "UID and stock symbol are required"}), 400
 
-        # Reference the user's portfolio collection
-        portfolio_ref = db.collection("users").document(uid).collection("portfolio")
-
-        # Query the stock document by its symbol
-        query = portfolio_ref.where("symbol", "==", stock_symbol).limit(1).stream()
-
-        stock_doc = next(query, None)  # Get the first matching document
-        if not stock_doc:
+        # Delete the stock's documents in one batch; the cached portfolio knows their ids
+        if not portfolio_store.remove(uid, stock_symbol):
             return jsonify({"error": f"Stock {stock_symbol} not found in portfolio"}), 404
 
-        # Delete the stock document
-        portfolio_ref.document(stock_doc.id).delete()
-
         return jsonify({"message": f"Stock {stock_symbol} removed successfully"}), 200
 
+    except AuthError as e:
+        return jsonify({"error": str(e)}), e.status_code
     except Exception as e:
         return jsonify({"error": f"Failed to remove stock: {str(e)}"}), 500
 
@@ -473,23 +720,13 @@ def get_portfolio():
     Fetch the list of all stock symbols and names in the user's portfolio.
     """
     try:
-        uid = request.args.get("uid")  # Extract UID from query parameters
+        uid = _resolve_uid(request.args.get("uid"))  # Extract UID from query parameters
 
         if not uid:
             return jsonify({"error": "UID is required to fetch portfolio"}), 400
 
-        # Reference the user's portfolio collection
-        portfolio_ref = db.collection("users").document(uid).collection("portfolio")
-
-        # Fetch all documents in the portfolio collection
-        portfolio_docs = portfolio_ref.stream()
-
-        # Extract and filter out placeholder documents
-        portfolio_items = [
-            {"symbol": doc_data.get("symbol"), "name": doc_data.get("name")}
-            for doc in portfolio_docs
-            if (doc_data := doc.to_dict()).get("symbol") and not doc_data.get("placeholder")
-        ]
+        # Served from the per-user portfolio cache; placeholder documents are already filtered out
+        portfolio_items = portfolio_store.list(uid)
 
         if not portfolio_items:
             return jsonify({
@@ -501,6 +738,8 @@ def get_portfolio():
             "portfolio": portfolio_items
         }), 200
 
+    except AuthError as e:
+        return jsonify({"error": str(e)}), e.status_code
     except Exception as e:
         return jsonify({
             "error": f"Failed to fetch portfolio: {str(e)}"
@@ -517,30 +756,20 @@ def save_stock():
     """
     try:
         data = request.json
-        uid = data.get("uid")
+        uid = _resolve_uid(data.get("uid"))
         stock_symbol = data.get("symbol")
         stock_name = data.get("name")
 
         if not uid or not stock_symbol or not stock_name:
             return jsonify({"error": "UID, stock symbol, and name are required"}), 400
 
-        # Reference the user's portfolio collection
-        portfolio_ref = db.collection("users").document(uid).collection("portfolio")
-
-        # Check if the portfolio collection is empty
-        docs = portfolio_ref.limit(1).stream()
-        if not any(docs):
-            # Add a placeholder document to initialize the portfolio collection
-            portfolio_ref.add({"placeholder": True})
-
-        # Save the stock to the portfolio collection
-        portfolio_ref.add({
-            "symbol": stock_symbol,
-            "name": stock_name
-        })
+        # Save the stock (and the placeholder on the first save) in one batched write
+        portfolio_store.save(uid, stock_symbol, stock_name)
 
         return jsonify({"message": f"Stock {stock_symbol} saved successfully"}), 200
 
+    except AuthError as e:
+        return jsonify({"error": str(e)}), e.status_code
     except firestore.NotFound:
         return jsonify({"error": "User document not found"}), 404
     except Exception as e:
@@ -560,7 +789,7 @@ def new_simulation():
         return response, 200
     try:
         data = request.json
-        uid = data.get('uid')
+        uid = _resolve_uid(data.get('uid'))
         sim_name = data.get('name')
         starting_balance = data.get('startingBalance')
         starting_ticker = data.get('startingTicker')
@@ -583,25 +812,308 @@ def new_simulation():
         }
         sims_ref = db.collection('users').document(uid).collection('sims')
         sims_ref.add(simulation)
+        sim_valuation.invalidate(uid)
 
         # Fetch Alpaca account details to ensure integration
         headers = {
             'APCA-API-KEY-ID': os.getenv('ALPACA_API_KEY'),
             'APCA-API-SECRET-KEY': os.getenv('ALPACA_SECRET_KEY')
         }
-        account_response = requests.get(f'{ALPACA_BASE_URL}/account', headers=headers)
+        account_response = http_client.get(f'{ALPACA_BASE_URL}/account', headers=headers)
         if account_response.status_code != 200:
             return jsonify({'error': 'Failed to fetch Alpaca account'}), 500
 
         # Respond with simulation creation success
         return jsonify({'message': 'Simulation created successfully', 'simulation': simulation}), 200
 
+    except AuthError as e:
+        return jsonify({"error": str(e)}), e.status_code
     except Exception as e:
         return jsonify({'error': f'Error creating simulation: {str(e)}'}), 500
 
 
+class SimRequestError(Exception):
+    """
+    A backtest or sweep request the simulation can't serve, with the status to answer.
+    """
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _preflight_response():
+    # Handle preflight CORS request
+    response = make_response()
+    response.headers["Access-Control-Allow-Origin"] = "http://localhost:3000"
+    response.headers["Access-Control-Allow-Methods"] = "POST, OPTIONS"
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type"
+    response.headers["Access-Control-Allow-Credentials"] = "true"
+    return response, 200
+
+
+def _load_sim_closes(uid, sim_id, symbols, interval):
+    """
+    Look up a simulation and load aligned closes for `symbols` (default: the
+    sim's startingTicker) at `interval`. Bars come from the full stored history
+    when the bar store has the series, otherwise from the chart window.
+
+    Returns (sim_ref, starting balance, symbols with history, bar timestamps,
+    closes matrix); raises SimRequestError when the sim can't be backtested.
+    """
+    if interval not in INTERVAL_MAP:
+        raise SimRequestError(f"Invalid interval '{interval}'. Valid intervals: minutes, days, months, years.")
+
+    sim_ref = db.collection('users').document(uid).collection('sims').document(sim_id)
+    sim = sim_ref.get()
+    if not sim.exists:
+        raise SimRequestError('Simulation not found', 404)
+    sim_data = sim.to_dict()
+    starting_balance = float(sim_data.get('startingBalance') or 0)
+    symbols = symbols or [sim_data.get('startingTicker')]
+    symbols = [symbol.upper() for symbol in symbols if symbol]
+    if not symbols or starting_balance <= 0:
+        raise SimRequestError('The simulation needs symbols and a positive starting balance')
+    if len(symbols) > MAX_BACKTEST_SYMBOLS:
+        raise SimRequestError(f'At most {MAX_BACKTEST_SYMBOLS} symbols per backtest')
+
+    yf_interval = INTERVAL_MAP[interval][1]
+
+    def load(symbol):
+        return bar_store.read(symbol, yf_interval) or _chart_columns(symbol, interval)
+
+    loaded = gather([lambda symbol=symbol: load(symbol) for symbol in symbols],
+                    max_concurrency=ORDER_BATCH_CONCURRENCY)
+    series = {symbol: (columns["t"], columns["c"]) for symbol, columns in zip(symbols, loaded) if columns}
+    if not series:
+        raise SimRequestError('No price history found for the requested symbols')
+
+    t, closes = align_closes(series)
+    return sim_ref, starting_balance, list(series), t, closes
+
+
+@app.route("/run-backtest", methods=['OPTIONS', 'POST'])
+def run_backtest_route():
+    """
+    Backtest a strategy for a simulation and store the results on its document.
+
+    Body: {"uid", "simId", "strategy": "sma_crossover" | "momentum" | "buy_and_hold",
+    "params": {...}, "symbols": [...] (default: the sim's startingTicker),
+    "interval": "days" (any /stock-graph interval), "costBps": 0}.
+    Bars come from the full stored history when the bar store has the series,
+    otherwise from the chart window for the interval.
+    """
+    if request.method == 'OPTIONS':
+        return _preflight_response()
+    try:
+        data = request.json
+        uid = _resolve_uid(data.get('uid'))
+        sim_id = data.get('simId')
+        strategy = data.get('strategy', 'sma_crossover')
+        params = data.get('params') or {}
+        interval = data.get('interval', 'days')
+        if not uid or not sim_id:
+            return jsonify({'error': 'Missing required fields'}), 400
+        if strategy not in STRATEGIES:
+            return jsonify({'error': f"Unknown strategy '{strategy}'. Valid strategies: {', '.join(STRATEGIES)}."}), 400
+
+        sim_ref, starting_balance, symbols, t, closes = _load_sim_closes(uid, sim_id, data.get('symbols'), interval)
+        try:
+            positions = STRATEGIES[strategy](closes, **params)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Invalid strategy parameters: {str(e)}'}), 400
+        result = run_backtest(closes, positions, starting_balance, cost_bps=float(data.get('costBps') or 0))
+
+        # Firestore documents are size-capped, so store a downsampled equity curve
+        curve = lttb_indices(t, result["equity"], MAX_EQUITY_POINTS)
+        summary = {
+            'currentBalance': round(result["finalBalance"], 2),
+            'profitLoss': round(result["profitLoss"], 2),
+            'winRate': round(result["winRate"], 1),
+            'backtest': {
+                'strategy': strategy,
+                'params': params,
+                'symbols': symbols,
+                'interval': interval,
+                'trades': result["trades"],
+                'openPositions': result["openPositions"],
+                'openProfitLoss': round(result["openProfitLoss"], 2),
+                'profitLossPct': round(result["profitLossPct"], 2),
+                'maxDrawdown': round(result["maxDrawdown"] * 100, 2),
+                'symbolProfitLoss': dict(zip(symbols, [round(pnl, 2) for pnl in result["symbolProfitLoss"].tolist()])),
+                'equityCurve': [{'t': int(t[i]), 'equity': round(float(result["equity"][i]), 2)} for i in curve],
+                'ranAt': time.time(),
+            },
+        }
+        sim_ref.update(summary)
+        sim_valuation.invalidate(uid)
+        return jsonify({'message': 'Backtest complete', 'simId': sim_id, **summary}), 200
+
+    except (AuthError, SimRequestError) as e:
+        return jsonify({"error": str(e)}), e.status_code
+    except Exception as e:
+        return jsonify({'error': f'Error running backtest: {str(e)}'}), 500
+
+
+@app.route("/run-sweep", methods=['OPTIONS', 'POST'])
+def run_sweep_route():
+    """
+    Backtest every combination of a parameter grid for a simulation, streaming
+    results as server-sent events while the process pool finishes them.
+
+    Body: {"uid", "simId", "strategy", "grid": {"fast": [10, 20], "slow": [50, 100],
+    "exposure": [0.5, 1]}, "symbols", "interval", "costBps"} (see /run-backtest).
+    `exposure` is the fraction of each sleeve invested while long. Each finished
+    configuration is sent as `data: {"type": "result", "params", ...}`, then
+    `data: {"type": "done", "ranking": [...]}` with the best configurations by
+    return over drawdown, which are also stored on the sim document. If the
+    process pool fails, the stream ends with `event: error`.
+    """
+    if request.method == 'OPTIONS':
+        return _preflight_response()
+    try:
+        data = request.json
+        uid = _resolve_uid(data.get('uid'))
+        sim_id = data.get('simId')
+        strategy = data.get('strategy', 'sma_crossover')
+        interval = data.get('interval', 'days')
+        if not uid or not sim_id or not isinstance(data.get('grid'), dict):
+            return jsonify({'error': 'Missing required fields'}), 400
+        try:
+            configs = expand_grid(strategy, data['grid'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if len(configs) > parameter_sweep.max_configs:
+            return jsonify({'error': f'At most {parameter_sweep.max_configs} configurations per sweep'}), 400
+
+        sim_ref, starting_balance, symbols, _, closes = _load_sim_closes(uid, sim_id, data.get('symbols'), interval)
+        cost_bps = float(data.get('costBps') or 0)
+
+    except (AuthError, SimRequestError) as e:
+        return jsonify({"error": str(e)}), e.status_code
+    except Exception as e:
+        return jsonify({'error': f'Error starting sweep: {str(e)}'}), 500
+
+    def events():
+        finished = []
+        try:
+            for result in parameter_sweep.run(closes, strategy, configs, starting_balance, cost_bps=cost_bps):
+                if "error" not in result:
+                    finished.append(result)
+                yield f"data: {json.dumps({'type': 'result', **result})}\n\n"
+        except Exception as e:
+            # A worker crash (BrokenProcessPool) or a pool that can't start ends the sweep
+            print(f"Sweep for {sim_id} failed: {e!r}")
+            yield f"event: error\ndata: {json.dumps({'error': f'Sweep failed: {e!r}'})}\n\n"
+            return
+
+        ranking = rank(finished)[:MAX_SWEEP_RESULTS]
+        try:
+            sim_ref.update({'sweep': {
+                'strategy': strategy,
+                'symbols': symbols,
+                'interval': interval,
+                'configs': len(configs),
+                'ranking': ranking,
+                'ranAt': time.time(),
+            }})
+            sim_valuation.invalidate(uid)
+        except Exception as e:
+            print(f"Error storing sweep results for {sim_id}: {e}")
+        yield f"data: {json.dumps({'type': 'done', 'configs': len(configs), 'ranking': ranking})}\n\n"
+
+    return Response(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _alpaca_headers():
+    return {
+        'APCA-API-KEY-ID': os.getenv('ALPACA_API_KEY'),
+        'APCA-API-SECRET-KEY': os.getenv('ALPACA_SECRET_KEY')
+    }
+
+def _fetch_quote_price(ticker, headers):
+    response = http_client.get(f'{ALPACA_DATA_URL}/v2/stocks/{ticker}/quotes/latest', headers=headers)
+    if response.status_code != 200:
+        return None
+    # Market is open, use the latest ask or bid price (0 when that side is empty)
+    quote = response.json().get('quote') or {}
+    price = quote.get('ap') or quote.get('bp')
+    return float(price) if price else None
+
+def _fetch_trade_price(ticker, headers):
+    response = http_client.get(f'{ALPACA_DATA_URL}/v2/stocks/{ticker}/trades/latest', headers=headers)
+    if response.status_code != 200:
+        return None
+    # Market is closed, use the last trade price
+    price = (response.json().get('trade') or {}).get('p')
+    return float(price) if price else None
+
+def _latest_price(ticker, headers):
+    """
+    Return the last price for `ticker`, or None if neither quote nor trade data is available.
+    Quote and trade lookups race; the first usable answer is cached briefly for later orders.
+    """
+    last_price = price_cache.get(ticker)
+    if last_price is not None:
+        return last_price
+
+    last_price = upstream_flight.do(("price", ticker.upper()), first_result, [
+        lambda: _fetch_quote_price(ticker, headers),
+        lambda: _fetch_trade_price(ticker, headers),
+    ])
+    if last_price is not None:
+        price_cache.set(ticker, last_price)
+    return last_price
+
+def _place_dollar_order(ticker, dollar_amount, last_price, side, order_type, time_in_force, headers):
+    """
+    Convert a dollar amount into shares at `last_price` and submit the order to Alpaca.
+    Returns (response body, status code).
+    """
+    # Step 3: Calculate the number of shares
+    number_of_shares = round(dollar_amount / last_price, 2)
+
+    # Step 4: Place the order
+    order_data = {
+        'symbol': ticker,
+        'qty': number_of_shares,
+        'side': side,
+        'type': order_type,
+        'time_in_force': time_in_force
+    }
+
+    order_response = http_client.post(
+        f'{ALPACA_BASE_URL}/v2/orders',
+        headers=headers,
+        json=order_data
+    )
+
+    if order_response.status_code == 200:
+        # Order successfully placed
+        return {'message': 'Order placed successfully', 'order': order_response.json()}, 200
+    # Failed to place the order
+    return {'error': 'Failed to place order'}, 500
+
+def _record_sim_fill(uid, sim_id, ticker, side, result, last_price):
+    """
+    Book a placed order into a simulation's positions at `last_price`. A failure is
+    reported on `result` rather than failing the request, since the order went through.
+    """
+    try:
+        shares = float(result['order']['qty'])
+        sim_valuation.record_fill(uid, sim_id, ticker, shares if side == 'buy' else -shares, last_price)
+    except Exception as e:
+        result['simulationError'] = f'Order placed but not recorded on the simulation: {str(e)}'
+
 @app.route('/place-order', methods=['OPTIONS', 'POST'])
 def place_order():
+    """
+    Place a dollar-amount order. With "uid" and "simId" the fill is also booked
+    into that simulation's positions and cash.
+    """
     if request.method == 'OPTIONS':
         # Handle preflight CORS request
         response = make_response()
@@ -611,6 +1123,7 @@ def place_order():
         response.headers["Access-Control-Allow-Credentials"] = "true"
         return response, 200
 
+    start = time.perf_counter()
     try:
         data = request.json
         ticker = data.get('ticker')
@@ -618,68 +1131,106 @@ def place_order():
         order_type = data.get('orderType', 'market')  # Default to market order
         time_in_force = data.get('timeInForce', 'gtc')  # Default to 'Good Till Cancelled'
         side = data.get('side', 'buy')  # Default to 'buy'
+        sim_id = data.get('simId')
+        uid = _resolve_uid(data.get('uid')) if sim_id else None
 
         if not ticker or not dollar_amount or not side:
             return jsonify({'error': 'Missing required fields'}), 400
 
         # Alpaca API headers
-        headers = {
-            'APCA-API-KEY-ID': os.getenv('ALPACA_API_KEY'),
-            'APCA-API-SECRET-KEY': os.getenv('ALPACA_SECRET_KEY')
-        }
+        headers = _alpaca_headers()
+
+        # Steps 1-2: Latest quote and last trade are fetched concurrently; a recent price is reused
+        last_price = _latest_price(ticker, headers)
+        if last_price is None:
+            # Failed to fetch both quote and trade data
+            return jsonify({'error': 'Failed to fetch market or trade data. The market might be closed.'}), 400
+
+        # Steps 3-4: Convert dollars to shares and place the order
+        result, status_code = _place_dollar_order(ticker, dollar_amount, last_price, side, order_type, time_in_force, headers)
+        if status_code == 200 and sim_id:
+            _record_sim_fill(uid, sim_id, ticker, side, result, last_price)
+        return jsonify(result), status_code
+
+    except AuthError as e:
+        return jsonify({"error": str(e)}), e.status_code
+    except Exception as e:
+        return jsonify({'error': f'Error placing order: {str(e)}'}), 500
+    finally:
+        ORDER_LATENCY.observe(time.perf_counter() - start)
 
-        # Step 1: Fetch the latest quote price
-        market_data_response = requests.get(
-            f'{ALPACA_BASE_URL}/v2/stocks/{ticker}/quotes/latest',
-            headers=headers
-        )
+@app.route('/place-orders', methods=['OPTIONS', 'POST'])
+def place_orders():
+    """
+    Place a batch of dollar-amount orders: {"orders": [{"ticker", "dollarAmount", "side"}, ...]}.
+    Prices for all tickers are looked up in parallel, then orders are submitted
+    concurrently with bounded parallelism. Returns one result per order, in order.
+    With "uid" and "simId", placed orders are booked into that simulation.
+    """
+    if request.method == 'OPTIONS':
+        # Handle preflight CORS request
+        response = make_response()
+        response.headers["Access-Control-Allow-Origin"] = "http://localhost:3000"
+        response.headers["Access-Control-Allow-Methods"] = "POST, OPTIONS"
+        response.headers["Access-Control-Allow-Headers"] = "Content-Type"
+        response.headers["Access-Control-Allow-Credentials"] = "true"
+        return response, 200
 
-        if market_data_response.status_code == 200:
-            # Market is open, use the latest quote price
-            market_data = market_data_response.json()
-            last_price = float(market_data['ask_price'] or market_data['bid_price'])  # Use ask or bid price
-        else:
-            # Step 2: Fetch the last trade price as a fallback
-            trade_data_response = requests.get(
-                f'{ALPACA_BASE_URL}/v2/stocks/{ticker}/trades/latest',
-                headers=headers
+    start = time.perf_counter()
+    try:
+        data = request.json
+        orders = data.get('orders')
+        if not isinstance(orders, list) or not orders:
+            return jsonify({'error': 'A non-empty list of orders is required'}), 400
+        if len(orders) > MAX_BATCH_ORDERS:
+            return jsonify({'error': f'At most {MAX_BATCH_ORDERS} orders per batch'}), 400
+        sim_id = data.get('simId')
+        uid = _resolve_uid(data.get('uid')) if sim_id else None
+
+        headers = _alpaca_headers()
+
+        # Step 1: Fetch the price of every distinct ticker in parallel
+        tickers = sorted({order.get('ticker') for order in orders if order.get('ticker')})
+        prices = dict(zip(tickers, gather(
+            [lambda ticker=ticker: _latest_price(ticker, headers) for ticker in tickers],
+            max_concurrency=ORDER_BATCH_CONCURRENCY,
+        )))
+
+        def submit(order):
+            ticker = order.get('ticker')
+            side = order.get('side', 'buy')
+            try:
+                dollar_amount = float(order.get('dollarAmount') or 0)
+            except (TypeError, ValueError):
+                dollar_amount = 0
+            if not ticker or dollar_amount <= 0 or side not in ('buy', 'sell'):
+                return {'ticker': ticker, 'status': 400, 'error': 'Missing or invalid order fields'}
+
+            last_price = prices.get(ticker)
+            if last_price is None:
+                return {'ticker': ticker, 'status': 400,
+                        'error': 'Failed to fetch market or trade data. The market might be closed.'}
+
+            result, status_code = _place_dollar_order(
+                ticker, dollar_amount, last_price, side,
+                order.get('orderType', 'market'), order.get('timeInForce', 'gtc'), headers,
             )
-            if trade_data_response.status_code == 200:
-                # Market is closed, use the last trade price
-                trade_data = trade_data_response.json()
-                last_price = float(trade_data['price'])
-            else:
-                # Failed to fetch both quote and trade data
-                return jsonify({'error': 'Failed to fetch market or trade data. The market might be closed.'}), 400
-
-        # Step 3: Calculate the number of shares
-        number_of_shares = round(dollar_amount / last_price, 2)
-
-        # Step 4: Place the order
-        order_data = {
-            'symbol': ticker,
-            'qty': number_of_shares,
-            'side': side,
-            'type': order_type,
-            'time_in_force': time_in_force
-        }
-
-        order_response = requests.post(
-            f'{ALPACA_BASE_URL}/v2/orders',
-            headers=headers,
-            json=order_data
-        )
-
-        if order_response.status_code == 200:
-            # Order successfully placed
-            order_result = order_response.json()
-            return jsonify({'message': 'Order placed successfully', 'order': order_result}), 200
-        else:
-            # Failed to place the order
-            return jsonify({'error': 'Failed to place order'}), 500
-
+            if status_code == 200 and sim_id:
+                _record_sim_fill(uid, sim_id, ticker, side, result, last_price)
+            return {'ticker': ticker, 'status': status_code, **result}
+
+        # Step 2: Submit the orders concurrently
+        results = gather([lambda order=order: submit(order) for order in orders],
+                         max_concurrency=ORDER_BATCH_CONCURRENCY)
+        placed = sum(1 for result in results if result['status'] == 200)
+        return jsonify({'message': f'Placed {placed} of {len(orders)} orders', 'results': results}), 200
+
+    except AuthError as e:
+        return jsonify({"error": str(e)}), e.status_code
     except Exception as e:
-        return jsonify({'error': f'Error placing order: {str(e)}'}), 500
+        return jsonify({'error': f'Error placing orders: {str(e)}'}), 500
+    finally:
+        ORDER_LATENCY.observe(time.perf_counter() - start)
 
 @app.route("/news-sentiment/<company_name>", methods=["GET"])
 def get_news_sentiment(company_name):
@@ -687,7 +1238,7 @@ def get_news_sentiment(company_name):
         if not NEWS_API_KEY:
             return jsonify({"error": "News API key not configured."}), 500
 
-        url = "https://newsapi.org/v2/everything"
+        url = NEWS_API_URL
         params = {
             "q": company_name,
             "apiKey": NEWS_API_KEY,
@@ -695,38 +1246,31 @@ def get_news_sentiment(company_name):
             "sortBy": "publishedAt",
         }
 
-        # Fetch news articles
-        response = requests.get(url, params=params)
-        if response.status_code != 200:
+        # Fetch news articles, shared by concurrent requests for the same company
+        status_code, news_data = upstream_flight.do(("news-sentiment", company_name.lower()), _fetch_json, url, params)
+        if status_code != 200:
             return jsonify({
                 "error": "Failed to fetch news articles.",
-                "details": response.json()
-            }), response.status_code
+                "details": news_data
+            }), status_code
 
-        articles = response.json().get("articles", [])
+        articles = news_data.get("articles", [])
         if not articles:
             return jsonify({"error": "No articles found."}), 404
 
-        # Sentiment analysis
-        sentiment_results = []
-        for article in articles:
-            title = article.get("title", "")
-            description = article.get("description", "")
-            content = f"{title}. {description}"
-            print(f"Analyzing content: {content}")  # Debug log
+        # Sentiment analysis, batched and memoized so repeat views only score new articles
+        contents = [f"{article.get('title', '')}. {article.get('description', '')}" for article in articles]
+        sentiment_scores = sentiment_scorer.score(contents)
 
-            try:
-                sentiment_score = analyzer.polarity_scores(content)
-            except Exception as e:
-                print(f"Sentiment analysis error: {e}")
-                sentiment_score = {"compound": 0}  # Default to neutral sentiment
-
-            sentiment_results.append({
+        sentiment_results = [
+            {
                 "date": article.get("publishedAt"),
-                "title": title,
-                "description": description,
+                "title": article.get("title", ""),
+                "description": article.get("description", ""),
                 "sentiment": sentiment_score,
-            })
+            }
+            for article, sentiment_score in zip(articles, sentiment_scores)
+        ]
 
         # Extract labels and scores
         labels = [item["date"] for item in sentiment_results]
@@ -741,20 +1285,27 @@ def get_news_sentiment(company_name):
 def is_saved():
     try:
         data = request.json
-        uid = data.get('uid')
+        uid = _resolve_uid(data.get('uid'))
         if not uid:
             return jsonify({'error':'Missing UserID'}), 400
 
-        portfolio_ref = db.collection('users').document(uid).collection('portfolio')
-        query = portfolio_ref.where('symbol', '==', data.get('symbol')).stream()
-        for doc in query:
+        if portfolio_store.contains(uid, data.get('symbol')):
             return jsonify({'message':'Found a match', 'isSaved':True})
         
         return jsonify({'message':'Did not find a match', 'isSaved':False})
+    except AuthError as e:
+        return jsonify({"error": str(e)}), e.status_code
     except Exception as e:
         return jsonify({'error':f'Error occured {str(e)}'})
 
 
 
 if __name__ == "__main__":
+    # With the debug reloader only the serving child process prefetches
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        app.session_interface.start()
+        market_movers.start()
+        sim_valuation.start()
+        if PREFETCH_ENABLED:
+            prefetcher.start()
     app.run(debug=True)
@@ -0,0 +1,211 @@
+import pickle
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+import metrics
+
+SESSION_BUCKETS_MS = (0.05, 0.1, 0.5, 1, 5, 10, 50, 100, 500)
+
+
+class MemorySessionStore:
+    """
+    Single-node session store: an LRU of session dicts with a TTL.
+    """
+
+    def __init__(self, max_entries=10000, ttl=86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expired = 0
+
+    def get(self, sid):
+        with self._lock:
+            entry = self._sessions.get(sid)
+            if entry is None:
+                return None
+            data, expires_at = entry
+            if expires_at <= time.time():
+                del self._sessions[sid]
+                self.expired += 1
+                return None
+            self._sessions.move_to_end(sid)
+            return dict(data)
+
+    def set(self, sid, data):
+        with self._lock:
+            self._sessions[sid] = (dict(data), time.time() + self.ttl)
+            self._sessions.move_to_end(sid)
+            while len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def sweep(self):
+        """
+        Drop expired sessions. Returns how many were removed.
+        """
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, (_, expires_at) in self._sessions.items() if expires_at <= now]
+            for sid in expired:
+                del self._sessions[sid]
+            self.expired += len(expired)
+        return len(expired)
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._sessions), "evictions": self.evictions, "expired": self.expired}
+
+
+class RedisSessionStore:
+    """
+    Shared session store for multiple workers or nodes. Redis expires keys itself.
+    """
+
+    def __init__(self, url, ttl=86400, prefix="session:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, sid):
+        raw = self.client.get(self.prefix + sid)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, sid, data):
+        self.client.setex(self.prefix + sid, self.ttl, pickle.dumps(dict(data)))
+
+    def delete(self, sid):
+        self.client.delete(self.prefix + sid)
+
+    def sweep(self):
+        return 0
+
+    def stats(self):
+        # Counting live sessions would mean scanning the keyspace on every scrape
+        return {}
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(session):
+            session.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Flask session interface that keeps session data in a pluggable store and only
+    a signed session id in the cookie. After start(), a daemon thread sweeps
+    expired sessions.
+    """
+
+    def __init__(self, store, sweep_interval=300):
+        self.store = store
+        self.sweep_interval = sweep_interval
+        self._thread = None
+        # Store round trips are sub-millisecond in memory, so use finer buckets than the default
+        self.get_latency = metrics.LatencyHistogram(buckets_ms=SESSION_BUCKETS_MS)
+        self.set_latency = metrics.LatencyHistogram(buckets_ms=SESSION_BUCKETS_MS)
+
+    def start(self):
+        if self.sweep_interval and self._thread is None:
+            self._thread = threading.Thread(target=self._sweep_forever, args=(self.sweep_interval,), daemon=True)
+            self._thread.start()
+
+    def _sweep_forever(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.store.sweep()
+            except Exception as e:
+                print(f"Session sweep failed: {e}")
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt="server-side-session")
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            if sid:
+                start = time.perf_counter()
+                data = self.store.get(sid)
+                self.get_latency.observe(time.perf_counter() - start)
+                if data is not None:
+                    return ServerSideSession(data, sid=sid)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        name = self.get_cookie_name(app)
+
+        if not session:
+            if session.modified:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if not self.should_set_cookie(app, session):
+            return
+
+        start = time.perf_counter()
+        self.store.set(session.sid, dict(session))
+        self.set_latency.observe(time.perf_counter() - start)
+
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid.encode()).decode(),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+    def stats(self):
+        return {
+            **self.store.stats(),
+            "getLatency": self.get_latency.snapshot(),
+            "setLatency": self.set_latency.snapshot(),
+        }
+
+
+def create_session_interface(backend="memory", ttl=86400, max_entries=10000, redis_url=None, sweep_interval=300):
+    """
+    Build the session interface for SESSION_BACKEND: "memory" (single node) or "redis" (shared).
+    """
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("SESSION_REDIS_URL must be set when SESSION_BACKEND is 'redis'.")
+        store = RedisSessionStore(redis_url, ttl=ttl)
+        sweep_interval = 0
+    elif backend == "memory":
+        store = MemorySessionStore(max_entries=max_entries, ttl=ttl)
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND '{backend}'. Valid backends: memory, redis.")
+
+    interface = ServerSideSessionInterface(store, sweep_interval=sweep_interval)
+    metrics.register("sessions", interface.stats)
+    return interface
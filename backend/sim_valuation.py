@@ -0,0 +1,397 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from firebase_admin import firestore
+from google.api_core.exceptions import FailedPrecondition, NotFound
+
+import metrics
+from fanout import gather
+from price_cache import price_cache
+
+# Firestore accepts at most 500 writes per batch
+MAX_BATCH_WRITES = 500
+
+
+class _Book:
+    """
+    A sim's positions as parallel arrays of symbol ids and share counts.
+    """
+    __slots__ = ("symbol_ids", "shares", "cash", "starting_balance")
+
+    def __init__(self, symbol_ids, shares, cash, starting_balance):
+        self.symbol_ids = symbol_ids
+        self.shares = shares
+        self.cash = cash
+        self.starting_balance = starting_balance
+
+
+class _User:
+    __slots__ = ("sims", "update_times", "loaded_at")
+
+    def __init__(self, sims, update_times, loaded_at):
+        # sim id -> sim document, and the document version it was read at
+        self.sims = sims
+        self.update_times = update_times
+        self.loaded_at = loaded_at
+
+
+class SimValuation:
+    """
+    Keeps simulations marked to market from the shared price cache.
+
+    A sim holds `simulatedCash` plus a `positions` map of {symbol: shares}. Its
+    currentBalance is the cash plus each position at the last known price, and
+    profitLoss is measured against startingBalance. Sims without positions
+    (never traded, or only backtested) keep the balance stored on them.
+
+    A user's sims are read from Firestore once and kept in memory. Positions are
+    held as small numpy arrays indexed into one array of latest prices, and an
+    index from symbol to the sims holding it means only sims holding a symbol
+    whose price moved are re-valued. Changed balances are queued and written
+    back in batched commits by the refresh loop, so dashboard reads are served
+    from memory. Each write is conditional on the document being unchanged
+    since it was read, so a balance marked from a stale copy never overwrites
+    a fill another worker applied; that user's sims are reloaded instead.
+    """
+
+    def __init__(self, db, prices=price_cache, fetch_price=None, refresh_interval=15,
+                 max_users=10000, ttl=300, fetch_concurrency=8):
+        self.db = db
+        self.prices = prices
+        self.fetch_price = fetch_price
+        self.fetch_concurrency = fetch_concurrency
+        self.refresh_interval = refresh_interval
+        self.max_users = max_users
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._fill_lock = threading.Lock()
+        self._thread = None
+        self._users = OrderedDict()
+        self._books = {}
+        self._holders = {}
+        self._symbol_ids = {}
+        self._latest = np.full(64, np.nan)
+        self._version = 0
+        self._pending = {}
+        self.loads = 0
+        self.hits = 0
+        self.revalued = 0
+        self.writes = 0
+        self.commits = 0
+        self.failures = 0
+        self.mark_latency = metrics.LatencyHistogram(buckets_ms=(0.1, 0.5, 1, 5, 10, 50, 100))
+
+    def _collection(self, uid):
+        return self.db.collection("users").document(uid).collection("sims")
+
+    def _symbol_id(self, symbol):
+        # Caller holds the lock
+        symbol_id = self._symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self._symbol_ids[symbol] = len(self._symbol_ids)
+            if symbol_id >= len(self._latest):
+                grown = np.full(len(self._latest) * 2, np.nan)
+                grown[:len(self._latest)] = self._latest
+                self._latest = grown
+        return symbol_id
+
+    def _track(self, uid, sim_id, doc):
+        # Caller holds the lock
+        key = (uid, sim_id)
+        self._untrack(key)
+        positions = {symbol.upper(): float(shares) for symbol, shares in (doc.get("positions") or {}).items()
+                     if shares}
+        if not positions:
+            return
+        symbol_ids = np.array([self._symbol_id(symbol) for symbol in positions], dtype=np.int32)
+        self._books[key] = _Book(
+            symbol_ids,
+            np.fromiter(positions.values(), dtype=np.float64, count=len(positions)),
+            float(doc.get("simulatedCash") or 0),
+            float(doc.get("startingBalance") or 0),
+        )
+        for symbol_id in symbol_ids.tolist():
+            self._holders.setdefault(symbol_id, set()).add(key)
+
+    def _untrack(self, key):
+        # Caller holds the lock
+        book = self._books.pop(key, None)
+        if book is None:
+            return
+        for symbol_id in book.symbol_ids.tolist():
+            holders = self._holders.get(symbol_id)
+            if holders is not None:
+                holders.discard(key)
+                if not holders:
+                    del self._holders[symbol_id]
+
+    def _revalue(self, keys):
+        # Caller holds the lock
+        for key in keys:
+            book = self._books[key]
+            prices = self._latest[book.symbol_ids]
+            if np.isnan(prices).any():
+                # Keep the stored balance until every held symbol has a price
+                continue
+            balance = round(book.cash + float(book.shares @ prices), 2)
+            profit_loss = round(balance - book.starting_balance, 2)
+            user = self._users[key[0]]
+            doc = user.sims[key[1]]
+            if doc.get("currentBalance") != balance or doc.get("profitLoss") != profit_loss:
+                doc["currentBalance"] = balance
+                doc["profitLoss"] = profit_loss
+                self._pending[key] = ({"currentBalance": balance, "profitLoss": profit_loss},
+                                      user.update_times.get(key[1]))
+            self.revalued += 1
+
+    def _load(self, uid):
+        with self._lock:
+            user = self._users.get(uid)
+            if user is not None and time.time() - user.loaded_at < self.ttl:
+                self._users.move_to_end(uid)
+                self.hits += 1
+                return
+
+        snapshots = list(self._collection(uid).stream())
+        sims = {doc.id: doc.to_dict() for doc in snapshots}
+        update_times = {doc.id: doc.update_time for doc in snapshots}
+
+        with self._lock:
+            self.loads += 1
+            old = self._users.pop(uid, None)
+            if old is not None:
+                for sim_id in old.sims:
+                    self._untrack((uid, sim_id))
+            self._users[uid] = _User(sims, update_times, time.time())
+            for sim_id, doc in sims.items():
+                self._track(uid, sim_id, doc)
+            self._revalue([(uid, sim_id) for sim_id in sims if (uid, sim_id) in self._books])
+            while len(self._users) > self.max_users:
+                evicted_uid, evicted = self._users.popitem(last=False)
+                # Queued balances for the evicted user are still written by the next flush
+                for sim_id in evicted.sims:
+                    self._untrack((evicted_uid, sim_id))
+
+    def mark(self):
+        """
+        Apply prices written to the price cache since the last mark, re-valuing
+        only the sims that hold one of those symbols.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            changed, self._version = self.prices.changed_since(self._version)
+            dirty = set()
+            for symbol, price in changed.items():
+                symbol_id = self._symbol_id(symbol)
+                if self._latest[symbol_id] != price:
+                    self._latest[symbol_id] = price
+                    dirty |= self._holders.get(symbol_id, set())
+            self._revalue(dirty)
+        self.mark_latency.observe(time.perf_counter() - start)
+
+    def sims(self, uid):
+        """
+        Return [{"id", **sim}, ...] for the user with balances marked to market.
+        """
+        self._load(uid)
+        self.mark()
+        with self._lock:
+            user = self._users.get(uid)
+            return [{"id": sim_id, **doc} for sim_id, doc in user.sims.items()] if user else []
+
+    def record_fill(self, uid, sim_id, symbol, shares, price):
+        """
+        Apply a filled order to a sim: `shares` is positive for a buy and negative
+        for a sell at `price`. Positions and cash are read and written back in a
+        Firestore transaction, so fills from other workers aren't overwritten; the
+        balance follows through the regular write-back.
+        """
+        symbol = symbol.upper()
+        ref = self._collection(uid).document(sim_id)
+
+        @firestore.transactional
+        def apply(transaction):
+            snapshot = ref.get(transaction=transaction)
+            if not snapshot.exists:
+                raise ValueError(f"Simulation {sim_id} not found")
+            doc = snapshot.to_dict()
+            positions = {s.upper(): float(n) for s, n in (doc.get("positions") or {}).items()}
+            held = round(positions.get(symbol, 0.0) + shares, 6)
+            if held:
+                positions[symbol] = held
+            else:
+                positions.pop(symbol, None)
+            cash = round(float(doc.get("simulatedCash") or 0) - shares * price, 2)
+            fields = {"positions": positions, "simulatedCash": cash}
+            if not positions:
+                # Closing the last position leaves only cash, which no later mark re-values
+                fields["currentBalance"] = cash
+                fields["profitLoss"] = round(cash - float(doc.get("startingBalance") or 0), 2)
+            transaction.update(ref, fields)
+
+        with self._fill_lock:
+            apply(self.db.transaction())
+            # Re-read for the version the fill produced; later balance writes are conditional on it
+            snapshot = ref.get()
+            with self._lock:
+                # A fill is a fresh price for the symbol
+                self._latest[self._symbol_id(symbol)] = price
+                user = self._users.get(uid)
+                if user is None:
+                    return
+                if not snapshot.exists:
+                    self._forget(uid, sim_id)
+                    return
+                doc = user.sims[sim_id] = snapshot.to_dict()
+                user.update_times[sim_id] = snapshot.update_time
+                self._track(uid, sim_id, doc)
+                # A balance queued from the previous version would now fail its precondition
+                self._pending.pop((uid, sim_id), None)
+                if (uid, sim_id) in self._books:
+                    self._revalue([(uid, sim_id)])
+
+    def flush(self):
+        """
+        Write queued balances back to Firestore in batched commits. Returns the number written.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        items = list(pending.items())
+        written = 0
+        for i in range(0, len(items), MAX_BATCH_WRITES):
+            chunk = items[i:i + MAX_BATCH_WRITES]
+            batch = self.db.batch()
+            for (uid, sim_id), (fields, update_time) in chunk:
+                batch.update(self._collection(uid).document(sim_id), fields, option=self._precondition(update_time))
+            try:
+                results = batch.commit()
+            except Exception as e:
+                print(f"Error writing sim balances: {e}")
+                with self._lock:
+                    self.failures += 1
+                # One changed or deleted sim fails the whole batch, so retry them one at a time
+                written += sum(self._write_one(key, fields, update_time) for key, (fields, update_time) in chunk)
+                continue
+            with self._lock:
+                self.commits += 1
+                for (key, (_, update_time)), result in zip(chunk, results):
+                    self._written(key, update_time, result)
+            written += len(chunk)
+        return written
+
+    def _precondition(self, update_time):
+        # Only write over the document version the balance was marked from
+        return self.db.write_option(last_update_time=update_time) if update_time is not None else None
+
+    def _write_one(self, key, fields, update_time):
+        """
+        Write one sim's balance. Returns 1 if written, else 0.
+        """
+        uid, sim_id = key
+        try:
+            result = self._collection(uid).document(sim_id).update(fields, option=self._precondition(update_time))
+        except FailedPrecondition:
+            # Another worker changed the sim (a fill); reload the user's sims rather than overwrite it
+            self.invalidate(uid)
+            return 0
+        except NotFound:
+            with self._lock:
+                self._forget(uid, sim_id)
+            return 0
+        except Exception as e:
+            print(f"Error writing sim balance for {sim_id}: {e}")
+            with self._lock:
+                self.failures += 1
+                # Retry sims still being tracked, unless a newer balance was queued meanwhile
+                if key in self._books:
+                    self._pending.setdefault(key, (fields, update_time))
+            return 0
+        with self._lock:
+            self.commits += 1
+            self._written(key, update_time, result)
+        return 1
+
+    def _written(self, key, update_time, result):
+        # Caller holds the lock
+        self.writes += 1
+        user = self._users.get(key[0])
+        # Advance the version unless a fill re-read the sim meanwhile
+        if user is not None and user.update_times.get(key[1]) == update_time:
+            user.update_times[key[1]] = result.update_time
+
+    def _forget(self, uid, sim_id):
+        # Caller holds the lock; the sim document is gone
+        self._untrack((uid, sim_id))
+        self._pending.pop((uid, sim_id), None)
+        user = self._users.get(uid)
+        if user is not None:
+            user.sims.pop(sim_id, None)
+            user.update_times.pop(sim_id, None)
+
+    def invalidate(self, uid):
+        """
+        Drop the user's cached sims so the next read reloads them from Firestore.
+        """
+        with self._lock:
+            user = self._users.pop(uid, None)
+            if user is not None:
+                for sim_id in user.sims:
+                    self._untrack((uid, sim_id))
+
+    def refresh(self):
+        """
+        Refresh prices of held symbols, re-value the sims holding the ones that
+        moved, and write the new balances back.
+        """
+        if self.fetch_price is not None:
+            with self._lock:
+                held = [symbol for symbol, symbol_id in self._symbol_ids.items() if symbol_id in self._holders]
+            # fetch_price is expected to store what it finds in the price cache
+            gather([lambda symbol=symbol: self.fetch_price(symbol) for symbol in held], max_concurrency=self.fetch_concurrency)
+        self.mark()
+        self.flush()
+
+    def _refresh_forever(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing sim valuations: {e}")
+                with self._lock:
+                    self.failures += 1
+            time.sleep(self.refresh_interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._refresh_forever, daemon=True)
+            self._thread.start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "trackedSims": len(self._books),
+                "heldSymbols": len(self._holders),
+                "loads": self.loads,
+                "hits": self.hits,
+                "revalued": self.revalued,
+                "pendingWrites": len(self._pending),
+                "writes": self.writes,
+                "commits": self.commits,
+                "failures": self.failures,
+                "markLatency": self.mark_latency.snapshot(),
+            }
+
+
+def create_sim_valuation(db, fetch_price=None):
+    valuation = SimValuation(
+        db,
+        fetch_price=fetch_price,
+        refresh_interval=float(os.environ.get("SIM_VALUATION_INTERVAL", 15)),
+        ttl=float(os.environ.get("SIM_CACHE_TTL", 300)),
+    )
+    metrics.register("simValuation", valuation.stats)
+    return valuation
@@ -0,0 +1,73 @@
+import threading
+
+import metrics
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the function; callers that arrive while it
+    is in flight wait for it and receive the same result (or exception).
+    Results are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) once per in-flight `key`. key[0] names the endpoint.
+        """
+        with self._lock:
+            counts = self._counts.setdefault(key[0], {"calls": 0, "coalesced": 0})
+            call = self._calls.get(key)
+            if call is not None:
+                counts["coalesced"] += 1
+                leader = False
+            else:
+                counts["calls"] += 1
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            by_endpoint = {endpoint: dict(counts) for endpoint, counts in self._counts.items()}
+            return {
+                "inFlight": len(self._calls),
+                "calls": sum(c["calls"] for c in by_endpoint.values()),
+                "coalesced": sum(c["coalesced"] for c in by_endpoint.values()),
+                "byEndpoint": by_endpoint,
+            }
+
+
+upstream_flight = SingleFlight()
+metrics.register("singleFlight", upstream_flight.stats)
@@ -0,0 +1,185 @@
+import inspect
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import metrics
+from backtest import STRATEGIES, run_backtest
+
+# Grid keys that go to run_backtest rather than to the strategy
+BACKTEST_PARAMS = ("exposure",)
+# Drawdowns shallower than this (in percent) rank as if they were this deep,
+# so a flat curve with a tiny return doesn't outrank everything else
+MIN_RANK_DRAWDOWN_PCT = 1.0
+
+# Segments a pool worker has attached to, by name
+_attached = {}
+
+
+def _attach(name, shape, dtype):
+    """
+    Map the shared closes matrix `name` into this worker, once per sweep.
+    """
+    if name not in _attached:
+        # A new sweep replaced the old matrix; drop our mapping of the old one
+        for old_name in list(_attached):
+            segment, _ = _attached.pop(old_name)
+            segment.close()
+        segment = shared_memory.SharedMemory(name=name)
+        closes = np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+        closes.flags.writeable = False
+        _attached[name] = (segment, closes)
+    return _attached[name][1]
+
+
+def _run_config(matrix, strategy, params, starting_balance, cost_bps):
+    """
+    Backtest one configuration against the shared closes. Runs in a pool worker.
+    """
+    closes = _attach(*matrix)
+    strategy_params = {key: value for key, value in params.items() if key not in BACKTEST_PARAMS}
+    backtest_params = {key: value for key, value in params.items() if key in BACKTEST_PARAMS}
+    result = run_backtest(closes, STRATEGIES[strategy](closes, **strategy_params), starting_balance,
+                          cost_bps=cost_bps, **backtest_params)
+    return {
+        "finalBalance": round(result["finalBalance"], 2),
+        "profitLoss": round(result["profitLoss"], 2),
+        "profitLossPct": round(result["profitLossPct"], 2),
+        "maxDrawdown": round(result["maxDrawdown"] * 100, 2),
+        "winRate": round(result["winRate"], 1),
+        "trades": result["trades"],
+        "openPositions": result["openPositions"],
+    }
+
+
+def expand_grid(strategy, grid):
+    """
+    Return every combination of the `grid` values ({"fast": [10, 20], ...}) as a
+    list of param dicts. Raises ValueError for unknown strategies or parameters.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}'. Valid strategies: {', '.join(STRATEGIES)}.")
+    allowed = set(list(inspect.signature(STRATEGIES[strategy]).parameters)[1:]) | set(BACKTEST_PARAMS)
+    unknown = sorted(set(grid) - allowed)
+    if unknown:
+        raise ValueError(f"Unknown parameters for {strategy}: {', '.join(unknown)}")
+    keys = list(grid)
+    values = [value if isinstance(value, list) else [value] for value in grid.values()]
+    return [dict(zip(keys, combination)) for combination in itertools.product(*values)]
+
+
+def rank(results):
+    """
+    Order finished configurations by return over drawdown, best first.
+    """
+    def score(result):
+        return result["profitLossPct"] / max(-result["maxDrawdown"], MIN_RANK_DRAWDOWN_PCT)
+    return sorted(results, key=lambda result: (score(result), result["profitLossPct"]), reverse=True)
+
+
+def _worker_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class ParameterSweep:
+    """
+    Runs many backtest configurations over one closes matrix on a process pool.
+
+    The matrix is copied once into a shared-memory segment, and workers map it
+    by name instead of receiving a pickled copy per task, so each task only
+    ships its parameters and a small result dict. Results are yielded as
+    workers finish them. Workers are started with forkserver (spawn where that is
+    unavailable): forking the server would copy its gRPC channels, locks and
+    gevent hub into every worker in whatever state another thread left them.
+    """
+
+    def __init__(self, workers=None, max_configs=500):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_configs = max_configs
+        self._lock = threading.Lock()
+        self._pool = None
+        self.sweeps = 0
+        self.configs = 0
+        self.failed = 0
+        self.sweep_latency = metrics.LatencyHistogram(buckets_ms=(100, 500, 1000, 5000, 10000, 30000, 60000))
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_worker_context())
+            return self._pool
+
+    def run(self, closes, strategy, configs, starting_balance, cost_bps=0.0):
+        """
+        Backtest each param dict in `configs`, yielding
+        {"params", **metrics} (or {"params", "error"}) in completion order.
+        Pending configurations are cancelled if the caller stops iterating.
+        """
+        if len(configs) > self.max_configs:
+            raise ValueError(f"At most {self.max_configs} configurations per sweep")
+        closes = np.ascontiguousarray(closes, dtype=np.float64)
+        segment = shared_memory.SharedMemory(create=True, size=max(closes.nbytes, 1))
+        try:
+            np.ndarray(closes.shape, dtype=closes.dtype, buffer=segment.buf)[:] = closes
+            matrix = (segment.name, closes.shape, closes.dtype.str)
+            pool = self._get_pool()
+            with self._lock:
+                self.sweeps += 1
+            start = time.perf_counter()
+            pending = {}
+            try:
+                for params in configs:
+                    pending[pool.submit(_run_config, matrix, strategy, params, starting_balance, cost_bps)] = params
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        params = pending.pop(future)
+                        try:
+                            result = {"params": params, **future.result()}
+                        except (TypeError, ValueError) as e:
+                            with self._lock:
+                                self.failed += 1
+                            result = {"params": params, "error": str(e)}
+                        with self._lock:
+                            self.configs += 1
+                        yield result
+                self.sweep_latency.observe(time.perf_counter() - start)
+            except BrokenProcessPool:
+                # A worker died and the pool can't take more work; the next sweep starts a new one
+                with self._lock:
+                    if self._pool is pool:
+                        self._pool = None
+                raise
+            finally:
+                for future in pending:
+                    future.cancel()
+                # Let workers still running this sweep finish before the segment goes away
+                wait(pending)
+        finally:
+            segment.close()
+            segment.unlink()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "sweeps": self.sweeps,
+                "configs": self.configs,
+                "failed": self.failed,
+                "sweepLatency": self.sweep_latency.snapshot(),
+            }
+
+
+parameter_sweep = ParameterSweep(
+    workers=int(os.environ.get("SWEEP_WORKERS", 0)) or None,
+    max_configs=int(os.environ.get("SWEEP_MAX_CONFIGS", 500)),
+)
+metrics.register("sweep", parameter_sweep.stats)
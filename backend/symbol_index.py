@@ -0,0 +1,114 @@
+import bisect
+import csv
+import heapq
+import os
+
+from config import PREDEFINED_TICKERS
+
+SYMBOLS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "symbols.csv")
+
+# Sorts after every character that can appear in an upper-cased symbol or name
+_PREFIX_END = "\uffff"
+
+
+class SymbolIndex:
+    """
+    In-memory prefix index over symbols and company names.
+
+    Symbols and every word of each company name are kept in sorted arrays, so a
+    prefix lookup is two binary searches plus a top-k over the matching range.
+    Results rank exact symbol matches first, then symbol prefixes, then company
+    name matches, with PREDEFINED_TICKERS ahead of the long tail.
+    """
+
+    def __init__(self, listings, popular=()):
+        # listings: iterable of (symbol, name, exchange)
+        self.listings = []
+        seen = set()
+        for symbol, name, exchange in listings:
+            symbol = symbol.strip().upper()
+            if symbol and symbol not in seen:
+                seen.add(symbol)
+                self.listings.append((symbol, name.strip(), exchange.strip()))
+
+        popular = {symbol.upper() for symbol in popular}
+        # Precomputed rank keys; lower sorts first
+        self._symbol_rank = [
+            (symbol not in popular, len(symbol), symbol) for symbol, _, _ in self.listings
+        ]
+
+        symbol_keys = sorted((symbol, i) for i, (symbol, _, _) in enumerate(self.listings))
+        self._symbols = [key for key, _ in symbol_keys]
+        self._symbol_ids = [i for _, i in symbol_keys]
+
+        word_keys = []
+        for i, (_, name, _) in enumerate(self.listings):
+            for position, word in enumerate(name.upper().split()):
+                word_keys.append((word, i, position))
+        word_keys.sort()
+        self._words = [key for key, _, _ in word_keys]
+        self._word_ids = [(i, position) for _, i, position in word_keys]
+
+    @classmethod
+    def from_csv(cls, path=SYMBOLS_PATH):
+        """
+        Load the index from the symbol master, falling back to PREDEFINED_TICKERS.
+        """
+        popular = [ticker["symbol"] for ticker in PREDEFINED_TICKERS]
+        listings = [(ticker["symbol"], ticker["name"], "") for ticker in PREDEFINED_TICKERS]
+        try:
+            with open(path, newline="") as f:
+                listings += [
+                    (row["symbol"], row.get("name") or "", row.get("exchange") or "")
+                    for row in csv.DictReader(f)
+                ]
+        except OSError as e:
+            print(f"Symbol master not loaded ({e}); using predefined tickers only")
+        return cls(listings, popular=popular)
+
+    def _range(self, keys, prefix):
+        lo = bisect.bisect_left(keys, prefix)
+        hi = bisect.bisect_left(keys, prefix + _PREFIX_END, lo)
+        return lo, hi
+
+    def search(self, query, limit=5):
+        """
+        Return up to `limit` {"symbol", "name"} suggestions for a prefix query.
+        """
+        query = query.strip().upper()
+        if not query:
+            return []
+
+        lo, hi = self._range(self._symbols, query)
+        ranked = heapq.nsmallest(
+            limit,
+            (
+                (self._symbols[k] != query,) + self._symbol_rank[self._symbol_ids[k]] + (self._symbol_ids[k],)
+                for k in range(lo, hi)
+            ),
+        )
+        result_ids = [rank[-1] for rank in ranked]
+
+        if len(result_ids) < limit:
+            # Fill the rest from company-name word prefixes ("APPLE" -> Apple Inc.)
+            lo, hi = self._range(self._words, query)
+            seen = set(result_ids)
+            candidates = {}
+            for k in range(lo, hi):
+                i, position = self._word_ids[k]
+                if i not in seen:
+                    rank = (self._symbol_rank[i][0], position, len(self.listings[i][1]), i)
+                    if i not in candidates or rank < candidates[i]:
+                        candidates[i] = rank
+            result_ids += [rank[-1] for rank in heapq.nsmallest(limit - len(result_ids), candidates.values())]
+
+        return [
+            {"symbol": self.listings[i][0], "name": self.listings[i][1]}
+            for i in result_ids
+        ]
+
+    def __len__(self):
+        return len(self.listings)
+
+
+symbol_index = SymbolIndex.from_csv()
@@ -0,0 +1,202 @@
+import csv
+import os
+import sqlite3
+import threading
+import time
+
+import yfinance as yf
+
+import metrics
+from config import PREDEFINED_TICKERS
+from fanout import gather
+from singleflight import upstream_flight
+from symbol_index import SYMBOLS_PATH
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_PATH = os.path.join(ROOT_DIR, "data", "symbol_metadata.db")
+
+FIELDS = ("name", "sector", "exchange")
+
+
+def fetch_info(symbol):
+    """
+    Look up {"name", "sector", "exchange"} with yfinance. A symbol yfinance doesn't
+    know comes back with every field None.
+    """
+    info = yf.Ticker(symbol).info or {}
+    return {
+        "name": info.get("shortName") or info.get("longName"),
+        "sector": info.get("sector"),
+        "exchange": info.get("fullExchangeName") or info.get("exchange"),
+    }
+
+
+class SymbolMetadataCache:
+    """
+    Name, sector and exchange per symbol, kept in memory and in a SQLite file.
+
+    Names of PREDEFINED_TICKERS and the named rows of the symbol master are
+    seeded at startup. A seed answers lookups that only need the name; the first
+    lookup that needs its sector or exchange fetches the symbol and stores the
+    result. Looked-up symbols are stored with a long TTL (names rarely change),
+    and symbols yfinance doesn't know are remembered for a shorter one so a bad
+    symbol doesn't hit upstream on every render. A batch lookup answers what it
+    can from memory and fetches only the misses, with bounded parallelism and
+    one in-flight fetch per symbol across requests. If a fetch fails, whatever
+    is held for the symbol is returned instead, and the symbol is not fetched
+    again for `failure_ttl` seconds so a yfinance outage isn't retried per request.
+    """
+
+    def __init__(self, fetcher=fetch_info, disk_path=None, ttl=30 * 24 * 60 * 60,
+                 unknown_ttl=24 * 60 * 60, failure_ttl=60, max_concurrency=8, seeds=()):
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self.unknown_ttl = unknown_ttl
+        self.failure_ttl = failure_ttl
+        self.max_concurrency = max_concurrency
+        # symbol -> (metadata, fetched_at); seeds have fetched_at None
+        self._entries = {}
+        # symbol -> time its last failed fetch may be retried
+        self._failed = {}
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        self.suppressed = 0
+
+        for symbol, name in seeds:
+            self._entries[symbol.upper()] = ({"name": name, "sector": None, "exchange": None}, None)
+
+        if disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS symbols ("
+                "symbol TEXT PRIMARY KEY, name TEXT, sector TEXT, exchange TEXT, fetched_at REAL NOT NULL)"
+            )
+            self._db.commit()
+            # The table is small (one row per symbol ever looked up), so it is read once up front;
+            # fetched rows take precedence over name-only seeds
+            for symbol, name, sector, exchange, fetched_at in self._db.execute(
+                "SELECT symbol, name, sector, exchange, fetched_at FROM symbols"
+            ):
+                self._entries[symbol] = ({"name": name, "sector": sector, "exchange": exchange}, fetched_at)
+
+    def _fresh(self, entry, now, fields):
+        metadata, fetched_at = entry
+        if fetched_at is None:
+            # A seed was never fetched, so it only answers for the fields it has
+            return all(metadata[field] is not None for field in fields)
+        return now - fetched_at < (self.ttl if metadata["name"] else self.unknown_ttl)
+
+    def get_many(self, symbols, fields=FIELDS):
+        """
+        Return {symbol: metadata} for `symbols` (upper-cased), fetching symbols not
+        held with all of `fields`. Unknown symbols map to metadata with a None name;
+        symbols whose lookup failed and that nothing is held for are left out.
+        """
+        symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols if symbol.strip()))
+        now = time.time()
+        result, missing, held = {}, [], {}
+        with self._lock:
+            for symbol in symbols:
+                entry = self._entries.get(symbol)
+                if entry is not None and self._fresh(entry, now, fields):
+                    result[symbol] = entry[0]
+                elif self._failed.get(symbol, 0) > now:
+                    # Failed recently: answer with whatever is held without asking upstream again
+                    self.suppressed += 1
+                    if entry is not None:
+                        result[symbol] = entry[0]
+                else:
+                    missing.append(symbol)
+                    if entry is not None:
+                        held[symbol] = entry[0]
+            self.hits += len(result)
+            self.misses += len(missing)
+
+        if missing:
+            fetched = gather([lambda symbol=symbol: self._fetch(symbol) for symbol in missing],
+                             max_concurrency=self.max_concurrency)
+            for symbol, metadata in zip(missing, fetched):
+                metadata = metadata if metadata is not None else held.get(symbol)
+                if metadata is not None:
+                    result[symbol] = metadata
+        return result
+
+    def get(self, symbol, fields=FIELDS):
+        return self.get_many([symbol], fields=fields).get(symbol.strip().upper())
+
+    def _fetch(self, symbol):
+        try:
+            # Shares the in-flight lookup with concurrent requests for the same symbol
+            metadata = upstream_flight.do(("symbol-metadata", symbol), self.fetcher, symbol)
+        except Exception as e:
+            print(f"Error fetching metadata for {symbol}: {e}")
+            now = time.time()
+            with self._lock:
+                self.failures += 1
+                if len(self._failed) >= 10000:
+                    self._failed = {s: retry_at for s, retry_at in self._failed.items() if retry_at > now}
+                self._failed[symbol] = now + self.failure_ttl
+            return None
+        fetched_at = time.time()
+        with self._lock:
+            self._failed.pop(symbol, None)
+            self._entries[symbol] = (metadata, fetched_at)
+        self._save_to_disk(symbol, metadata, fetched_at)
+        return metadata
+
+    def _save_to_disk(self, symbol, metadata, fetched_at):
+        if self._db is None:
+            return
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO symbols (symbol, name, sector, exchange, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                    (symbol, metadata["name"], metadata["sector"], metadata["exchange"], fetched_at),
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Failed to persist symbol metadata: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "failures": self.failures,
+                "suppressedRetries": self.suppressed,
+                "hitRate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def load_seeds(path=SYMBOLS_PATH):
+    """
+    Seed (symbol, name) pairs from PREDEFINED_TICKERS and the named rows of the symbol master.
+    """
+    seeds = {}
+    try:
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                if row.get("symbol") and row.get("name"):
+                    seeds[row["symbol"].upper()] = row["name"]
+    except OSError as e:
+        print(f"Symbol master not loaded ({e}); seeding predefined tickers only")
+    # Curated names take precedence over listing names
+    seeds.update((ticker["symbol"].upper(), ticker["name"]) for ticker in PREDEFINED_TICKERS)
+    return seeds.items()
+
+
+symbol_metadata = SymbolMetadataCache(
+    disk_path=os.environ.get("SYMBOL_CACHE_PATH", DEFAULT_CACHE_PATH),
+    ttl=float(os.environ.get("SYMBOL_CACHE_TTL", 30 * 24 * 60 * 60)),
+    failure_ttl=float(os.environ.get("SYMBOL_FAILURE_TTL", 60)),
+    max_concurrency=int(os.environ.get("SYMBOL_FETCH_CONCURRENCY", 8)),
+    seeds=load_seeds(),
+)
+metrics.register("symbolMetadata", symbol_metadata.stats)
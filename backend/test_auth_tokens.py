@@ -0,0 +1,124 @@
+import time
+
+import jwt
+import pytest
+
+from auth_tokens import KEY_GRACE_PERIOD, AuthError, FirebaseTokenVerifier
+from bench_auth import make_signing_key
+
+PROJECT_ID = "wavecap-test"
+
+
+class CertSource:
+    """
+    Stands in for Google's certificate endpoint; `fail` makes fetches raise.
+    """
+
+    def __init__(self, certs, max_age=3600):
+        self.certs = certs
+        self.max_age = max_age
+        self.fail = False
+        self.fetches = 0
+
+    def __call__(self):
+        self.fetches += 1
+        if self.fail:
+            raise ConnectionError("certificate endpoint unreachable")
+        return dict(self.certs), self.max_age
+
+
+def make_token(key, kid, uid="user-1", expires_in=3600, **overrides):
+    now = int(time.time())
+    claims = {
+        "iss": f"https://securetoken.google.com/{PROJECT_ID}",
+        "aud": PROJECT_ID,
+        "sub": uid,
+        "iat": now,
+        "exp": now + expires_in,
+        **overrides,
+    }
+    return jwt.encode(claims, key, algorithm="RS256", headers={"kid": kid})
+
+
+@pytest.fixture(scope="module")
+def signing_key():
+    return make_signing_key()
+
+
+@pytest.fixture
+def source(signing_key):
+    return CertSource({"kid-1": signing_key[1]})
+
+
+@pytest.fixture
+def verifier(source):
+    return FirebaseTokenVerifier(PROJECT_ID, fetch_certs=source)
+
+
+def test_valid_token_is_verified_once_then_served_from_cache(verifier, source, signing_key):
+    token = make_token(signing_key[0], "kid-1")
+    assert verifier.verify(token)["uid"] == "user-1"
+    assert verifier.verify(token)["uid"] == "user-1"
+    stats = verifier.stats()
+    assert (stats["verified"], stats["cacheHits"], source.fetches) == (1, 1, 1)
+
+
+@pytest.mark.parametrize("overrides", [
+    {"expires_in": -3600},
+    {"aud": "other-project"},
+    {"iss": "https://securetoken.google.com/other-project"},
+    {"sub": ""},
+])
+def test_bad_claims_are_rejected(verifier, signing_key, overrides):
+    with pytest.raises(AuthError) as rejected:
+        verifier.verify(make_token(signing_key[0], "kid-1", **overrides))
+    assert rejected.value.status_code == 401
+    assert verifier.stats()["rejected"] == 1
+
+
+def test_wrong_signature_is_rejected(verifier):
+    other_key, _ = make_signing_key()
+    with pytest.raises(AuthError):
+        verifier.verify(make_token(other_key, "kid-1"))
+
+
+def test_unknown_kid_refetches_at_most_once_a_minute(verifier, source, signing_key):
+    verifier.verify(make_token(signing_key[0], "kid-1"))
+    rotated_key, rotated_pem = make_signing_key()
+    source.certs["kid-2"] = rotated_pem
+
+    # Keys were just fetched, so the unknown kid is refused without another fetch
+    with pytest.raises(AuthError):
+        verifier.verify(make_token(rotated_key, "kid-2"))
+    assert source.fetches == 1
+
+    verifier._keys_fetched_at -= 120
+    assert verifier.verify(make_token(rotated_key, "kid-2", uid="user-2"))["uid"] == "user-2"
+    assert source.fetches == 2
+
+    with pytest.raises(AuthError):
+        verifier.verify(make_token(rotated_key, "kid-3"))
+    assert source.fetches == 2
+
+
+def test_expired_keys_stay_in_use_for_the_grace_period(verifier, source, signing_key):
+    verifier.verify(make_token(signing_key[0], "kid-1"))
+    source.fail = True
+
+    # The keys' max-age has passed and the re-fetch fails: keep using them
+    verifier._keys_expire_at = time.time() - 60
+    assert verifier.verify(make_token(signing_key[0], "kid-1", uid="user-2"))["uid"] == "user-2"
+    assert verifier.stats()["keyFetchFailures"] == 1
+    # A retry inside the backoff window does not hit the endpoint again
+    verifier.verify(make_token(signing_key[0], "kid-1", uid="user-3"))
+    assert source.fetches == 2
+
+    verifier._keys_expire_at = time.time() - KEY_GRACE_PERIOD - 1
+    with pytest.raises(AuthError) as unavailable:
+        verifier.verify(make_token(signing_key[0], "kid-1", uid="user-4"))
+    assert unavailable.value.status_code == 503
+
+    # Once the endpoint recovers, fresh keys are fetched after the backoff
+    source.fail = False
+    verifier._retry_at = 0
+    assert verifier.verify(make_token(signing_key[0], "kid-1", uid="user-5"))["uid"] == "user-5"
@@ -0,0 +1,47 @@
+import numpy as np
+
+from backtest import _sma, run_backtest, sma_crossover
+from sweep import ParameterSweep
+
+
+def late_listed_closes():
+    # One symbol trades throughout; the other lists at bar 100 and falls steadily
+    closes = np.full((300, 2), np.nan)
+    closes[:, 0] = np.linspace(100, 130, 300)
+    closes[100:, 1] = np.linspace(40, 4, 200)
+    return closes
+
+
+def test_sma_is_nan_for_windows_before_listing():
+    closes = late_listed_closes()
+    sma = _sma(closes, 20)
+    assert np.isnan(sma[:119, 1]).all()
+    assert np.isclose(sma[119, 1], closes[100:120, 1].mean())
+    assert np.isclose(sma[19, 0], closes[:20, 0].mean())
+
+
+def test_sma_crossover_stays_flat_on_a_falling_late_listing():
+    positions = sma_crossover(late_listed_closes(), fast=2, slow=20)
+    assert not positions[:, 1].any()
+
+
+def test_sweep_skips_late_listing_warm_up():
+    closes = late_listed_closes()
+    results = list(ParameterSweep(workers=1).run(closes, "sma_crossover", [{"fast": 2, "slow": 20}], 1000))
+    # Only the listed-throughout symbol goes long, and it is still held at the end
+    assert results[0]["trades"] == 0
+    assert results[0]["openPositions"] == 1
+
+
+def test_position_held_at_the_end_is_reported_as_open():
+    closes = np.linspace(100, 110, 11).reshape(-1, 1)
+    positions = np.zeros((11, 1))
+    positions[1:4] = 1
+    positions[6:] = 1
+    result = run_backtest(closes, positions, 1000)
+    assert result["trades"] == 1
+    assert result["winRate"] == 100.0
+    assert result["openPositions"] == 1
+    # Equity tracks the price while long: the open run is marked from its entry close to the last close
+    assert np.isclose(result["openProfitLoss"], 1000 * (closes[4, 0] / closes[1, 0]) * (closes[10, 0] / closes[6, 0] - 1))
+    assert np.isclose(result["profitLoss"], result["finalBalance"] - 1000)
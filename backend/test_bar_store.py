@@ -0,0 +1,113 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bar_store import BarStore
+
+INDEX = pd.date_range("2024-01-01", periods=400, freq="D", tz="America/New_York")
+CLOSES = np.arange(400, dtype=float) + 100
+
+
+def hist(start, stop, scale=1.0, volume_scale=1.0):
+    closes = CLOSES[start:stop] * scale
+    return pd.DataFrame({
+        "Open": closes, "High": closes + 1, "Low": closes - 1, "Close": closes,
+        "Volume": np.full(stop - start, 10.0) * volume_scale,
+    }, index=INDEX[start:stop])
+
+
+class Upstream:
+    """
+    Serves every bar from `start` on; `fail` makes it raise.
+    """
+
+    def __init__(self):
+        self.fail = False
+        self.starts = []
+
+    def __call__(self, symbol, interval, start):
+        self.starts.append(start)
+        if self.fail:
+            raise RuntimeError("yfinance unavailable")
+        return hist(INDEX.searchsorted(pd.Timestamp(start, tz=INDEX.tz)), len(INDEX))
+
+
+@pytest.fixture
+def upstream():
+    return Upstream()
+
+
+@pytest.fixture
+def store(tmp_path, upstream):
+    store = BarStore(str(tmp_path), fetcher=upstream)
+    store.replace("AAPL", "1d", hist(0, 300))
+    return store
+
+
+def test_append_replaces_the_forming_bar_and_adds_newer_ones(store):
+    forming = hist(295, 310)
+    forming.loc[INDEX[299], "Close"] = 555.0
+    assert store.append("AAPL", "1d", forming) == 10
+    bars = store.read("AAPL", "1d")
+    assert len(bars["t"]) == 310
+    assert bars["c"][299] == 555.0
+    assert (np.diff(bars["t"]) > 0).all()
+    assert bars["labels"][0] == "2024-01-01"
+
+
+def test_range_and_window_reads(store):
+    t = store.read("AAPL", "1d")["t"]
+    bars = store.read("AAPL", "1d", start=int(t[10]), end=int(t[20]))
+    assert bars["c"].tolist() == CLOSES[10:20].tolist()
+    window = store.read("AAPL", "1d", window=pd.Timedelta(days=9))
+    assert window["c"].tolist() == CLOSES[290:300].tolist()
+    assert store.read("MSFT", "1d") is None
+
+
+def test_readjusted_history_is_rescaled_not_truncated(store, upstream):
+    # A 2:1 split: upstream now reports every price halved and every volume doubled
+    assert store.append("AAPL", "1d", hist(290, 320, scale=0.5, volume_scale=2.0)) == 20
+    bars = store.read("AAPL", "1d")
+    assert len(bars["t"]) == 320
+    assert np.allclose(bars["c"], CLOSES[:320] * 0.5)
+    assert np.allclose(bars["v"], 20.0)
+    assert store.stats()["readjustments"] == 1
+    assert upstream.starts == []
+
+
+def test_gap_after_downtime_is_filled_from_upstream(store, upstream):
+    assert store.append("AAPL", "1d", hist(360, 370)) == 70
+    bars = store.read("AAPL", "1d")
+    # The stored last bar is refetched along with the 60 missing ones before the new bars
+    assert bars["c"].tolist() == CLOSES[:370].tolist()
+    assert upstream.starts == [INDEX[299].strftime("%Y-%m-%d")]
+    assert store.stats()["filledGaps"] == 1
+
+
+def test_gap_that_cannot_be_filled_is_skipped(store, upstream):
+    upstream.fail = True
+    assert store.append("AAPL", "1d", hist(360, 370)) == 0
+    assert len(store.read("AAPL", "1d")["t"]) == 300
+    assert store.stats()["skippedGaps"] == 1
+
+
+def test_interrupted_append_is_repaired(store):
+    # A crash mid-append left `c` one bar longer than the other columns
+    path = store._dir("AAPL", "1d")
+    with open(os.path.join(path, "c.bin"), "ab") as f:
+        f.write(np.asarray([999.0]).tobytes())
+    assert len(store.read("AAPL", "1d")["t"]) == 300
+
+    assert store.append("AAPL", "1d", hist(299, 302)) == 2
+    bars = store.read("AAPL", "1d")
+    assert bars["c"].tolist() == CLOSES[:302].tolist()
+    assert {os.path.getsize(os.path.join(path, f"{field}.bin")) for field in "tohlcv"} == {302 * 8}
+
+
+def test_leftover_swap_directory_does_not_block_a_rewrite(store):
+    os.makedirs(store._dir("AAPL", "1d") + ".old/stale")
+    store.replace("AAPL", "1d", hist(0, 5))
+    assert len(store.read("AAPL", "1d")["t"]) == 5
+    assert not os.path.exists(store._dir("AAPL", "1d") + ".old")
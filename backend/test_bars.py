@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from bars import lttb_indices, ohlc_buckets
+
+
+def reference_lttb(x, y, n):
+    # Straightforward per-point LTTB with the same bucket edges, for comparison
+    length = len(x)
+
+    def edge(bucket):
+        return min(int(bucket * (length - 2) / (n - 2)) + 1, length - 1)
+
+    kept = [0]
+    a = 0
+    for bucket in range(n - 2):
+        lo, hi = edge(bucket), edge(bucket + 1)
+        next_lo, next_hi = hi, edge(bucket + 2)
+        if bucket == n - 3:
+            next_lo, next_hi = length - 1, length
+        cx, cy = np.mean(x[next_lo:next_hi]), np.mean(y[next_lo:next_hi])
+        best, best_area = lo, -1.0
+        for i in range(lo, hi):
+            area = abs((x[a] - cx) * (y[i] - y[a]) - (x[a] - x[i]) * (cy - y[a]))
+            if area > best_area:
+                best, best_area = i, area
+        kept.append(best)
+        a = best
+    kept.append(length - 1)
+    return kept
+
+
+@pytest.mark.parametrize("length,n", [(1000, 100), (1000, 3), (257, 50), (10, 9)])
+def test_lttb_matches_the_reference_implementation(length, n):
+    rng = np.random.default_rng(length + n)
+    x = np.cumsum(rng.integers(60, 120, length)).astype(float)
+    y = np.cumsum(rng.normal(0, 1, length))
+    indices = lttb_indices(x, y, n)
+    assert indices.tolist() == reference_lttb(x, y, n)
+    assert len(indices) == n and indices[0] == 0 and indices[-1] == length - 1
+    assert (np.diff(indices) > 0).all()
+
+
+def test_lttb_keeps_a_spike():
+    x = np.arange(500, dtype=float)
+    y = np.zeros(500)
+    y[237] = 50.0
+    assert 237 in lttb_indices(x, y, 20)
+
+
+@pytest.mark.parametrize("n", [500, 600, 2])
+def test_lttb_returns_every_point_when_nothing_to_drop(n):
+    x = np.arange(500)
+    assert lttb_indices(x, x, n).tolist() == list(range(500))
+
+
+def columns(length):
+    t = np.arange(length, dtype=np.int64) * 60
+    c = np.arange(length, dtype=float) + 100
+    return {
+        "t": t,
+        "labels": np.array([f"bar{i}" for i in range(length)]),
+        "o": c - 0.5,
+        "h": c + np.arange(length) % 3,
+        "l": c - 1 - np.arange(length) % 4,
+        "c": c,
+        "v": np.ones(length),
+    }
+
+
+def test_ohlc_buckets_merge_consecutive_bars():
+    bars = columns(10)
+    merged = ohlc_buckets(bars, 3)
+    # Buckets start at bars 0, 3 and 6
+    assert merged["t"].tolist() == [0, 180, 360]
+    assert merged["labels"].tolist() == ["bar0", "bar3", "bar6"]
+    for k, (lo, hi) in enumerate([(0, 3), (3, 6), (6, 10)]):
+        assert merged["o"][k] == bars["o"][lo]
+        assert merged["h"][k] == bars["h"][lo:hi].max()
+        assert merged["l"][k] == bars["l"][lo:hi].min()
+        assert merged["c"][k] == bars["c"][hi - 1]
+        assert merged["v"][k] == hi - lo
+
+
+def test_ohlc_buckets_cover_every_bar_once():
+    bars = columns(1001)
+    merged = ohlc_buckets(bars, 300)
+    assert len(merged["t"]) == 300
+    assert merged["v"].sum() == 1001
+    assert merged["h"].max() == bars["h"].max() and merged["l"].min() == bars["l"].min()
+    assert merged["c"][-1] == bars["c"][-1]
+
+
+def test_ohlc_buckets_never_exceed_one_bar_each():
+    merged = ohlc_buckets(columns(5), 8)
+    assert merged["t"].tolist() == columns(5)["t"].tolist()
@@ -0,0 +1,129 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import http_client
+
+
+class StubUpstream:
+    """
+    Local HTTP/1.1 server that answers with queued statuses and records the
+    client port and Cookie header of every request it sees.
+    """
+
+    def __init__(self):
+        self.statuses = []
+        self.delay = 0
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                stub.requests.append((self.command, self.client_address[1], self.headers.get("Cookie")))
+                if stub.delay:
+                    time.sleep(stub.delay)
+                status = stub.statuses.pop(0) if stub.statuses else 200
+                body = b"{}"
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Set-Cookie", f"session={self.server.server_port}; Path=/")
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up on a delayed reply (the timeout test)
+                    pass
+
+            do_GET = do_POST = _handle
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def upstream():
+    with StubUpstream() as stub:
+        yield stub
+
+
+@pytest.fixture
+def backoffs(monkeypatch):
+    # Record the jitter range of each retry and skip the actual sleep
+    ranges = []
+
+    def uniform(low, high):
+        ranges.append((low, high))
+        return 0
+
+    monkeypatch.setattr(http_client.random, "uniform", uniform)
+    return ranges
+
+
+def test_retries_transient_statuses_with_jittered_backoff(upstream, backoffs):
+    client = http_client.HttpClient(max_retries=3, backoff_base=0.25)
+    upstream.statuses = [503, 429, 502]
+    response = client.get(upstream.url + "/quote")
+    assert response.status_code == 200
+    assert len(upstream.requests) == 4
+    assert backoffs == [(0, 0.5), (0, 1.0), (0, 2.0)]
+    assert client.stats()[upstream.url[len("http://"):]]["retries"] == 3
+
+
+def test_returns_last_response_once_retries_are_exhausted(upstream, backoffs):
+    client = http_client.HttpClient(max_retries=1)
+    upstream.statuses = [503, 503, 503]
+    assert client.get(upstream.url).status_code == 503
+    assert len(upstream.requests) == 2
+
+
+def test_does_not_retry_post_or_non_transient_statuses(upstream, backoffs):
+    client = http_client.HttpClient(max_retries=2)
+    upstream.statuses = [503, 500]
+    assert client.post(upstream.url).status_code == 503
+    assert client.get(upstream.url).status_code == 500
+    assert len(upstream.requests) == 2
+    assert backoffs == []
+
+
+def test_reuses_keep_alive_connection(upstream):
+    client = http_client.HttpClient()
+    for _ in range(3):
+        client.get(upstream.url)
+    ports = {port for _, port, _ in upstream.requests}
+    assert len(ports) == 1
+
+
+def test_read_timeout_raises_after_retries(upstream, backoffs):
+    client = http_client.HttpClient(read_timeout=0.05, max_retries=1)
+    upstream.delay = 0.5
+    with pytest.raises(requests.Timeout):
+        client.get(upstream.url)
+    assert len(upstream.requests) == 2
+    assert client.stats()[upstream.url[len("http://"):]]["errors"] == 2
+
+
+def test_cookies_are_not_shared_between_upstreams(upstream):
+    client = http_client.HttpClient()
+    with StubUpstream() as other:
+        client.get(upstream.url)
+        client.get(other.url)
+        client.get(upstream.url)
+    assert [cookie for _, _, cookie in other.requests] == [None]
+    assert upstream.requests[1][2] == f"session={upstream.server.server_port}"
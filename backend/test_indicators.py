@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from indicators import INDICATORS, IndicatorCache, parse_spec
+
+SPECS = ["sma:20", "sma:1", "ema:10", "rsi:14", "macd:12:26:9", "bollinger:20:2", "vwap"]
+
+
+def columns(length, seed=7, minutes=False):
+    rng = np.random.default_rng(seed)
+    c = 100 + np.cumsum(rng.normal(0, 1, length))
+    step = 300 if minutes else 86400
+    t = 1704205800 + np.arange(length, dtype=np.int64) * step
+    # Intraday bars change session every 78 bars, like a 6.5 hour day of 5m bars
+    days = (np.arange(length) // 78) if minutes else np.arange(length)
+    return {
+        "t": t,
+        "labels": np.datetime_as_string(np.datetime64("2024-01-02") + days.astype("timedelta64[D]")),
+        "h": c + rng.uniform(0, 1, length),
+        "l": c - rng.uniform(0, 1, length),
+        "c": c,
+        "v": rng.uniform(1000, 5000, length),
+    }
+
+
+def window(bars, lo, hi):
+    return {field: values[lo:hi] for field, values in bars.items()}
+
+
+def full(spec, bars, interval="1d"):
+    name, params = parse_spec(spec)
+    return IndicatorCache().compute("AAPL", interval, name, params, bars)
+
+
+def assert_same(actual, expected):
+    assert actual.keys() == expected.keys()
+    for field in expected:
+        np.testing.assert_allclose(actual[field], expected[field], rtol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize("spec", SPECS)
+@pytest.mark.parametrize("interval", ["1d", "5m"])
+def test_incremental_updates_match_a_full_recompute(spec, interval):
+    bars = columns(400, minutes=interval == "5m")
+    name, params = parse_spec(spec)
+    cache = IndicatorCache()
+    cache.compute("AAPL", interval, name, params, window(bars, 0, 300))
+
+    # New bars arrive a few at a time (short top-ups) and in a larger batch
+    for hi in (301, 303, 320, 400):
+        assert_same(cache.compute("AAPL", interval, name, params, window(bars, 0, hi)),
+                    full(spec, window(bars, 0, hi), interval))
+    stats = cache.stats()
+    assert stats["fullComputes"] == 1 and stats["incrementalUpdates"] == 4
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_revised_last_bar_is_recomputed(spec):
+    bars = columns(200)
+    name, params = parse_spec(spec)
+    cache = IndicatorCache()
+    cache.compute("AAPL", "1d", name, params, bars)
+
+    revised = {field: values.copy() for field, values in bars.items()}
+    revised["c"][-1] += 5.0
+    revised["h"][-1] += 5.0
+    revised["v"][-1] *= 2
+    assert_same(cache.compute("AAPL", "1d", name, params, revised), full(spec, revised))
+    assert cache.stats()["incrementalUpdates"] == 1
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_sliding_window_keeps_the_history_seen_earlier(spec):
+    bars = columns(400)
+    name, params = parse_spec(spec)
+    cache = IndicatorCache()
+    cache.compute("AAPL", "1d", name, params, window(bars, 0, 300))
+
+    # The chart window moved forward: values continue from the first bar the cache saw
+    result = cache.compute("AAPL", "1d", name, params, window(bars, 50, 350))
+    expected = {field: values[50:] for field, values in full(spec, window(bars, 0, 350)).items()}
+    assert_same(result, expected)
+
+
+def test_history_that_does_not_extend_the_cache_is_recomputed():
+    bars = columns(300)
+    name, params = parse_spec("ema:10")
+    cache = IndicatorCache()
+    cache.compute("AAPL", "1d", name, params, bars)
+    other = columns(300, seed=8)
+    other["t"] = other["t"] + 3600
+    assert_same(cache.compute("AAPL", "1d", name, params, other), full("ema:10", other))
+    assert cache.stats()["fullComputes"] == 2
+
+
+def test_every_indicator_is_covered():
+    assert {parse_spec(spec)[0] for spec in SPECS} == set(INDICATORS)
@@ -0,0 +1,58 @@
+import threading
+import time
+
+import pytest
+
+from llm_scheduler import LLMScheduler, SchedulerRejected
+
+
+def wait_for_queue_depth(scheduler, depth):
+    deadline = time.monotonic() + 5
+    while scheduler.stats()["queueDepth"] != depth:
+        assert time.monotonic() < deadline, "waiters never queued"
+        time.sleep(0.005)
+
+
+def test_interactive_requests_jump_queued_background_ones():
+    scheduler = LLMScheduler(max_concurrency=1, rate=1000, burst=1000)
+    order = []
+
+    def call(priority):
+        with scheduler.slot(priority):
+            order.append(priority)
+
+    with scheduler.slot("interactive"):
+        background = threading.Thread(target=call, args=("background",))
+        background.start()
+        wait_for_queue_depth(scheduler, 1)
+        interactive = threading.Thread(target=call, args=("interactive",))
+        interactive.start()
+        wait_for_queue_depth(scheduler, 2)
+
+    background.join(5)
+    interactive.join(5)
+    assert order == ["interactive", "background"]
+    assert scheduler.stats()["admitted"] == 3
+
+
+def test_full_queue_rejects_with_429():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=0, rate=1000, burst=1000)
+    with scheduler.slot("interactive"):
+        with pytest.raises(SchedulerRejected) as rejected:
+            with scheduler.slot("background"):
+                pass
+    assert rejected.value.status_code == 429
+
+
+def test_waiter_past_its_deadline_is_rejected_with_503_and_skipped():
+    scheduler = LLMScheduler(max_concurrency=1, rate=1000, burst=1000)
+    with scheduler.slot("interactive"):
+        with pytest.raises(SchedulerRejected) as rejected:
+            with scheduler.slot("background", deadline=0.01):
+                pass
+    assert rejected.value.status_code == 503
+    stats = scheduler.stats()
+    assert stats["queueDepth"] == 0 and stats["active"] == 0
+    # The cancelled heap entry must not hold a slot for the next caller
+    with scheduler.slot("interactive", deadline=0.1):
+        pass
@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+
+from ohlc_cache import OHLCCache, extend
+
+
+def daily(start, periods, first_close=100.0):
+    index = pd.date_range(start, periods=periods, freq="D", tz="America/New_York")
+    closes = [first_close + i for i in range(periods)]
+    return pd.DataFrame({"Open": closes, "High": closes, "Low": closes, "Close": closes, "Volume": 1.0}, index=index)
+
+
+class Upstream:
+    def __init__(self, history):
+        self.history = history
+        self.calls = []
+        self.fail = False
+
+    def __call__(self, symbol, period=None, interval=None, start=None):
+        self.calls.append((period, start))
+        if self.fail:
+            raise RuntimeError("yfinance unavailable")
+        if start is None:
+            return self.history
+        return self.history[self.history.index >= pd.Timestamp(start, tz=self.history.index.tz)]
+
+
+def test_extend_replaces_overlapping_bars_and_trims_to_the_period():
+    cached = daily("2024-01-01", 31)
+    fresh = daily("2024-01-31", 3, first_close=500.0)
+    combined = extend(cached, fresh, "1mo")
+    # The forming bar of Jan 31 is replaced, two new bars follow, and the window slides forward
+    assert combined.index[-1] == fresh.index[-1]
+    assert combined.loc[fresh.index[0], "Close"] == 500.0
+    assert combined.index.is_unique and combined.index.is_monotonic_increasing
+    assert combined.index[0] == combined.index[-1] - pd.Timedelta(days=31)
+
+
+def test_extend_keeps_the_cached_series_when_nothing_is_new():
+    cached = daily("2024-01-01", 5)
+    assert extend(cached, cached.iloc[:0], "1mo") is cached
+
+
+def test_stale_entry_is_topped_up_from_its_last_day():
+    upstream = Upstream(daily("2024-01-01", 31))
+    cache = OHLCCache(fetcher=upstream, ttls={"1d": 0})
+    assert len(cache.get("aapl", "days")) == 31
+
+    upstream.history = daily("2024-01-01", 33)
+    hist = cache.get("AAPL", "days")
+    assert hist.index[-1] == upstream.history.index[-1]
+    assert upstream.calls == [("1mo", None), (None, "2024-01-31")]
+    assert cache.stats()["refreshes"] == 1
+
+
+def test_fresh_entry_is_served_without_fetching():
+    upstream = Upstream(daily("2024-01-01", 10))
+    cache = OHLCCache(fetcher=upstream)
+    first = cache.get("AAPL", "days")
+    assert cache.get("AAPL", "days") is first
+    assert len(upstream.calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_failed_refresh_serves_the_stale_series():
+    upstream = Upstream(daily("2024-01-01", 10))
+    cache = OHLCCache(fetcher=upstream, ttls={"1d": 0})
+    cached = cache.get("AAPL", "days")
+    upstream.fail = True
+    assert cache.get("AAPL", "days") is cached
+    assert cache.stats()["refreshFailures"] == 1
+
+
+def test_failed_first_fetch_raises():
+    upstream = Upstream(daily("2024-01-01", 10))
+    upstream.fail = True
+    with pytest.raises(RuntimeError):
+        OHLCCache(fetcher=upstream).get("AAPL", "days")
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = OHLCCache(max_entries=2, fetcher=Upstream(daily("2024-01-01", 10)))
+    cache.get("AAPL", "days")
+    cache.get("MSFT", "days")
+    cache.get("AAPL", "days")
+    cache.get("NVDA", "days")
+    assert cache.peek("MSFT", "days") is None
+    assert cache.peek("AAPL", "days") is not None
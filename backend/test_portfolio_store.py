@@ -0,0 +1,121 @@
+import itertools
+
+import pytest
+
+from portfolio_store import PortfolioStore
+
+
+class FakeDoc:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeRef:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+        self.id = path[-1]
+
+    def collection(self, name):
+        return FakeCollection(self.db, self.path + (name,))
+
+
+class FakeCollection:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+
+    def document(self, doc_id=None):
+        return FakeRef(self.db, self.path + (doc_id or f"doc{next(self.db.ids)}",))
+
+    def select(self, fields):
+        return self
+
+    def stream(self):
+        self.db.reads += 1
+        return [FakeDoc(path[-1], data) for path, data in self.db.docs.items() if path[:-1] == self.path]
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.ops = []
+
+    def set(self, ref, data):
+        self.ops.append((ref.path, data))
+
+    def delete(self, ref):
+        self.ops.append((ref.path, None))
+
+    def commit(self):
+        if self.db.fail_commits:
+            raise RuntimeError("deadline exceeded")
+        for path, data in self.ops:
+            if data is None:
+                self.db.docs.pop(path, None)
+            else:
+                self.db.docs[path] = data
+
+
+class FakeDB:
+    def __init__(self):
+        self.docs = {}
+        self.ids = itertools.count()
+        self.reads = 0
+        self.fail_commits = False
+
+    def collection(self, name):
+        return FakeCollection(self, (name,))
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+def test_save_and_remove_update_the_cached_portfolio_in_place():
+    db = FakeDB()
+    store = PortfolioStore(db)
+    assert store.list("u1") == []
+
+    store.save("u1", "AAPL", "Apple Inc.")
+    store.save("u1", "MSFT", "Microsoft")
+    assert store.contains("u1", "AAPL")
+    assert store.list("u1") == [{"symbol": "AAPL", "name": "Apple Inc."}, {"symbol": "MSFT", "name": "Microsoft"}]
+
+    assert store.remove("u1", "AAPL")
+    assert not store.remove("u1", "AAPL")
+    assert store.symbols("u1") == {"MSFT"}
+    # Every read after the first was served from the cache
+    assert db.reads == 1
+
+    # The cache agrees with what was written, placeholder included
+    assert len(db.docs) == 2
+    assert PortfolioStore(db).list("u1") == [{"symbol": "MSFT", "name": "Microsoft"}]
+
+
+def test_failed_write_invalidates_the_cached_portfolio():
+    db = FakeDB()
+    store = PortfolioStore(db)
+    store.save("u1", "AAPL", "Apple Inc.")
+
+    db.fail_commits = True
+    with pytest.raises(RuntimeError):
+        store.save("u1", "MSFT", "Microsoft")
+    with pytest.raises(RuntimeError):
+        store.remove("u1", "AAPL")
+    assert store.stats()["users"] == 0
+
+    db.fail_commits = False
+    assert store.symbols("u1") == {"AAPL"}
+    assert db.reads == 3
+
+
+def test_expired_portfolio_is_reloaded():
+    db = FakeDB()
+    store = PortfolioStore(db, ttl=0)
+    store.save("u1", "AAPL", "Apple Inc.")
+    assert store.contains("u1", "AAPL")
+    assert db.reads == 2
@@ -0,0 +1,106 @@
+import threading
+import time
+
+from price_stream import PriceHub
+
+
+class ManualFeed:
+    """
+    Feed whose ticks the test publishes by hand through `publish[symbol]`.
+    """
+
+    def __init__(self):
+        self.publish = {}
+        self.stops = {}
+        self._started = threading.Condition()
+
+    def __call__(self, symbol, publish, stop):
+        with self._started:
+            self.publish[symbol] = publish
+            self.stops[symbol] = stop
+            self._started.notify_all()
+        stop.wait()
+
+    def started(self, symbol):
+        with self._started:
+            assert self._started.wait_for(lambda: symbol in self.publish, timeout=5)
+        return self.publish[symbol]
+
+
+def test_slow_subscriber_gets_only_the_newest_tick_per_symbol():
+    feed = ManualFeed()
+    hub = PriceHub(feed)
+    subscription = hub.subscribe(["aapl", "MSFT"])
+    aapl, msft = feed.started("AAPL"), feed.started("MSFT")
+
+    aapl(100.0, 60)
+    msft(300.0, 61)
+    aapl(101.0, 62)
+    aapl(102.0, 63)
+
+    updates = subscription.next(timeout=1)
+    # MSFT's tick is now the oldest pending one; AAPL's latest replaced the earlier two
+    assert [(u["symbol"], u["price"]) for u in updates] == [("MSFT", 300.0), ("AAPL", 102.0)]
+    assert subscription.dropped == 2
+    assert subscription.next(timeout=0.01) == []
+    stats = hub.stats()
+    assert (stats["published"], stats["delivered"], stats["dropped"]) == (4, 2, 2)
+    hub.unsubscribe(subscription)
+
+
+def test_ticks_fold_into_minute_bars():
+    feed = ManualFeed()
+    hub = PriceHub(feed)
+    subscription = hub.subscribe(["AAPL"])
+    publish = feed.started("AAPL")
+
+    for price, timestamp in [(100.0, 120), (103.0, 130), (99.0, 150), (101.0, 179)]:
+        publish(price, timestamp)
+    assert subscription.next(timeout=1)[0]["bar"] == {"t": 120, "o": 100.0, "h": 103.0, "l": 99.0, "c": 101.0}
+
+    publish(102.0, 180)
+    assert subscription.next(timeout=1)[0]["bar"] == {"t": 180, "o": 102.0, "h": 102.0, "l": 102.0, "c": 102.0}
+    hub.unsubscribe(subscription)
+
+
+def test_late_joiner_starts_from_the_last_price_and_shares_the_feed():
+    feed = ManualFeed()
+    hub = PriceHub(feed)
+    first = hub.subscribe(["AAPL"])
+    feed.started("AAPL")(100.0, 60)
+
+    second = hub.subscribe(["AAPL"])
+    assert [u["price"] for u in second.next(timeout=1)] == [100.0]
+    assert hub.stats()["feeds"] == 1
+
+    feed.publish["AAPL"](101.0, 61)
+    assert [u["price"] for u in first.next(timeout=1)] == [101.0]
+    assert [u["price"] for u in second.next(timeout=1)] == [101.0]
+    hub.unsubscribe(first)
+    hub.unsubscribe(second)
+
+
+def test_last_unsubscribe_stops_the_feed():
+    feed = ManualFeed()
+    hub = PriceHub(feed)
+    first = hub.subscribe(["AAPL"])
+    second = hub.subscribe(["AAPL"])
+    feed.started("AAPL")
+
+    hub.unsubscribe(first)
+    assert not feed.stops["AAPL"].is_set()
+    hub.unsubscribe(second)
+    assert feed.stops["AAPL"].is_set()
+    assert hub.stats()["feeds"] == 0
+
+
+def test_next_waits_for_a_tick():
+    feed = ManualFeed()
+    hub = PriceHub(feed)
+    subscription = hub.subscribe(["AAPL"])
+    publish = feed.started("AAPL")
+    threading.Timer(0.05, publish, args=(100.0, 60)).start()
+    start = time.monotonic()
+    assert [u["price"] for u in subscription.next(timeout=5)] == [100.0]
+    assert time.monotonic() - start < 5
+    hub.unsubscribe(subscription)
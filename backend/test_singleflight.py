@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def run_concurrently(flight, key, fn, callers):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_for_followers(flight, endpoint, followers):
+    # Followers register before they block, so the coalesced count says when all have arrived
+    deadline = time.monotonic() + 5
+    while flight.stats()["byEndpoint"].get(endpoint, {}).get("coalesced", 0) < followers:
+        assert time.monotonic() < deadline, "callers never joined the flight"
+        time.sleep(0.001)
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def fetch():
+        runs.append(1)
+        release.wait(5)
+        return {"price": 101.5}
+
+    threads, results, errors = run_concurrently(flight, ("quote", "AAPL"), fetch, 8)
+    wait_for_followers(flight, "quote", 7)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(runs) == 1 and not errors
+    assert len(results) == 8 and all(result is results[0] for result in results)
+    stats = flight.stats()
+    assert (stats["calls"], stats["coalesced"], stats["inFlight"]) == (1, 7, 0)
+
+
+def test_error_reaches_every_waiting_caller_and_is_not_cached():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError("upstream down")
+
+    threads, results, errors = run_concurrently(flight, ("quote", "AAPL"), fail, 4)
+    wait_for_followers(flight, "quote", 3)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert not results and len(errors) == 4
+    assert all(str(e) == "upstream down" for e in errors)
+
+    # The next call after the failure runs again
+    assert flight.do(("quote", "AAPL"), lambda: 100.0) == 100.0
+
+
+def test_different_keys_run_independently():
+    flight = SingleFlight()
+    assert flight.do(("quote", "AAPL"), lambda: "a") == "a"
+    assert flight.do(("quote", "MSFT"), lambda: "m") == "m"
+    assert flight.do(("news", "AAPL"), lambda: "n") == "n"
+    stats = flight.stats()
+    assert stats["calls"] == 3 and stats["coalesced"] == 0
+    assert stats["byEndpoint"]["quote"] == {"calls": 2, "coalesced": 0}
+
+
+def test_sequential_calls_are_not_coalesced():
+    flight = SingleFlight()
+    calls = []
+    for _ in range(3):
+        flight.do(("quote", "AAPL"), calls.append, 1)
+    assert len(calls) == 3
+    with pytest.raises(ZeroDivisionError):
+        flight.do(("quote", "AAPL"), lambda: 1 / 0)
+    assert flight.stats()["inFlight"] == 0
@@ -0,0 +1,44 @@
+from symbol_index import SymbolIndex
+
+LISTINGS = [
+    ("AAPL", "Apple Inc.", "Nasdaq"),
+    ("AAP", "Advance Auto Parts Inc.", "NYSE"),
+    ("AAPB", "GraniteShares 2x Long AAPL Daily ETF", "Nasdaq"),
+    ("APLE", "Apple Hospitality REIT, Inc.", "NYSE"),
+    ("MSFT", "Microsoft Corporation", "Nasdaq"),
+    ("A", "Agilent Technologies, Inc.", "NYSE"),
+    ("aapl", "Duplicate row", ""),
+    ("PINE", "Alpine Income Property Trust", "NYSE"),
+]
+
+
+def symbols(results):
+    return [result["symbol"] for result in results]
+
+
+def test_exact_symbol_then_popular_then_shorter_prefixes():
+    index = SymbolIndex(LISTINGS, popular=["AAPL"])
+    assert symbols(index.search("aap")) == ["AAP", "AAPL", "AAPB"]
+    assert symbols(index.search("AA")) == ["AAPL", "AAP", "AAPB"]
+
+
+def test_name_words_fill_the_remaining_slots():
+    index = SymbolIndex(LISTINGS, popular=["AAPL"])
+    # No symbol starts with APPLE; both companies match on the first word of their name
+    assert symbols(index.search("apple")) == ["AAPL", "APLE"]
+    # Popular listings first, then earlier words in the name
+    assert symbols(index.search("inc")) == ["AAPL", "PINE", "A", "AAP", "APLE"]
+    assert symbols(index.search("hospitality")) == ["APLE"]
+
+
+def test_duplicate_symbols_keep_the_first_listing():
+    index = SymbolIndex(LISTINGS)
+    assert len(index) == 7
+    assert index.search("AAPL", limit=1) == [{"symbol": "AAPL", "name": "Apple Inc."}]
+
+
+def test_limit_and_empty_query():
+    index = SymbolIndex(LISTINGS)
+    assert symbols(index.search("A", limit=2)) == ["A", "AAP"]
+    assert index.search("  ") == []
+    assert index.search("ZZZ") == []
@@ -120,8 +120,10 @@ const toggleSentiment = () => {
   const fetchChartData = async () => {
     try {
       setError(""); // Clear previous errors
+      // No more points than the screen has pixels across; the server downsamples longer ranges
+      const maxPoints = Math.max(100, Math.round(window.innerWidth));
       const response = await fetch(
-        `http://127.0.0.1:5000/stock-graph/${stockSymbol}/${interval}`
+        `http://127.0.0.1:5000/stock-graph/${stockSymbol}/${interval}?maxPoints=${maxPoints}`
       );
       if (!response.ok) {
         throw new Error(`Error: ${response.statusText}`);
@@ -175,8 +177,8 @@ const toggleSentiment = () => {
         ],
       };
   
+      // Each candle carries its own x, so the line's (LTTB-sampled) labels don't apply here
       const candleChartData = {
-        labels: data.labels,
         datasets: [
           {
             label: stockSymbol,
@@ -23,16 +23,40 @@ const Ticker = () => {
         headers: {
           "Content-Type": "application/json",
         },
-        body: JSON.stringify({ message: userInput }),
+        body: JSON.stringify({ message: userInput, stream: true }),
       });
 
       if (!response.ok) {
         throw new Error(`HTTP error! Status: ${response.status}`);
       }
 
-      const data = await response.json();
-      const botResponse = data.response || "I'm sorry, I didn't understand that.";
-      setMessages([...newMessages, { role: "assistant", content: botResponse }]);
+      // Render tokens as the server relays them instead of waiting for the full reply
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let botResponse = "";
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Server-sent events are separated by a blank line
+        const events = buffer.split("\n\n");
+        buffer = events.pop();
+        for (const event of events) {
+          const dataLine = event.split("\n").find((line) => line.startsWith("data: "));
+          if (!dataLine || dataLine === "data: [DONE]") continue;
+          const payload = JSON.parse(dataLine.slice("data: ".length));
+          if (payload.error) throw new Error(payload.error);
+          botResponse += payload.token;
+        }
+        setMessages([...newMessages, { role: "assistant", content: botResponse }]);
+      }
+
+      if (!botResponse) {
+        setMessages([...newMessages, { role: "assistant", content: "I'm sorry, I didn't understand that." }]);
+      }
     } catch (error) {
       console.error("Error sending message:", error);
       setMessages([...newMessages, { role: "assistant", content: "Error communicating with the server." }]);
@@ -17,7 +17,7 @@ const Stock = ({ stockSymbol }) => {
         const fetchStockDetails = async () => {
             setIsLoading(true);
             try {
-                const response = await fetch(`http://127.0.0.1:5000/stock-name/${stockSymbol}`);
+                const response = await fetch(`http://127.0.0.1:5000/stock-details/${stockSymbol}`);
                 if (!response.ok) {
                     throw new Error(`Server responded with status ${response.status}: ${response.statusText}`);
                 }